@@ -0,0 +1,283 @@
+"""
+ExpenseTracker Analytics
+Per-user columnar expense arrays in memory, answering rolling windows, quantiles and histograms with NumPy
+
+A user's first analytics request loads their expenses into four NumPy
+columns (id, day number, amount in paise, category code), about 22 bytes a
+row. The frame is tagged with the user's data version, the per-user
+counter that moves by one for every expense row written (cache.py).
+Writes in this process that name the rows they touched
+(bump_user_version(..., expense_ids=...)) queue those ids, and when the
+counter has moved by exactly that many the next request re-reads just
+those rows. Any other movement means a write it wasn't told about (an
+import, the recurring scheduler, another worker process), and the frame
+is reloaded. Frames are evicted least recently used once their total
+size passes ANALYTICS_MEMORY_BUDGET.
+
+NumPy is listed in requirements.txt; on an install without it AVAILABLE
+is False and the analytics API answers 501.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cache import on_version_bump, read_user_version
+from categories import category_name_sql
+from database import get_read_connection, snapshot
+
+AVAILABLE = np is not None
+
+ANALYTICS_MEMORY_BUDGET = 64 * 1024 * 1024
+
+DEFAULT_WINDOW = 7
+DEFAULT_DAYS = 90
+DEFAULT_BINS = 20
+MAX_DAYS = 3660
+MAX_BINS = 100
+QUANTILES = (50, 75, 90, 95, 99)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Day numbers count from 1970-01-01, a Thursday
+EPOCH = date(1970, 1, 1)
+EPOCH_WEEKDAY = 3
+
+# Ids per IN (...) when re-reading written rows
+REFRESH_BATCH_SIZE = 500
+
+FRAME_COLUMNS = f"id, expense_date, amount, COALESCE({category_name_sql()}, 'Other')"
+
+def day_number(day):
+    """Days since EPOCH for a date"""
+    return (day - EPOCH).days
+
+class UserFrame:
+    """One user's expenses as parallel arrays (id, day, amount, category code)
+
+    Updates build new arrays and swap them in with one assignment, so a
+    reader that took ``columns`` keeps a consistent set; refresh_lock
+    serializes the updates themselves.
+    """
+
+    def __init__(self, version):
+        # (shard, counter) the columns are current for, apart from the pending ids
+        self.version = version
+        self.pending = set()
+        # Rows the queued writes changed, hence how far they moved the counter
+        self.pending_writes = 0
+        self._codes = {}
+        self.refresh_lock = threading.Lock()
+        self.columns = (np.empty(0, np.int64), np.empty(0, np.int32),
+                        np.empty(0, np.int64), np.empty(0, np.int16))
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns)
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def category_code(self, name):
+        """Code of a category name, or -1 if the user has none"""
+        return self._codes.get(name, -1)
+
+    def _to_columns(self, rows):
+        ids = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+        days = (np.array([row[1] for row in rows], dtype='datetime64[D]')
+                .astype(np.int64).astype(np.int32))
+        amounts = np.fromiter((row[2] for row in rows), np.int64, len(rows))
+        codes = np.fromiter((self._codes.setdefault(row[3], len(self._codes)) for row in rows),
+                            np.int16, len(rows))
+        return ids, days, amounts, codes
+
+    def load(self, rows):
+        """Replace the frame with (id, expense_date, amount, category) rows"""
+        self.columns = self._to_columns(rows)
+
+    def apply(self, ids, rows):
+        """Replace the rows with these ``ids`` by ``rows`` (ids missing from ``rows`` were deleted)"""
+        keep = ~np.isin(self.columns[0], np.fromiter(ids, np.int64, len(ids)))
+        self.columns = tuple(np.concatenate((column[keep], added))
+                             for column, added in zip(self.columns, self._to_columns(rows)))
+
+class AnalyticsCache:
+    """Per-user frames, LRU-evicted under a byte budget"""
+
+    def __init__(self, memory_budget=ANALYTICS_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'refreshes': 0, 'rows_refreshed': 0,
+                      'evictions': 0}
+
+    def note_write(self, user_id, expense_ids):
+        """Version-bump listener: queue the written ids, or drop the frame if they are unknown"""
+        with self._lock:
+            frame = self._frames.get(user_id)
+            if frame is None:
+                return
+            if expense_ids is None:
+                del self._frames[user_id]
+                return
+            frame.pending.update(expense_ids)
+            frame.pending_writes += len(expense_ids)
+
+    def get(self, user_id):
+        """The user's frame, loaded or brought up to date first"""
+        version = read_user_version(user_id)
+        with self._lock:
+            frame = self._frames.get(user_id)
+            if frame is not None and version == (frame.version[0],
+                                                 frame.version[1] + frame.pending_writes):
+                self._frames.move_to_end(user_id)
+                pending, frame.pending = frame.pending, set()
+                frame.version, frame.pending_writes = version, 0
+            else:
+                frame = pending = None
+
+        if frame is None:
+            return self._load(user_id, version)
+        # Also waits out a refresh another request started, so its rows are in
+        with frame.refresh_lock:
+            if pending:
+                self._refresh(user_id, frame, pending)
+            else:
+                self.stats['hits'] += 1
+        return frame
+
+    def _load(self, user_id, version):
+        # The version is read before the query, so a write landing meanwhile forces another load
+        conn = get_read_connection(user_id)
+        try:
+            rows = conn.execute(
+                f'SELECT {FRAME_COLUMNS} FROM expenses WHERE user_id = ?', (user_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        frame = UserFrame(version)
+        frame.load(rows)
+        self.stats['loads'] += 1
+
+        with self._lock:
+            self._frames[user_id] = frame
+            self._frames.move_to_end(user_id)
+            total = sum(cached.nbytes for cached in self._frames.values())
+            while total > self.memory_budget and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                total -= evicted.nbytes
+                self.stats['evictions'] += 1
+        return frame
+
+    def _refresh(self, user_id, frame, ids):
+        """Re-read the written rows; the caller holds frame.refresh_lock"""
+        ids = sorted(ids)
+        conn = get_read_connection(user_id)
+        try:
+            rows = []
+            with snapshot(conn):
+                for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+                    batch = ids[start:start + REFRESH_BATCH_SIZE]
+                    rows += conn.execute(
+                        f"SELECT {FRAME_COLUMNS} FROM expenses "
+                        f"WHERE user_id = ? AND id IN ({', '.join('?' * len(batch))})",
+                        [user_id] + batch
+                    ).fetchall()
+        finally:
+            conn.close()
+        frame.apply(ids, rows)
+        self.stats['refreshes'] += 1
+        self.stats['rows_refreshed'] += len(ids)
+
+    def clear(self):
+        """Drop every frame"""
+        with self._lock:
+            self._frames.clear()
+
+    def get_stats(self):
+        with self._lock:
+            frames = list(self._frames.values())
+        return dict(self.stats, available=AVAILABLE, users=len(frames),
+                    rows=sum(len(frame) for frame in frames),
+                    bytes=sum(frame.nbytes for frame in frames),
+                    memory_budget=self.memory_budget)
+
+# Shared instance, told about this process's writes by bump_user_version
+analytics_cache = AnalyticsCache()
+on_version_bump(analytics_cache.note_write)
+
+def analyze(user_id, start, end, window=DEFAULT_WINDOW, bins=DEFAULT_BINS, category=None):
+    """Spending analytics for expenses dated start..end (inclusive dates); amounts in paise
+
+    Returns daily totals with a trailing ``window``-day rolling average,
+    spend velocity (this window against the one before), amount quantiles,
+    a ``bins``-bucket amount histogram and totals by day of the week.
+    """
+    frame = analytics_cache.get(user_id)
+    ids, days, amounts, codes = frame.columns
+
+    first, last = day_number(start), day_number(end)
+    span = last - first + 1
+    # The rolling window (and velocity's previous window) reach back before ``start``
+    lead = 2 * window - 1
+    in_reach = (days >= first - lead) & (days <= last)
+    if category is not None:
+        in_reach &= codes == frame.category_code(category)
+    daily = np.bincount(days[in_reach] - (first - lead), weights=amounts[in_reach],
+                        minlength=span + lead).astype(np.int64)
+    sums = np.concatenate(([0], np.cumsum(daily)))
+    # rolling[i] is the total of daily[i..i+window-1]; ``start`` is daily[lead]
+    rolling = sums[window:] - sums[:-window]
+    rolling_avg = rolling[window:] / window
+
+    in_range = in_reach & (days >= first)
+    selected = amounts[in_range]
+    weekdays = (days[in_range] + EPOCH_WEEKDAY) % 7
+
+    current, previous = int(rolling[-1]), int(rolling[-1 - window])
+
+    result = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'window': window,
+        'count': int(selected.size),
+        'total': int(selected.sum()),
+        'daily': [
+            {'date': (start + timedelta(days=i)).isoformat(), 'total': int(total),
+             'rolling_average': int(round(average))}
+            for i, (total, average) in enumerate(zip(daily[lead:], rolling_avg))
+        ],
+        'velocity': {
+            'per_day': int(round(current / window)),
+            'previous_per_day': int(round(previous / window)),
+            'change_percent': round((current - previous) * 100 / previous, 1) if previous else None,
+        },
+        'quantiles': {},
+        'histogram': [],
+        'day_of_week': [],
+    }
+    if not selected.size:
+        return result
+
+    for pct, value in zip(QUANTILES, np.percentile(selected, QUANTILES)):
+        result['quantiles'][f'p{pct}'] = int(round(value))
+
+    counts, edges = np.histogram(selected, bins=bins)
+    result['histogram'] = [
+        {'low': int(round(edges[i])), 'high': int(round(edges[i + 1])), 'count': int(count)}
+        for i, count in enumerate(counts)
+    ]
+
+    day_counts = np.bincount(weekdays, minlength=7)
+    day_totals = np.bincount(weekdays, weights=selected, minlength=7)
+    result['day_of_week'] = [
+        {'day': WEEKDAYS[i], 'count': int(day_counts[i]), 'total': int(day_totals[i]),
+         'average': int(round(day_totals[i] / day_counts[i])) if day_counts[i] else 0}
+        for i in range(7)
+    ]
+    return result
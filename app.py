@@ -1,45 +1,74 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from datetime import datetime
+from flask import Blueprint, Flask, current_app, make_response, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
+from datetime import datetime, timedelta
 import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import init_db, get_db_connection
+from database import (init_app, get_db_connection, get_directory_connection, get_pool_stats,
+                      get_read_connection, snapshot)
+from date_filters import parse_date, period_range, year_range
+from models import (EXPENSE_COLUMNS, EXPENSE_SELECT_ALL, LIST_COLUMNS, MAX_BATCH_ITEMS, Budget,
+                    Expense, expense_row_factory, expense_select_list, get_expense_categories,
+                    is_expense_date, is_expense_time, projection_with_sort_keys,
+                    validate_budget_data, validate_expense_data)
+import rollups
+import analytics
+import assets
+import budgets
+import recurring
+from categories import intern_category
+import write_queue
+from export import EXPORT_FORMATS, export_select_list, stream_export
+from importer import import_csv
+from search import DEFAULT_SEARCH_LIMIT, search_expenses
+from stats import get_expense_stats
+from tagging import get_tag_totals, parse_tags
+from sharding import assign_shard
+from cache import bump_user_version, summary_cache
+from money import InvalidAmount, format_minor, minor_to_str, to_major, to_minor
+import metrics
+from migrations import migrate
+from auth import AuthBusy, check_and_upgrade, hash_password, hashing_pool
+from pagination import DEFAULT_PAGE_SIZE, InvalidCursor, clamp_page_size, order_by_clause, paginate
 import os
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-in-production'  # Change this in production
+# Routes are registered on the app built by create_app()
+bp = Blueprint('main', __name__)
 
-# Initialize database on startup
-init_db()
-
-@app.route('/')
+@bp.route('/')
 def index():
     """Homepage route"""
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Login route"""
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db_connection()
+        conn = get_directory_connection()
         user = conn.execute(
             'SELECT * FROM users WHERE username = ?', (username,)
         ).fetchone()
+        
+        try:
+            authenticated = user is not None and check_and_upgrade(
+                conn, user['id'], user['password'], password
+            )
+        except AuthBusy:
+            conn.close()
+            return auth_busy_response()
         conn.close()
         
-        if user and check_password_hash(user['password'], password):
+        if authenticated:
             session['user_id'] = user['id']
             session['username'] = user['username']
             flash('Login successful!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         else:
             flash('Invalid username or password!', 'error')
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     """Registration route"""
     if request.method == 'POST':
@@ -47,7 +76,7 @@ def register():
         email = request.form['email']
         password = request.form['password']
         
-        conn = get_db_connection()
+        conn = get_directory_connection()
         
         # Check if user already exists
         existing_user = conn.execute(
@@ -59,194 +88,721 @@ def register():
             flash('Username or email already exists!', 'error')
         else:
             # Create new user
-            hashed_password = generate_password_hash(password)
-            conn.execute(
+            try:
+                hashed_password = hash_password(password)
+            except AuthBusy:
+                conn.close()
+                return auth_busy_response()
+            cursor = conn.execute(
                 'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
                 (username, email, hashed_password)
             )
+            assign_shard(conn, cursor.lastrowid)
             conn.commit()
             flash('Registration successful! Please login.', 'success')
             conn.close()
-            return redirect(url_for('login'))
+            return redirect(url_for('.login'))
         
         conn.close()
     
     return render_template('login.html')
 
-@app.route('/logout')
+def auth_busy_response():
+    """503 for login/register while the hashing pool is saturated"""
+    flash('The server is busy, please try again in a few seconds.', 'error')
+    response = make_response(render_template('login.html'), 503)
+    response.headers['Retry-After'] = '5'
+    return response
+
+@bp.route('/logout')
 def logout():
     """Logout route"""
     session.clear()
     flash('You have been logged out!', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
     """Dashboard route - requires login"""
     if 'user_id' not in session:
         flash('Please login to access the dashboard!', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     # Get recent expenses for dashboard preview
-    conn = get_db_connection()
-    recent_expenses = conn.execute(
-        '''SELECT * FROM expenses 
-           WHERE user_id = ? 
-           ORDER BY expense_date DESC, created_at DESC 
-           LIMIT 5''', 
-        (session['user_id'],)
-    ).fetchall()
-    
-    # Get total expenses for current month
-    current_month = datetime.now().strftime('%Y-%m')
-    monthly_total = conn.execute(
-        '''SELECT COALESCE(SUM(amount), 0) as total 
-           FROM expenses 
-           WHERE user_id = ? AND strftime('%Y-%m', expense_date) = ?''',
-        (session['user_id'], current_month)
-    ).fetchone()
+    conn = get_read_connection()
+    with snapshot(conn):
+        recent_expenses = conn.execute(
+            f'''SELECT {EXPENSE_SELECT_ALL} FROM expenses 
+               WHERE user_id = ? 
+               ORDER BY expense_date DESC, created_at DESC 
+               LIMIT 5''', 
+            (session['user_id'],)
+        ).fetchall()
+        
+        # This month's figures only (see stats.py)
+        month_stats = get_expense_stats(conn, session['user_id'], trend_months=0, all_time=False)
+        
+        # Budget left this month, from the rollup counters
+        budget_left, budget_status = budgets.summarize(budgets.evaluate_budgets(conn, session['user_id']))
     
     conn.close()
     
     return render_template('dashboard.html', 
                          recent_expenses=recent_expenses, 
-                         monthly_total=monthly_total['total'])
+                         monthly_total=month_stats.month_amount,
+                         budget_left=budget_left,
+                         budget_status=budget_status)
 
-@app.route('/add_expense', methods=['GET', 'POST'])
+@bp.route('/add_expense', methods=['GET', 'POST'])
 def add_expense():
     """Add expense route - requires login"""
     if 'user_id' not in session:
         flash('Please login to add expenses!', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     if request.method == 'POST':
         expense_date = request.form['expense_date']
         expense_time = request.form['expense_time']
-        amount = float(request.form['amount'])
+        try:
+            amount = to_minor(request.form['amount'])
+        except InvalidAmount:
+            flash('Please enter a valid amount!', 'error')
+            return render_template('add_expense.html')
         subject = request.form['subject']
         description = request.form.get('description', '')
         category = request.form.get('category', 'Other')
+        repeat = request.form.get('repeat', '')
+        if repeat and repeat not in recurring.FREQUENCIES:
+            flash('Please choose how often the expense repeats!', 'error')
+            return render_template('add_expense.html')
+        # Checked before the write: a repeat rule parses the date inside the group commit
+        if not is_expense_date(expense_date):
+            flash('Please enter a valid date!', 'error')
+            return render_template('add_expense.html')
+        if not is_expense_time(expense_time):
+            flash('Please enter a valid time!', 'error')
+            return render_template('add_expense.html')
         
         # Combine date and time
         datetime_str = f"{expense_date} {expense_time}"
         
-        conn = get_db_connection()
-        conn.execute(
-            '''INSERT INTO expenses 
-               (user_id, expense_date, expense_time, amount, subject, description, category) 
-               VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (session['user_id'], expense_date, expense_time, amount, subject, description, category)
-        )
-        conn.commit()
-        conn.close()
+        user_id = session['user_id']
+        
+        def record(conn):
+            rule_id = None
+            if repeat:
+                # This expense is the first occurrence; the scheduler writes the rest
+                rule_id = recurring.create_rule(
+                    conn, user_id, repeat, expense_date, expense_time, amount, subject,
+                    description, category, first_recorded=True
+                )
+            return conn.execute(
+                '''INSERT INTO expenses 
+                   (user_id, expense_date, expense_time, amount, subject, description, category_id,
+                    is_recurring, recurring_rule_id) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (user_id, expense_date, expense_time, amount, subject, description,
+                 intern_category(conn, user_id, category), bool(repeat), rule_id)
+            ).lastrowid
+        
+        # Committed in a group with other requests' writes (see write_queue.py)
+        try:
+            expense_id = write_queue.run(user_id, record)
+        except write_queue.WriteBusy:
+            flash('The server is busy, please try again in a few seconds.', 'error')
+            response = make_response(render_template('add_expense.html'), 503)
+            response.headers['Retry-After'] = '1'
+            return response
+        bump_user_version(user_id, expense_ids=(expense_id,))
+        alerts = budgets.check_alerts(get_read_connection(), user_id, category, expense_date, amount)
         
         flash('Expense added successfully!', 'success')
-        return redirect(url_for('dashboard'))
+        for alert in alerts:
+            flash(budget_alert_message(alert), 'warning')
+        return redirect(url_for('.dashboard'))
     
     return render_template('add_expense.html')
 
-@app.route('/view_expenses')
+def budget_alert_message(alert):
+    """Flash text for a budget alert from budgets.check_alerts"""
+    label = f"{alert['period'].capitalize()} {alert['category']} budget"
+    if alert['status'] == 'exceeded':
+        return f"{label} exceeded: ₹{format_minor(alert['spent'])} of ₹{format_minor(alert['amount'])} spent."
+    return f"{label} is {alert['percent_used']:g}% used: ₹{format_minor(alert['remaining'])} left."
+
+@bp.route('/import_expenses', methods=['GET', 'POST'])
+def import_expenses():
+    """Bulk CSV import route - requires login"""
+    if 'user_id' not in session:
+        flash('Please login to import expenses!', 'error')
+        return redirect(url_for('.login'))
+    
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import!', 'error')
+            return redirect(url_for('.import_expenses'))
+        
+        inserted, errors, error_count, message = import_csv(session['user_id'], upload.stream)
+        result = {'message': message, 'errors': errors, 'error_count': error_count}
+        flash(message, 'success' if inserted else 'error')
+    
+    return render_template('import_expenses.html', result=result)
+
+@bp.route('/view_expenses')
 def view_expenses():
     """View expenses route with filtering - requires login"""
     if 'user_id' not in session:
         flash('Please login to view expenses!', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     # Get filter parameters
     filter_type = request.args.get('filter', 'all')
     sort_by = request.args.get('sort', 'date_desc')
     category_filter = request.args.get('category', 'all')
+    search_text = request.args.get('search', '').strip()
+    tags, tag_mode = get_tag_filter()
+    cursor = request.args.get('cursor')
     
-    conn = get_db_connection()
+    filters = {'period': filter_type, 'category': category_filter, 'search': search_text,
+               'tags': tags, 'tag_mode': tag_mode, 'sort_by': sort_by}
+    
+    conn = get_read_connection()
+    
+    # Fetch a single keyset page of lightweight rows instead of every matching row
+    columns = projection_with_sort_keys(LIST_COLUMNS, sort_by)
+    query, params = Expense.build_filter_query(session['user_id'], filters, expense_select_list(columns))
+    try:
+        expenses, next_cursor = paginate(conn, query, params, sort_by, cursor,
+                                         row_factory=expense_row_factory(columns))
+    except InvalidCursor:
+        flash('That page link is no longer valid, showing the first page.', 'info')
+        return redirect(url_for('.view_expenses', filter=filter_type, sort=sort_by,
+                                category=category_filter, search=search_text or None,
+                                tags=','.join(tags) or None, tag_mode=tag_mode))
+    
+    # The user's category list for the filter dropdown (cached, see categories.py)
+    categories = get_expense_categories(session['user_id'])
     
-    # Base query
-    query = 'SELECT * FROM expenses WHERE user_id = ?'
-    params = [session['user_id']]
-    
-    # Apply filters
-    if filter_type == 'today':
-        query += ' AND expense_date = date("now")'
-    elif filter_type == 'week':
-        query += ' AND expense_date >= date("now", "-7 days")'
-    elif filter_type == 'month':
-        query += ' AND strftime("%Y-%m", expense_date) = strftime("%Y-%m", "now")'
-    elif filter_type == 'year':
-        query += ' AND strftime("%Y", expense_date) = strftime("%Y", "now")'
-    
-    # Category filter
-    if category_filter != 'all':
-        query += ' AND category = ?'
-        params.append(category_filter)
-    
-    # Apply sorting
-    if sort_by == 'date_desc':
-        query += ' ORDER BY expense_date DESC, expense_time DESC'
-    elif sort_by == 'date_asc':
-        query += ' ORDER BY expense_date ASC, expense_time ASC'
-    elif sort_by == 'amount_desc':
-        query += ' ORDER BY amount DESC'
-    elif sort_by == 'amount_asc':
-        query += ' ORDER BY amount ASC'
-    elif sort_by == 'category':
-        query += ' ORDER BY category, expense_date DESC'
-    
-    expenses = conn.execute(query, params).fetchall()
-    
-    # Get categories for filter dropdown
-    categories = conn.execute(
-        'SELECT DISTINCT category FROM expenses WHERE user_id = ? ORDER BY category',
-        (session['user_id'],)
-    ).fetchall()
-    
-    # Calculate totals
-    total_amount = sum(expense['amount'] for expense in expenses)
+    # Calculate totals over all matching rows, not just this page
+    query, params = Expense.build_filter_query(
+        session['user_id'], filters, 'COUNT(*) as count, COALESCE(SUM(amount), 0) as total'
+    )
+    totals = conn.execute(query, params).fetchone()
     
     conn.close()
     
     return render_template('view_expenses.html', 
                          expenses=expenses, 
                          categories=categories,
-                         total_amount=total_amount,
+                         total_amount=totals['total'],
+                         total_count=totals['count'],
+                         next_cursor=next_cursor,
+                         is_first_page=not cursor,
                          current_filter=filter_type,
                          current_sort=sort_by,
-                         current_category=category_filter)
+                         current_category=category_filter,
+                         current_search=search_text,
+                         current_tags=','.join(tags),
+                         current_tag_mode=tag_mode)
+
+def get_tag_filter():
+    """(tags, mode) from ?tags=a,b (or repeated tags=) and ?tag_mode=any|all"""
+    tags = parse_tags(','.join(request.args.getlist('tags')))
+    return tags, 'all' if request.args.get('tag_mode') == 'all' else 'any'
+
+def get_listing_filters():
+    """Read expense listing filters from the query string
+
+    Raises ValueError for a date_from/date_to that isn't YYYY-MM-DD.
+    """
+    tags, tag_mode = get_tag_filter()
+    return {
+        'period': request.args.get('filter', 'all'),
+        'category': request.args.get('category', 'all'),
+        'date_from': parse_date(request.args.get('date_from')),
+        'date_to': parse_date(request.args.get('date_to')),
+        'min_amount': request.args.get('min_amount', type=to_minor),
+        'max_amount': request.args.get('max_amount', type=to_minor),
+        'search': request.args.get('search'),
+        'tags': tags,
+        'tag_mode': tag_mode,
+        'sort_by': request.args.get('sort', 'date_desc'),
+    }
+
+def amount_json(expense):
+    """Expose a paise amount to JSON clients as rupees plus the exact amount_minor"""
+    expense['amount_minor'] = expense['amount']
+    expense['amount'] = to_major(expense['amount'])
+    return expense
 
-@app.route('/api/expenses/summary')
+def total_json(row):
+    """Same as amount_json, for rollup totals"""
+    row['total_minor'] = row['total']
+    row['total'] = to_major(row['total'])
+    return row
+
+@bp.route('/api/expenses')
+def list_expenses():
+    """API endpoint for a keyset-paginated expense listing"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        filters = get_listing_filters()
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    cursor = request.args.get('cursor')
+    page_size = clamp_page_size(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    
+    conn = get_read_connection()
+    query, params = Expense.build_filter_query(
+        session['user_id'], filters, expense_select_list(EXPENSE_COLUMNS)
+    )
+    try:
+        rows, next_cursor = paginate(conn, query, params, filters['sort_by'], cursor, page_size,
+                                     row_factory=expense_row_factory(EXPENSE_COLUMNS))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+    
+    return jsonify({
+        'expenses': [amount_json(row.to_dict()) for row in rows],
+        'next_cursor': next_cursor,
+        'page_size': page_size
+    })
+
+def expense_fields_to_minor(item):
+    """A batch item with its rupee amount converted to paise
+
+    An amount that doesn't convert is left as sent, so validation reports it.
+    """
+    if not isinstance(item, dict) or 'amount' not in item:
+        return item
+    item = dict(item)
+    try:
+        item['amount'] = to_minor(item['amount'])
+    except InvalidAmount:
+        pass
+    return item
+
+def run_expense_batch(creates, updates, deletes, atomic):
+    """Apply a batch for the logged-in user; 200 if all applied, 207 if some, 400 if none
+
+    Bad items only ever fail themselves; 500 means the database failed.
+    """
+    if len(creates) + len(updates) + len(deletes) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'A batch holds at most {MAX_BATCH_ITEMS} items'}), 413
+    results, applied, message = Expense.apply_batch(
+        session['user_id'],
+        [expense_fields_to_minor(item) for item in creates],
+        [expense_fields_to_minor(item) for item in updates],
+        deletes, atomic
+    )
+    if results is None:
+        current_app.logger.error('Expense batch failed: %s', message)
+        return jsonify({'error': 'The batch could not be saved, nothing was written'}), 500
+    failed = len(results) - applied
+    status = 200 if not failed else (207 if applied else 400)
+    return jsonify({'results': results, 'applied': applied, 'failed': failed}), status
+
+@bp.route('/api/v1/expenses', methods=['GET', 'POST', 'PATCH', 'DELETE'])
+def expenses_v1():
+    """Versioned expense API: GET lists a page; POST, PATCH and DELETE take a JSON array
+
+    POST creates one expense per item, PATCH changes the fields given next
+    to each item's id, DELETE removes the listed ids. Each request is one
+    transaction; ?atomic=1 writes nothing unless every item is valid.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if request.method == 'GET':
+        return list_expenses()
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a JSON array'}), 400
+    atomic = request.args.get('atomic', '').lower() in ('1', 'true')
+    if request.method == 'POST':
+        return run_expense_batch(items, [], [], atomic)
+    if request.method == 'PATCH':
+        return run_expense_batch([], items, [], atomic)
+    return run_expense_batch([], [], items, atomic)
+
+@bp.route('/api/v1/expenses/batch', methods=['POST'])
+def expense_batch_v1():
+    """Creates, patches and deletes in one round-trip and one transaction
+
+    Body: {"create": [...], "update": [...], "delete": [...], "atomic": false}
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not all(
+            isinstance(data.get(op, []), list) for op in ('create', 'update', 'delete')):
+        return jsonify({'error': 'Expected {"create": [...], "update": [...], "delete": [...]}'}), 400
+    return run_expense_batch(data.get('create', []), data.get('update', []),
+                             data.get('delete', []), bool(data.get('atomic')))
+
+@bp.route('/api/expenses/search')
+def search_expenses_api():
+    """API endpoint for ranked full-text search with highlights"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    text = request.args.get('q', '').strip()
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    
+    conn = get_read_connection()
+    results = search_expenses(conn, session['user_id'], text, limit)
+    conn.close()
+    
+    return jsonify({'query': text, 'results': [amount_json(result) for result in results]})
+
+@bp.route('/api/tags')
+def tag_totals():
+    """API endpoint for per-tag totals from the tag index"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    start, end = period_range(request.args.get('filter', 'all'))
+    limit = request.args.get('limit')
+    if limit is not None:
+        limit = int(limit) if limit.strip().isdecimal() else 0
+        if limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    conn = get_read_connection()
+    totals = get_tag_totals(conn, session['user_id'], start, end, limit)
+    conn.close()
+    
+    return jsonify({'tags': [total_json(row) for row in totals]})
+
+@bp.route('/api/expenses/export')
+def export_expenses():
+    """Stream the filtered expense listing as CSV or JSON Lines"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {export_format}'}), 400
+    content_type, extension = EXPORT_FORMATS[export_format]
+    
+    try:
+        filters = get_listing_filters()
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    query, params = Expense.build_filter_query(
+        session['user_id'], filters, export_select_list(export_format)
+    )
+    query += order_by_clause(filters['sort_by'])
+    
+    # The request-scoped connection stays open until the stream finishes
+    cursor = get_read_connection().execute(query, params)
+    filename = f"expenses_{datetime.now().strftime('%Y-%m-%d')}.{extension}"
+    
+    return Response(
+        stream_with_context(stream_export(cursor, export_format)),
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@bp.route('/api/expenses/summary')
 def expense_summary():
     """API endpoint for expense summary data"""
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    conn = get_db_connection()
+    user_id = session['user_id']
+    current_year = datetime.now().year
+    cache_name = f'summary:{current_year}'
     
-    # Monthly summary for current year
-    monthly_data = conn.execute(
-        '''SELECT strftime('%Y-%m', expense_date) as month, 
-                  SUM(amount) as total,
-                  COUNT(*) as count
-           FROM expenses 
-           WHERE user_id = ? AND strftime('%Y', expense_date) = strftime('%Y', 'now')
-           GROUP BY strftime('%Y-%m', expense_date)
-           ORDER BY month''',
-        (session['user_id'],)
-    ).fetchall()
-    
-    # Category summary
-    category_data = conn.execute(
-        '''SELECT category, SUM(amount) as total, COUNT(*) as count
-           FROM expenses 
-           WHERE user_id = ?
-           GROUP BY category
-           ORDER BY total DESC''',
-        (session['user_id'],)
-    ).fetchall()
+    # Revalidation is answered from the data version alone (one primary-key read)
+    version = summary_cache.version(user_id)
+    etag = summary_cache.etag(user_id, cache_name, version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = summary_cache.get(user_id, cache_name, version)
+        if body is None:
+            conn = get_read_connection()
+            
+            # Monthly summary for current year (from the month/category rollups)
+            year_start, year_end = year_range(current_year)
+            monthly_data = rollups.get_monthly_totals(conn, user_id, year_start, year_end)
+            
+            # Category summary
+            category_data = rollups.get_category_totals(conn, user_id)
+            
+            conn.close()
+            
+            body = jsonify({
+                'monthly': [total_json(dict(row)) for row in monthly_data],
+                'categories': [total_json(dict(row)) for row in category_data]
+            }).get_data()
+            summary_cache.set(user_id, cache_name, version, body)
+        response = Response(body, mimetype='application/json')
     
-    conn.close()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def minor_json(data, *keys):
+    """Same as amount_json, for the named paise fields of any dict"""
+    for key in keys:
+        data[f'{key}_minor'] = data[key]
+        data[key] = to_major(data[key])
+    return data
+
+def analytics_json(result):
+    """analytics.analyze output with every amount as rupees plus paise"""
+    minor_json(result, 'total')
+    for day in result['daily']:
+        minor_json(day, 'total', 'rolling_average')
+    minor_json(result['velocity'], 'per_day', 'previous_per_day')
+    result['quantiles'] = minor_json(result['quantiles'], *result['quantiles'])
+    for bucket in result['histogram']:
+        minor_json(bucket, 'low', 'high')
+    for day in result['day_of_week']:
+        minor_json(day, 'total', 'average')
+    return result
+
+@bp.route('/api/expenses/analytics')
+def expense_analytics():
+    """API endpoint for rolling averages, quantiles, a histogram and weekday totals"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not analytics.AVAILABLE:
+        return jsonify({'error': 'Analytics need numpy (pip install numpy)'}), 501
+    
+    try:
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() \
+            if request.args.get('to') else datetime.now().date()
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() \
+            if request.args.get('from') else end - timedelta(days=analytics.DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if start > end or (end - start).days >= analytics.MAX_DAYS:
+        return jsonify({'error': f'The range must be 1 to {analytics.MAX_DAYS} days'}), 400
+    window = min(max(request.args.get('window', analytics.DEFAULT_WINDOW, type=int), 1),
+                 analytics.MAX_DAYS)
+    bins = min(max(request.args.get('bins', analytics.DEFAULT_BINS, type=int), 1),
+               analytics.MAX_BINS)
     
+    result = analytics.analyze(session['user_id'], start, end, window, bins,
+                               request.args.get('category') or None)
+    return jsonify(analytics_json(result))
+
+def budget_json(budget, evaluation=None):
+    """A budget (and its current period, if evaluated) with amounts as rupees plus paise"""
+    data = amount_json(dict(budget))
+    if evaluation is not None:
+        data['current_period'] = {
+            'start': evaluation['period_start'],
+            'end': evaluation['period_end'],
+            'spent': to_major(evaluation['spent']),
+            'spent_minor': evaluation['spent'],
+            'remaining': to_major(evaluation['remaining']),
+            'remaining_minor': evaluation['remaining'],
+            'percent_used': evaluation['percent_used'],
+            'status': evaluation['status'],
+        }
+    return data
+
+def read_budget_fields(data):
+    """Budget fields present in a JSON body, amount converted to paise; returns (fields, errors)"""
+    fields = {field: data[field] for field in Budget.FIELDS if field in data}
+    if 'amount' in fields:
+        try:
+            fields['amount'] = to_minor(fields['amount'])
+        except InvalidAmount:
+            return fields, ['Amount must be a positive number']
+    return fields, []
+
+@bp.route('/api/budgets', methods=['GET', 'POST'])
+def budget_collection():
+    """API endpoint listing budgets with budget-vs-actual, or creating one"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user_id = session['user_id']
+
+    if request.method == 'POST':
+        fields, errors = read_budget_fields(request.get_json(silent=True) or {})
+        errors = errors or validate_budget_data(fields, user_id)
+        if errors:
+            return jsonify({'errors': errors}), 400
+        budget, message = Budget.create_budget(user_id, **fields)
+        if budget is None:
+            return jsonify({'error': message}), 500
+        return jsonify(budget_json(budget.to_dict(), budget.evaluate())), 201
+
+    day = request.args.get('date') or None
+    try:
+        evaluations, message = Budget.evaluate_all(user_id, day)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    by_id = {evaluation['budget_id']: evaluation for evaluation in evaluations}
     return jsonify({
-        'monthly': [dict(row) for row in monthly_data],
-        'categories': [dict(row) for row in category_data]
+        'budgets': [budget_json(budget.to_dict(), by_id.get(budget.id))
+                    for budget in Budget.get_by_user(user_id)]
     })
 
+@bp.route('/api/budgets/<int:budget_id>', methods=['GET', 'PUT', 'DELETE'])
+def budget_item(budget_id):
+    """API endpoint reading, updating or deleting one budget"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    budget = Budget.get_by_id(budget_id, session['user_id'])
+    if budget is None:
+        return jsonify({'error': 'Budget not found'}), 404
+
+    if request.method == 'DELETE':
+        ok, message = budget.delete()
+        return (jsonify({'message': message}), 200) if ok else (jsonify({'error': message}), 500)
+
+    if request.method == 'PUT':
+        fields, errors = read_budget_fields(request.get_json(silent=True) or {})
+        errors = errors or validate_budget_data(dict(budget.to_dict(), **fields), session['user_id'])
+        if errors:
+            return jsonify({'errors': errors}), 400
+        ok, message = budget.update(**fields)
+        if not ok:
+            return jsonify({'error': message}), 400
+
+    return jsonify(budget_json(budget.to_dict(), budget.evaluate()))
+
+def rule_json(rule):
+    """A recurrence rule with its amount as rupees plus paise"""
+    data = amount_json(dict(rule))
+    data['active'] = bool(data['active'])
+    return data
+
+@bp.route('/api/recurring', methods=['GET', 'POST'])
+def recurring_rules():
+    """API endpoint listing recurrence rules, or creating one"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user_id = session['user_id']
+    # Listing only reads; creating writes the rule
+    conn = get_db_connection() if request.method == 'POST' else get_read_connection()
+
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Expected a JSON object'}), 400
+            errors = recurring.validate_rule(data)
+            try:
+                amount = to_minor(data.get('amount'))
+            except InvalidAmount:
+                amount = None
+            if not errors:
+                expense_errors = validate_expense_data({
+                    'amount': amount, 'subject': data.get('subject'),
+                    'expense_date': data.get('start_date'),
+                    'expense_time': data.get('expense_time', '00:00'),
+                    'description': data.get('description'),
+                })
+                # The start date is the rule's own field, checked by validate_rule
+                errors = [error for error in expense_errors if not error.startswith('Expense date ')]
+            if errors:
+                return jsonify({'errors': errors}), 400
+            rule_id = recurring.create_rule(
+                conn, user_id, data['frequency'], data['start_date'],
+                data.get('expense_time', '00:00'), amount, data['subject'],
+                data.get('description'), data.get('category', 'Other'),
+                data.get('payment_method', 'Cash'), data.get('tags'),
+                data.get('interval', 1), data.get('day_of_month'), data.get('end_date')
+            )
+            conn.commit()
+            rule = conn.execute('SELECT * FROM recurring_rules WHERE id = ?', (rule_id,)).fetchone()
+            return jsonify(rule_json(rule)), 201
+
+        return jsonify({'rules': [rule_json(rule) for rule in recurring.get_user_rules(conn, user_id)]})
+    finally:
+        conn.close()
+
+@bp.route('/api/recurring/<int:rule_id>', methods=['DELETE'])
+def stop_recurring_rule(rule_id):
+    """API endpoint stopping a recurrence rule (expenses already written stay)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    conn = get_db_connection()
+    try:
+        found = recurring.deactivate_rule(conn, rule_id, session['user_id'])
+    finally:
+        conn.close()
+    if not found:
+        return jsonify({'error': 'Rule not found'}), 404
+    return jsonify({'message': 'Rule stopped'})
+
+@bp.route('/api/recurring/scheduler')
+def recurring_scheduler_stats():
+    """API endpoint for recurring expense scheduler statistics"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify(recurring.scheduler.get_stats())
+
+@bp.route('/api/cache/stats')
+def cache_stats():
+    """API endpoint for summary cache hit/miss counters"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(dict(summary_cache.get_stats(), analytics=analytics.analytics_cache.get_stats()))
+
+@bp.route('/api/db/pool')
+def db_pool_stats():
+    """API endpoint for connection pool statistics"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify(dict(get_pool_stats(), group_commit=write_queue.get_stats()))
+
+@bp.route('/api/auth/pool')
+def auth_pool_stats():
+    """API endpoint for password hashing pool statistics"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify(hashing_pool.get_stats())
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Built static file (see assets.py), precompressed and cached as immutable"""
+    return assets.send_asset(filename)
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (no session: restrict access at the proxy)"""
+    return Response(metrics.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def create_app():
+    """Build the app; the schema is only migrated when it is behind"""
+    app = Flask(__name__)
+    app.secret_key = 'your-secret-key-change-in-production'  # Change this in production
+    init_app(app)
+    metrics.init_app(app)
+    assets.init_app(app)
+
+    # Amounts reach templates as integer paise: {{ amount|money }} -> 1,234.50
+    app.add_template_filter(format_minor, 'money')
+    app.add_template_filter(minor_to_str, 'amount_value')
+
+    app.register_blueprint(bp)
+
+    # One PRAGMA read when the database is current
+    migrate()
+
+    if recurring.RECURRING_SCHEDULER:
+        recurring.scheduler.start()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,201 @@
+"""
+ExpenseTracker Assets
+Build step and handler for minified, content-hashed, precompressed static files
+
+`build` minifies each of ASSET_SOURCES, names the result after a hash of its
+content (css/style.css -> style.3f9a1c0b7d2e.css) and writes it with .gz
+and, when the brotli package is installed, .br variants into static/dist,
+plus a manifest.json mapping source names to built names. Templates link
+with asset_url('css/style.css'), which has url_for('static', ...)'s
+signature and falls back to it for files that are not built. Built files
+are served from /assets/ with a year-long immutable Cache-Control, so a
+repeat page load makes no static requests at all: a changed file gets a
+new name and the pages link to that.
+
+The minifiers only drop comments and whitespace; they don't rewrite code.
+create_app rebuilds when a source is newer than the manifest.
+
+Usage: python assets.py [build|status|clean]
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from flask import abort, request, send_file, url_for
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = 'manifest.json'
+
+ASSET_SOURCES = ('css/style.css', 'js/main.js')
+
+# Rebuild in create_app when a source changed (skipped if static/ is read-only)
+ASSET_BUILD_ON_STARTUP = True
+
+ASSET_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 12
+
+# (suffix, Content-Encoding) in order of preference
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,])\s*')
+
+_manifest = {}
+
+def minify_css(text):
+    """Drop comments and collapse whitespace"""
+    text = _CSS_COMMENT_RE.sub('', text)
+    text = _CSS_SPACE_RE.sub(' ', text)
+    text = _CSS_PUNCTUATION_RE.sub(r'\1', text)
+    # "color: red" -> "color:red"; a space before a colon can be a descendant selector
+    text = text.replace(': ', ':').replace(';}', '}')
+    return text.strip()
+
+def minify_js(text):
+    """Drop indentation, blank lines and whole-line // comments
+
+    Line breaks stay, so automatic semicolon insertion reads the code as
+    before; trailing comments stay because they can't be told from '//'
+    inside strings without a parser.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def _hashed_name(source, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, extension = os.path.splitext(os.path.basename(source))
+    return f'{stem}.{digest}{extension}'
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Build every source into dist_dir; returns the manifest"""
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for source in ASSET_SOURCES:
+        with open(os.path.join(static_dir, source), encoding='utf-8') as f:
+            text = f.read()
+        minify = MINIFIERS.get(os.path.splitext(source)[1])
+        content = (minify(text) if minify else text).encode('utf-8')
+        name = _hashed_name(source, content)
+        path = os.path.join(dist_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        # mtime=0 keeps the .gz bytes identical across builds
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+        manifest[source] = name
+
+    # Files from older builds go, so dist/ only holds what the pages link to
+    keep = {MANIFEST} | {name + suffix for name in manifest.values() for suffix in ('', '.gz', '.br')}
+    for name in os.listdir(dist_dir):
+        if name not in keep:
+            os.remove(os.path.join(dist_dir, name))
+
+    tmp_path = os.path.join(dist_dir, MANIFEST + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(dist_dir, MANIFEST))
+    return manifest
+
+def load_manifest(dist_dir=DIST_DIR):
+    """The built names by source name ({} when nothing is built)"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def is_stale(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """True when the manifest is missing or older than a source"""
+    try:
+        built_at = os.path.getmtime(os.path.join(dist_dir, MANIFEST))
+    except OSError:
+        return True
+    return any(os.path.getmtime(os.path.join(static_dir, source)) > built_at
+               for source in ASSET_SOURCES)
+
+def asset_url(filename, **values):
+    """url_for('static', filename=...) for the built copy of a file, if there is one"""
+    built = _manifest.get(filename)
+    if built is None:
+        return url_for('static', filename=filename, **values)
+    return url_for('main.asset', filename=built, **values)
+
+def send_asset(filename):
+    """Response for a built file: the best precompressed variant, cached for good"""
+    if filename not in _manifest.values():
+        abort(404)
+    path = os.path.join(DIST_DIR, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for suffix, name in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(path + suffix):
+            path, encoding = path + suffix, name
+            break
+
+    response = send_file(path, mimetype=mimetype, max_age=ASSET_MAX_AGE, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_app(app):
+    """Build if stale, load the manifest and expose asset_url to templates"""
+    global _manifest
+    if ASSET_BUILD_ON_STARTUP and is_stale():
+        try:
+            build()
+        except OSError as e:
+            logger.warning('Static assets not rebuilt (%s); serving what is built', e)
+    _manifest = load_manifest()
+    app.add_template_global(asset_url)
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'build'
+    if command == 'build':
+        for source, name in build().items():
+            sizes = [os.path.getsize(os.path.join(STATIC_DIR, source))]
+            sizes += [os.path.getsize(os.path.join(DIST_DIR, name + suffix))
+                      for suffix in ('', '.gz', '.br') if os.path.exists(os.path.join(DIST_DIR, name + suffix))]
+            print(f"   {source} -> dist/{name}: " + ' -> '.join(f'{size:,} B' for size in sizes))
+        if brotli is None:
+            print("⚠️  brotli is not installed; built gzip variants only (pip install brotli)")
+        print(f"✅ Built {len(ASSET_SOURCES)} assets into {DIST_DIR}")
+        return 0
+    if command == 'status':
+        if is_stale():
+            print("⏳ Assets are out of date (run 'python assets.py build')")
+            return 1
+        print(f"✅ Assets are current: {load_manifest()}")
+        return 0
+    if command == 'clean':
+        shutil.rmtree(DIST_DIR, ignore_errors=True)
+        print(f"✅ Removed {DIST_DIR}")
+        return 0
+    print("Usage: python assets.py [build|status|clean]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
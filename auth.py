@@ -0,0 +1,112 @@
+"""
+ExpenseTracker Auth
+Password hashing on a bounded process pool with backpressure and transparent hash upgrades
+
+The KDF is deliberately slow, so hashing runs in worker processes instead of
+pinning request threads. At most HASH_WORKERS + HASH_QUEUE_LIMIT jobs are in
+flight; beyond that AuthBusy is raised and the routes answer 503.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# KDF cost: werkzeug method string; raise the iteration count as hardware gets faster
+HASH_METHOD = 'pbkdf2:sha256:600000'
+
+HASH_WORKERS = os.cpu_count() or 1
+HASH_QUEUE_LIMIT = HASH_WORKERS * 4
+HASH_TIMEOUT = 10.0
+
+class AuthBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+class HashingPool:
+    """Process pool with a hard cap on queued plus running jobs"""
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _get_executor(self):
+        """Start worker processes on first use, not at import"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def run(self, fn, *args):
+        """Run fn(*args) in a worker and wait for it, or raise AuthBusy"""
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise AuthBusy('Password hashing queue is full')
+
+        self.stats['submitted'] += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.stats['timeouts'] += 1
+            raise AuthBusy('Password hashing timed out')
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def get_stats(self):
+        """Counters for tuning the pool size and queue limit"""
+        return dict(self.stats, workers=self.workers, queue_limit=self.queue_limit)
+
+hashing_pool = HashingPool()
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def hash_password(password, method=None):
+    """Hash a password on the worker pool with the configured KDF"""
+    return hashing_pool.run(_hash, password, method or HASH_METHOD)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash on the worker pool"""
+    return hashing_pool.run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash, method=None):
+    """Whether a stored hash was made with a different KDF or cost"""
+    return password_hash.split('$', 1)[0] != (method or HASH_METHOD)
+
+def check_and_upgrade(conn, user_id, password_hash, password):
+    """Verify a login and re-hash with the current KDF when it is outdated
+
+    Returns True when the password matches. Raises AuthBusy when the pool is
+    saturated; the upgrade is skipped (not failed) if the pool fills meanwhile.
+    """
+    if not verify_password(password_hash, password):
+        return False
+
+    if needs_rehash(password_hash):
+        try:
+            new_hash = hash_password(password)
+        except AuthBusy:
+            return True
+        conn.execute(
+            'UPDATE users SET password = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND password = ?',
+            (new_hash, user_id, password_hash)
+        )
+        conn.commit()
+    return True
@@ -0,0 +1,4 @@
+"""
+ExpenseTracker Benchmarks
+Runnable performance scripts: python -m benchmarks.<name>
+"""
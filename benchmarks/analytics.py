@@ -0,0 +1,128 @@
+"""
+ExpenseTracker Analytics Benchmark
+analytics.analyze on the in-memory NumPy frame versus the same figures computed in pure Python from SQL rows
+
+Seeds one user with a ledger spread over two years, then computes daily
+totals with a 30-day rolling average, velocity, quantiles, a histogram and
+weekday totals over the last year: once by fetching the rows and looping
+over them (as the old CLI's spending_trend did), and through the analytics
+cache cold (load), after one write (refresh) and warm (hit). The Python
+and NumPy results are checked against each other.
+
+Usage: python -m benchmarks.analytics [expenses] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import database
+from benchmarks.ledger import seed_ledger
+
+WINDOW = 30
+BINS = 20
+
+def python_analytics(user_id, start, end, window=WINDOW, bins=BINS):
+    """The figures analytics.analyze returns, from a row fetch and plain loops"""
+    lead = 2 * window - 1
+    reach = start - timedelta(days=lead)
+    conn = database.get_read_connection(user_id)
+    try:
+        rows = conn.execute(
+            'SELECT expense_date, amount FROM expenses WHERE user_id = ? '
+            'AND expense_date >= ? AND expense_date < ?',
+            (user_id, reach.isoformat(), (end + timedelta(days=1)).isoformat())
+        ).fetchall()
+    finally:
+        conn.close()
+
+    daily = {}
+    selected = []
+    weekdays = [[0, 0] for _ in range(7)]
+    for expense_date, amount in rows:
+        day = date.fromisoformat(expense_date)
+        daily[day] = daily.get(day, 0) + amount
+        if day >= start:
+            selected.append(amount)
+            weekdays[day.weekday()][0] += 1
+            weekdays[day.weekday()][1] += amount
+
+    series = [daily.get(reach + timedelta(days=i), 0) for i in range((end - reach).days + 1)]
+    rolling = [sum(series[i - window + 1:i + 1]) / window for i in range(lead, len(series))]
+
+    selected.sort()
+    quantiles = statistics.quantiles(selected, n=100, method='inclusive') if len(selected) > 1 else []
+    low, high = (selected[0], selected[-1]) if selected else (0, 0)
+    width = (high - low) / bins or 1
+    histogram = [0] * bins
+    for amount in selected:
+        histogram[min(int((amount - low) / width), bins - 1)] += 1
+    return {'count': len(selected), 'total': sum(selected), 'rolling': rolling,
+            'quantiles': quantiles, 'histogram': histogram, 'weekdays': weekdays}
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+def main(argv):
+    expenses = int(argv[1]) if len(argv) > 1 else 100000
+    iterations = int(argv[2]) if len(argv) > 2 else 5
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='analytics-'), 'analytics.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+
+    import analytics
+    from models import Expense
+    if not analytics.AVAILABLE:
+        print("❌ numpy is not installed (pip install numpy)")
+        return 1
+
+    print(f"📦 Seeding 1 user x {expenses:,} expenses...")
+    user_id = seed_ledger(1, expenses)[0][0]
+    end = date.today()
+    start = end - timedelta(days=364)
+
+    def numpy_analytics():
+        return analytics.analyze(user_id, start, end, WINDOW, BINS)
+
+    def load():
+        analytics.analytics_cache.clear()
+        return numpy_analytics()
+
+    def refresh():
+        Expense.create_expense(user_id, end.isoformat(), '12:00', 25000, 'Analytics bench')
+        return numpy_analytics()
+
+    python_ms, expected = timed(lambda: python_analytics(user_id, start, end), iterations)
+    cases = [('pure Python from rows', python_ms)]
+    for name, fn in (('NumPy frame, load', load), ('NumPy frame, refresh', refresh),
+                     ('NumPy frame, hit', numpy_analytics)):
+        ms, result = timed(fn, iterations)
+        cases.append((name, ms))
+
+    # Same figures both ways (the refreshes added rows since the Python run)
+    expected = python_analytics(user_id, start, end)
+    assert result['count'] == expected['count'] and result['total'] == expected['total']
+    assert [day['rolling_average'] for day in result['daily']] == \
+        [int(round(value)) for value in expected['rolling']]
+    assert [bucket['count'] for bucket in result['histogram']] == expected['histogram']
+    assert [[day['count'], day['total']] for day in result['day_of_week']] == expected['weekdays']
+    assert result['quantiles']['p50'] == int(round(expected['quantiles'][49]))
+
+    print(f"📈 Last 365 days of {expenses:,} expenses ({result['count']:,} in range), median of {iterations}")
+    for name, ms in cases:
+        print(f"   {name:24s} {ms:9.2f} ms   ({python_ms / ms:6.1f}x)")
+    print(f"   frame size {analytics.analytics_cache.get_stats()['bytes'] / 2 ** 20:.1f} MiB")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
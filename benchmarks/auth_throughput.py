@@ -0,0 +1,75 @@
+"""
+ExpenseTracker Auth Throughput Benchmark
+Login verifications per second, inline versus the hashing pool at 1..N workers
+
+Usage: python -m benchmarks.auth_throughput [logins] [method]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from auth import AuthBusy, HASH_METHOD, HashingPool
+
+PASSWORD = 'correct horse battery staple'
+
+def run_logins(verify, logins, threads):
+    """Run ``logins`` verifications from ``threads`` request threads; returns (seconds, rejected)"""
+    rejected = 0
+
+    def one(_):
+        try:
+            return verify()
+        except AuthBusy:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for result in executor.map(one, range(logins)):
+            if result is None:
+                rejected += 1
+            elif not result:
+                raise AssertionError('Password check failed')
+    return time.perf_counter() - start, rejected
+
+def main(argv):
+    logins = int(argv[1]) if len(argv) > 1 else 64
+    method = argv[2] if len(argv) > 2 else HASH_METHOD
+    cores = os.cpu_count() or 1
+    password_hash = generate_password_hash(PASSWORD, method=method)
+
+    print(f"🔐 {method}, {logins} logins, {cores} core(s)")
+
+    elapsed, _ = run_logins(lambda: check_password_hash(password_hash, PASSWORD), logins, 16)
+    print(f"   inline (16 threads): {logins / elapsed:8.1f} logins/s")
+
+    worker_counts = sorted({1, 2, cores // 2, cores} - {0})
+    for workers in worker_counts:
+        pool = HashingPool(workers=workers, queue_limit=logins)
+        try:
+            pool.run(check_password_hash, password_hash, PASSWORD)  # start the workers
+            elapsed, _ = run_logins(
+                lambda: pool.run(check_password_hash, password_hash, PASSWORD),
+                logins, workers * 4
+            )
+        finally:
+            pool.shutdown()
+        rate = logins / elapsed
+        print(f"   pool {workers:3d} worker(s): {rate:8.1f} logins/s  ({rate / workers:6.1f} per core)")
+
+    # Login storm against a small queue: the excess is shed instead of piling up
+    pool = HashingPool(workers=1, queue_limit=2)
+    try:
+        elapsed, rejected = run_logins(
+            lambda: pool.run(check_password_hash, password_hash, PASSWORD),
+            logins, logins
+        )
+    finally:
+        pool.shutdown()
+    print(f"   storm, 1 worker + queue 2: {rejected}/{logins} rejected with 503 in {elapsed:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
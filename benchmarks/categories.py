@@ -0,0 +1,103 @@
+"""
+ExpenseTracker Categories Benchmark
+Category names stored on every expense versus per-user category ids
+
+Seeds users through bulk_create, then rebuilds the same rows in a copy of
+the pre-migration-13 layout (the category name on every row, with its two
+indexes) and compares bytes on disk and the reads that touch categories:
+the filter dropdown (SELECT DISTINCT over the user's rows, versus the
+categories table and the cached list) and a one-category filter.
+
+Usage: python -m benchmarks.categories [expenses_per_user] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import database
+from benchmarks.ledger import seed_ledger
+
+USERS = 4
+FILTER_CATEGORY = 'Groceries'
+
+LEGACY_SCHEMA = """
+    CREATE TABLE legacy_expenses AS
+    SELECT e.id, e.user_id, e.expense_date, e.expense_time, e.amount, e.subject, e.description,
+           c.name as category, e.payment_method, e.tags, e.is_recurring, e.created_at, e.updated_at
+    FROM expenses e JOIN categories c ON c.id = e.category_id;
+    CREATE INDEX legacy_category ON legacy_expenses(category);
+    CREATE INDEX legacy_user_category ON legacy_expenses(user_id, category, expense_date DESC, id DESC);
+"""
+
+def table_bytes(conn, names):
+    placeholders = ', '.join('?' * len(names))
+    return conn.execute(
+        f'SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders})', names
+    ).fetchone()[0]
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+def main(argv):
+    expenses = int(argv[1]) if len(argv) > 1 else 20000
+    iterations = int(argv[2]) if len(argv) > 2 else 50
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='categories-'), 'categories.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+    print(f"📦 Seeding {USERS} users x {expenses:,} expenses...")
+    user_id = seed_ledger(USERS, expenses)[0][0]
+
+    from categories import get_categories, get_category_names
+    from models import Expense
+
+    conn = database.get_shard_connection(database.get_shard(user_id))
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute('ANALYZE')
+
+    legacy = table_bytes(conn, ['legacy_expenses', 'legacy_category', 'legacy_user_category'])
+    current = table_bytes(conn, ['expenses', 'idx_expenses_user_category_id',
+                                 'categories', 'idx_categories_user_name', 'idx_categories_user'])
+    print(f"💾 Expenses plus category indexes: names {legacy / 1024:,.0f} KiB, "
+          f"ids {current / 1024:,.0f} KiB ({100 * (legacy - current) / legacy:.0f}% smaller)")
+
+    count_query, count_params = Expense.build_filter_query(
+        user_id, {'category': FILTER_CATEGORY}, 'COUNT(*), SUM(amount)'
+    )
+    cases = [
+        ('category list',
+         lambda: [row[0] for row in conn.execute(
+             'SELECT DISTINCT category FROM legacy_expenses WHERE user_id = ? ORDER BY category',
+             (user_id,))],
+         lambda: get_category_names(conn, user_id)),
+        ('category list (cached)', None, lambda: get_categories(user_id)),
+        (f'filter {FILTER_CATEGORY}',
+         lambda: tuple(conn.execute(
+             'SELECT COUNT(*), SUM(amount) FROM legacy_expenses WHERE user_id = ? AND category = ?',
+             (user_id, FILTER_CATEGORY)).fetchone()),
+         lambda: tuple(conn.execute(count_query, count_params).fetchone())),
+    ]
+    print(f"⏱️  One user, median of {iterations} calls")
+    for name, by_name, by_id in cases:
+        id_ms, result = timed(by_id, iterations)
+        if by_name is None:
+            print(f"   {name:24s} {'':22s} ids {id_ms:8.3f} ms")
+            continue
+        name_ms, expected = timed(by_name, iterations)
+        assert set(expected) <= set(result), name
+        print(f"   {name:24s} names {name_ms:8.3f} ms   ids {id_ms:8.3f} ms   "
+              f"({name_ms / id_ms:5.1f}x)")
+    conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
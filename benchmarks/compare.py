@@ -0,0 +1,49 @@
+"""
+ExpenseTracker Benchmark Compare
+Side-by-side p50/p95 and throughput of two benchmark suite result files
+
+Usage: python -m benchmarks.compare <before.json> <after.json>
+"""
+
+import json
+import sys
+
+def _change(before, after):
+    if not before or after is None:
+        return '     n/a'
+    return f'{(after - before) / before * 100:+7.1f}%'
+
+def compare(before, after):
+    """Print one line per case present in both runs"""
+    print(f"before: {before['meta'].get('git_revision')}   after: {after['meta'].get('git_revision')}")
+    for section in ('routes', 'models'):
+        print(f"\n{section}")
+        for name, old in before.get(section, {}).items():
+            new = after.get(section, {}).get(name)
+            if new is None:
+                print(f"   {name:40} (missing in after)")
+                continue
+            line = (f"   {name:40} p50 {old['p50_ms']:9.2f} -> {new['p50_ms']:9.2f} ms {_change(old['p50_ms'], new['p50_ms'])}"
+                    f"   p95 {_change(old['p95_ms'], new['p95_ms'])}")
+            if old.get('rows_per_s') and new.get('rows_per_s'):
+                line += f"   rows/s {_change(old['rows_per_s'], new['rows_per_s'])}"
+            print(line)
+
+    print("\npeak RSS (MiB)")
+    for phase, old in before.get('peak_rss_mib', {}).items():
+        new = after.get('peak_rss_mib', {}).get(phase)
+        print(f"   {phase:40} {old} -> {new}")
+
+def main(argv):
+    if len(argv) != 3:
+        print("Usage: python -m benchmarks.compare <before.json> <after.json>")
+        return 2
+    with open(argv[1]) as f:
+        before = json.load(f)
+    with open(argv[2]) as f:
+        after = json.load(f)
+    compare(before, after)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,105 @@
+"""
+ExpenseTracker Group Commit Benchmark
+Committed inserts per second versus concurrent request threads, with and without the write queue
+
+Every thread calls Expense.create_expense in a loop, as concurrent
+add_expense requests would. "direct" commits each insert on its own
+connection (GROUP_COMMIT off); "group" sends them through write_queue,
+once at each durability level. Failed writes (e.g. "database is locked")
+are counted rather than retried.
+
+Usage: python -m benchmarks.group_commit [inserts_per_thread] [output.json]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import database
+import write_queue
+
+CONCURRENCY = (1, 2, 4, 8, 16, 32)
+
+# (name, GROUP_COMMIT, WRITE_DURABILITY)
+MODES = (
+    ('direct', False, 'normal'),
+    ('group normal', True, 'normal'),
+    ('group full', True, 'full'),
+)
+
+def run_case(threads, inserts):
+    """Inserts/s and latency with ``threads`` threads doing ``inserts`` creates each"""
+    from models import Expense
+
+    latencies, errors = [], []
+
+    def worker(n):
+        samples = []
+        for i in range(inserts):
+            start = time.perf_counter()
+            expense, message = Expense.create_expense(
+                1 + n % 4, '2024-06-01', '12:00', 10000 + i, 'Group commit bench',
+                category='Groceries'
+            )
+            samples.append(time.perf_counter() - start)
+            if expense is None:
+                errors.append(message)
+        latencies.extend(samples)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ms = sorted(sample * 1000 for sample in latencies)
+    return {
+        'threads': threads,
+        'inserts': len(ms) - len(errors),
+        'errors': len(errors),
+        'inserts_per_s': round((len(ms) - len(errors)) / elapsed, 1),
+        'p50_ms': round(statistics.median(ms), 3),
+        'p99_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 3),
+    }
+
+def main(argv):
+    inserts = int(argv[1]) if len(argv) > 1 else 200
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='group-commit-'), 'group.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+
+    print(f"✍️  {inserts} create_expense calls per thread, {os.cpu_count()} CPUs")
+    results = {}
+    for name, enabled, durability in MODES:
+        write_queue.stop_writers()
+        write_queue.GROUP_COMMIT = enabled
+        write_queue.WRITE_DURABILITY = durability
+        results[name] = []
+        for threads in CONCURRENCY:
+            case = run_case(threads, inserts)
+            results[name].append(case)
+            print(f"   {name:13s} {threads:3d} threads: {case['inserts_per_s']:9,.0f} inserts/s   "
+                  f"p50 {case['p50_ms']:7.2f} ms   p99 {case['p99_ms']:7.2f} ms   "
+                  f"errors {case['errors']}")
+        if enabled:
+            stats = write_queue.get_stats()['writers'][0]
+            print(f"   {'':13s} mean group {stats['mean_group']}, largest {stats['largest_group']}")
+    write_queue.stop_writers()
+
+    if len(argv) > 2:
+        with open(argv[2], 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'inserts_per_thread': inserts,
+                       'modes': results}, f, indent=2)
+        print(f"✅ Results written to {argv[2]}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
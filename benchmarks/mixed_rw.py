@@ -0,0 +1,127 @@
+"""
+ExpenseTracker Mixed Read/Write Benchmark
+Reader and writer latency under concurrent traffic, with reads on the writer pool versus the read-only pool
+
+Reader threads loop over the analytics reads (Expense.get_statistics,
+database.get_expense_stats and a listing page) while writer threads commit
+Expense.create_expense for the same users, as a threaded worker would
+serve them. Latencies are reported separately for readers and writers,
+first with SEPARATE_READ_POOL off (everything shares the writer pool) and
+then on.
+
+Usage: python -m benchmarks.mixed_rw [seconds] [readers] [writers] [output.json]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import database
+from benchmarks.ledger import seed_ledger
+
+USERS = 4
+EXPENSES_PER_USER = 5000
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples, seconds):
+    ms = [sample * 1000 for sample in samples]
+    return {
+        'ops': len(ms),
+        'ops_per_s': round(len(ms) / seconds, 1),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms, default=0.0), 3),
+    }
+
+def run_case(user_ids, seconds, readers, writers):
+    """Run readers and writers together for ``seconds``; returns their latency summaries"""
+    from models import Expense
+
+    reads = [
+        lambda user_id: Expense.get_statistics(user_id),
+        lambda user_id: database.get_expense_stats(user_id),
+        lambda user_id: Expense.get_page_rows(user_id),
+    ]
+    read_samples, write_samples, errors = [], [], []
+    stop = threading.Event()
+
+    def reader(n):
+        samples = []
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            reads[i % len(reads)](user_ids[i % len(user_ids)])
+            samples.append(time.perf_counter() - start)
+            i += 1
+        read_samples.extend(samples)
+
+    def writer(n):
+        samples = []
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            expense, message = Expense.create_expense(
+                user_ids[i % len(user_ids)], '2024-06-01', '12:00', 10000 + i, 'Mixed bench',
+                category='Groceries'
+            )
+            samples.append(time.perf_counter() - start)
+            if expense is None:
+                errors.append(message)
+            i += 1
+        write_samples.extend(samples)
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise RuntimeError(f'{len(errors)} writes failed, e.g. {errors[0]}')
+    return {'reads': summarize(read_samples, seconds), 'writes': summarize(write_samples, seconds)}
+
+def report(name, case):
+    for kind in ('reads', 'writes'):
+        stats = case[kind]
+        print(f"   {name:20s} {kind:6s} {stats['ops_per_s']:9,.0f} ops/s   p50 {stats['p50_ms']:7.2f} ms   "
+              f"p95 {stats['p95_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms")
+
+def main(argv):
+    seconds = float(argv[1]) if len(argv) > 1 else 5.0
+    readers = int(argv[2]) if len(argv) > 2 else 8
+    writers = int(argv[3]) if len(argv) > 3 else 2
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='mixed-'), 'mixed.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+    print(f"📦 Seeding {USERS} users x {EXPENSES_PER_USER} expenses...")
+    user_ids = [user_id for user_id, _ in seed_ledger(USERS, EXPENSES_PER_USER)]
+
+    print(f"🔀 {readers} readers + {writers} writers for {seconds:g}s per case, {os.cpu_count()} CPUs")
+    results = {}
+    for name, separate in (('shared writer pool', False), ('read-only pool', True)):
+        database.SEPARATE_READ_POOL = separate
+        results[name] = run_case(user_ids, seconds, readers, writers)
+        report(name, results[name])
+
+    if len(argv) > 4:
+        with open(argv[4], 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'readers': readers, 'writers': writers,
+                       'seconds': seconds, 'cases': results}, f, indent=2)
+        print(f"✅ Results written to {argv[4]}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
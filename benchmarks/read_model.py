@@ -0,0 +1,96 @@
+"""
+ExpenseTracker Read Model Benchmark
+Expense objects versus ExpenseRow tuples on one large listing: time, rows/s and memory
+
+Seeds a throwaway database (triggers dropped, so seeding stays fast) with
+one user's expenses, then loads them with Expense.get_by_user, Expense.get_rows
+(all columns) and Expense.get_rows (listing columns).
+
+Usage: python -m benchmarks.read_model [rows]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import database
+from categories import intern_categories
+from models import EXPENSE_COLUMNS, LIST_COLUMNS, Expense
+
+USER_ID = 1
+
+def seed(rows):
+    """Create a temp database holding ``rows`` expenses for USER_ID"""
+    database.DATABASE = os.path.join(tempfile.mkdtemp(), 'read_model.db')
+    database.init_db()
+    conn = database.get_db_connection()
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        conn.execute(f'DROP TRIGGER {name}')
+    with conn:
+        intern_categories(conn, USER_ID, [f'Category {i}' for i in range(11)])
+        conn.execute(
+            """WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+               INSERT INTO expenses (user_id, expense_date, expense_time, amount, subject,
+                                     description, category_id, payment_method, created_at, updated_at)
+               SELECT ?2, date('2020-01-01', '+' || (i % 1500) || ' days'),
+                      printf('%02d:%02d', i % 24, i % 60), (i % 50000) * 10 + 100,
+                      'Expense ' || i, 'Synthetic row ' || i,
+                      (SELECT id FROM categories WHERE user_id = ?2 AND name = 'Category ' || (i % 11)),
+                      'Card', datetime('now'), datetime('now')
+               FROM n""",
+            (rows, USER_ID)
+        )
+    conn.close()
+
+def load_objects():
+    expenses, _ = Expense.get_by_user(USER_ID)
+    return expenses, [expense.to_dict() for expense in expenses[:100000]]
+
+def load_rows():
+    rows, _ = Expense.get_rows(USER_ID, columns=EXPENSE_COLUMNS)
+    return rows, [row.to_dict() for row in rows[:100000]]
+
+def load_list_rows():
+    rows, _ = Expense.get_rows(USER_ID, columns=LIST_COLUMNS)
+    return rows, [row.to_dict() for row in rows[:100000]]
+
+CASES = (
+    ('Expense objects', load_objects),
+    ('ExpenseRow, all columns', load_rows),
+    ('ExpenseRow, listing columns', load_list_rows),
+)
+
+def measure(load, rows):
+    """(seconds, peak MiB, retained MiB) for one load"""
+    gc.collect()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    assert len(result[0]) == rows
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / 2 ** 20, retained / 2 ** 20
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else 1000000
+    print(f"📦 Seeding {rows:,} expenses...")
+    seed(rows)
+
+    print(f"{'':30} {'seconds':>8} {'rows/s':>11} {'peak MiB':>9} {'kept MiB':>9}")
+    for name, load in CASES:
+        elapsed, peak, retained = measure(load, rows)
+        print(f"{name:30} {elapsed:8.2f} {rows / elapsed:11,.0f} {peak:9.1f} {retained:9.1f}")
+    print("(timings include to_dict() on the first 100,000 rows)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+"""
+ExpenseTracker Shard Scaling Benchmark
+Committed expense inserts per second from concurrent writer processes at 1, 2, 4 and 8 shards
+
+Each writer is its own process (as gunicorn workers are) and commits one
+Expense.create_expense per insert, spread round-robin over its own users.
+With one shard every commit queues on the same SQLite write lock; with N
+shards the users, and so the commits, are split over N locks. The gain
+needs a core per writer: on a single core every case runs at about the
+same rate.
+
+Usage: python -m benchmarks.shard_scaling [writes_per_writer] [writers] [output.json]
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+SHARD_COUNTS = (1, 2, 4, 8)
+
+USERS_PER_WRITER = 8
+
+def configure(path, shard_count):
+    import database
+    database.DATABASE = path
+    database.SHARD_COUNT = shard_count
+    database.SQL_INSTRUMENTATION = False
+
+def setup(path, shard_count, writers):
+    """Migrate every shard and register the writers' users; returns their ids per writer"""
+    configure(path, shard_count)
+    from database import get_directory_connection
+    from migrations import migrate
+    from sharding import assign_shard
+
+    migrate()
+    conn = get_directory_connection()
+    placement = Counter()
+    user_ids = []
+    try:
+        with conn:
+            for n in range(writers * USERS_PER_WRITER):
+                cursor = conn.execute(
+                    'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+                    (f'shard_bench_{n}', f'shard_bench_{n}@example.com', '!')
+                )
+                placement[assign_shard(conn, cursor.lastrowid)] += 1
+                user_ids.append(cursor.lastrowid)
+    finally:
+        conn.close()
+    return [user_ids[w::writers] for w in range(writers)], placement
+
+def writer(path, shard_count, user_ids, writes, start_at, results):
+    configure(path, shard_count)
+    from models import Expense
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    started = time.time()
+    for i in range(writes):
+        expense, message = Expense.create_expense(
+            user_ids[i % len(user_ids)], '2024-06-01', '12:00', 10000 + i, 'Shard bench',
+            category='Groceries'
+        )
+        if expense is None:
+            raise RuntimeError(message)
+    results.put((started, time.time(), writes))
+
+def run_case(shard_count, writers, writes):
+    """Inserts per second with ``writers`` processes over ``shard_count`` shards"""
+    path = os.path.join(tempfile.mkdtemp(prefix='shards-'), 'expense_manager.db')
+    users, placement = setup(path, shard_count, writers)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    start_at = time.time() + 2.0  # past every child's import time
+    processes = [
+        context.Process(target=writer, args=(path, shard_count, users[w], writes, start_at, results))
+        for w in range(writers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f'Writer exited with {process.exitcode}')
+
+    elapsed = max(end for _, end, _ in samples) - min(start for start, _, _ in samples)
+    total = sum(count for _, _, count in samples)
+    return {
+        'shards': shard_count,
+        'writers': writers,
+        'inserts': total,
+        'seconds': round(elapsed, 3),
+        'inserts_per_s': round(total / elapsed, 1),
+        'users_per_shard': [placement[shard] for shard in range(shard_count)],
+    }
+
+def main(argv):
+    writes = int(argv[1]) if len(argv) > 1 else 2000
+    writers = int(argv[2]) if len(argv) > 2 else max(os.cpu_count() or 1, 2)
+
+    print(f"✍️  {writers} writer processes x {writes} committed inserts, {os.cpu_count()} CPUs")
+    cases = []
+    for shard_count in SHARD_COUNTS:
+        case = run_case(shard_count, writers, writes)
+        cases.append(case)
+        speedup = case['inserts_per_s'] / cases[0]['inserts_per_s']
+        print(f"   {shard_count} shard(s): {case['inserts_per_s']:10,.0f} inserts/s "
+              f"({speedup:.2f}x)   users per shard {case['users_per_shard']}")
+
+    if len(argv) > 3:
+        with open(argv[3], 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'cases': cases}, f, indent=2)
+        print(f"✅ Results written to {argv[3]}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,93 @@
+"""
+ExpenseTracker Startup Benchmark
+Worker cold start: fresh processes importing the app and building it with create_app()
+
+Each run is a new interpreter, as a worker would be. "in-process" is the
+time from importing the app to create_app() returning; "process" adds
+interpreter startup and exit. The replay case sets user_version back to 0
+first, which costs what running init_db on every import used to.
+
+Usage: python -m benchmarks.startup [runs] [output.json]
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from migrations import SCHEMA_VERSION
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import sys, time
+start = time.perf_counter()
+import database
+database.DATABASE = sys.argv[1]
+from app import create_app
+create_app()
+print('STARTUP', time.perf_counter() - start)
+"""
+
+def start_worker(path):
+    """Start one worker process against ``path``; returns (in-process seconds, process seconds)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', WORKER, path],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP '):
+            return float(line.split()[1]), elapsed
+    raise RuntimeError(f'Worker printed no timing: {result.stdout} {result.stderr}')
+
+def reset_version(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA user_version = 0')
+    conn.close()
+
+def report(name, samples):
+    inner = [sample[0] * 1000 for sample in samples]
+    outer = [sample[1] * 1000 for sample in samples]
+    print(f"   {name:34s} in-process p50 {statistics.median(inner):8.1f} ms   "
+          f"process p50 {statistics.median(outer):8.1f} ms   (min {min(inner):.1f} ms)")
+    return {'in_process_ms': inner, 'process_ms': outer}
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else 10
+    workdir = tempfile.mkdtemp(prefix='startup-')
+    results = {}
+
+    print(f"🚀 Worker cold start, {runs} runs per case, schema version {SCHEMA_VERSION}")
+
+    samples = [start_worker(os.path.join(workdir, f'fresh_{n}.db')) for n in range(runs)]
+    results['fresh_database'] = report('fresh database (all migrations)', samples)
+
+    current = os.path.join(workdir, 'current.db')
+    start_worker(current)
+    samples = []
+    for _ in range(runs):
+        reset_version(current)
+        samples.append(start_worker(current))
+    results['replay_all_steps'] = report('replay every step (old init_db)', samples)
+
+    samples = [start_worker(current) for _ in range(runs)]
+    results['current_schema'] = report('current schema (version check)', samples)
+
+    before = statistics.median(results['replay_all_steps']['in_process_ms'])
+    after = statistics.median(results['current_schema']['in_process_ms'])
+    print(f"   version check saves {before - after:.1f} ms per worker start")
+
+    if len(argv) > 2:
+        with open(argv[2], 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {argv[2]}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
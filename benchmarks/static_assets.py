@@ -0,0 +1,84 @@
+"""
+ExpenseTracker Static Assets Benchmark
+Static requests and bytes per page load, raw /static files versus the built /assets pipeline
+
+Loads the dashboard repeatedly through the Flask test client with a small
+browser-style HTTP cache in front: a cached response is reused without a
+request while its Cache-Control allows (max-age not passed, or immutable),
+revalidated with If-None-Match otherwise, and fetched in full when it is
+not cached. The first load is a cold cache; the rest are repeat visits.
+
+Usage: python -m benchmarks.static_assets [page_loads]
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+import database
+
+ASSET_RE = re.compile(r'(?:href|src)="(/(?:static|assets)/[^"]+)"')
+HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+
+def fresh(cache_control):
+    """Whether a cached response may be reused without asking the server"""
+    directives = dict(
+        (part.strip().split('=', 1) + [''])[:2] for part in cache_control.split(',') if part.strip()
+    )
+    if 'no-cache' in directives or 'no-store' in directives:
+        return False
+    # Age is ~0 within the benchmark, so any positive max-age is fresh
+    return 'immutable' in directives or int(directives.get('max-age') or 0) > 0
+
+def page_loads(client, loads):
+    """[(static requests, 304s, static bytes)] per load of /dashboard"""
+    cache = {}
+    results = []
+    for _ in range(loads):
+        html = client.get('/dashboard').get_data(as_text=True)
+        requests = not_modified = transferred = 0
+        for url in ASSET_RE.findall(html):
+            cached = cache.get(url)
+            if cached is not None and fresh(cached['cache_control']):
+                continue
+            headers = dict(HEADERS)
+            if cached is not None and cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            response = client.get(url, headers=headers)
+            requests += 1
+            transferred += len(response.data)
+            if response.status_code == 304:
+                not_modified += 1
+            cache[url] = {'etag': response.headers.get('ETag'),
+                          'cache_control': response.headers.get('Cache-Control', '')}
+        results.append((requests, not_modified, transferred))
+    return results
+
+def main(argv):
+    loads = int(argv[1]) if len(argv) > 1 else 10
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='assets-'), 'assets.db')
+    database.SQL_INSTRUMENTATION = False
+    import assets
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    built = assets.load_manifest()
+    print(f"🌐 {loads} loads of /dashboard with a browser-style cache")
+    for name, manifest in (('raw /static', {}), ('built /assets', built)):
+        assets._manifest = manifest
+        results = page_loads(client, loads)
+        first, repeat = results[0], results[1:]
+        print(f"   {name:14s} first load: {first[0]} requests, {first[2]:7,} B   "
+              f"repeat loads: {sum(r[0] for r in repeat) / len(repeat):.1f} requests "
+              f"({sum(r[1] for r in repeat) / len(repeat):.1f} revalidations), "
+              f"{sum(r[2] for r in repeat) / len(repeat):,.0f} B each")
+    assets._manifest = built
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,128 @@
+"""
+ExpenseTracker Statistics Benchmark
+Rollup rows read, statements and time per call: one-figure-per-query statistics versus the single-pass stats service
+
+Seeds users with two years of expenses, then computes each caller's
+figures the way they were computed before stats.py (one rollups query
+per figure: Expense.get_statistics ran four, database.get_expense_stats
+three, the dashboard one) and through stats.get_expense_stats. Rows read
+are the expense_rollups rows each statement's WHERE selects, which is
+what its primary-key range visits; SQLite VM steps are counted with a
+progress handler as an independent check.
+
+Usage: python -m benchmarks.stats [expenses_per_user] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+import database
+import rollups
+from benchmarks.ledger import seed_ledger
+from date_filters import month_range
+from stats import get_expense_stats, months_back
+
+USERS = 4
+
+def old_statistics(conn, user_id):
+    """Expense.get_statistics before stats.py"""
+    month_start, month_end = month_range(date.today())
+    trend_start = months_back(date.today().strftime('%Y-%m'), 12)
+    row = rollups.get_totals(conn, user_id)
+    month = rollups.get_totals(conn, user_id, month_start, month_end)
+    return {
+        'total_expenses': row['count'], 'total_amount': row['total'],
+        'monthly_expenses': month['count'], 'monthly_amount': month['total'],
+        'categories': [dict(row) for row in rollups.get_category_totals(conn, user_id)],
+        'monthly_trend': [dict(row) for row in rollups.get_monthly_totals(conn, user_id, trend_start)],
+    }
+
+def old_expense_stats(conn, user_id):
+    """database.get_expense_stats before stats.py"""
+    month_start, month_end = month_range(date.today())
+    return (rollups.get_totals(conn, user_id)['total'],
+            rollups.get_totals(conn, user_id, month_start, month_end)['total'],
+            [(row['category'], row['total']) for row in rollups.get_category_totals(conn, user_id)])
+
+def old_dashboard(conn, user_id):
+    """The dashboard's month total before stats.py"""
+    month_start, month_end = month_range(date.today())
+    return rollups.get_totals(conn, user_id, month_start, month_end)['total']
+
+def rollup_rows(conn, user_id, month_from=None):
+    query = 'SELECT COUNT(*) FROM expense_rollups WHERE user_id = ?'
+    params = [user_id]
+    if month_from:
+        query += ' AND month >= ?'
+        params.append(month_from)
+    return conn.execute(query, params).fetchone()[0]
+
+def rows_read(conn, user_id):
+    """Rollup rows each implementation's statements select, per call"""
+    month = date.today().strftime('%Y-%m')
+    every = rollup_rows(conn, user_id)
+    this_month = rollup_rows(conn, user_id, month) - rollup_rows(conn, user_id, months_back(month, -1))
+    trend = rollup_rows(conn, user_id, months_back(month, 12))
+    return {
+        'Expense.get_statistics': (2 * every + this_month + trend, every + trend),
+        'database.get_expense_stats': (2 * every + this_month, every),
+        'dashboard month total': (this_month, rollup_rows(conn, user_id, month)),
+    }
+
+def profile(conn, fn, iterations):
+    """(statements, VM steps, median ms) for one call of ``fn(conn)``"""
+    statements, steps = [], [0]
+
+    def step():
+        steps[0] += 1
+    conn.set_trace_callback(statements.append)
+    conn.set_progress_handler(step, 1)
+    fn(conn)
+    conn.set_progress_handler(None, 1)
+    conn.set_trace_callback(None)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(conn)
+        samples.append(time.perf_counter() - start)
+    return len(statements), steps[0], statistics.median(samples) * 1000
+
+def main(argv):
+    expenses = int(argv[1]) if len(argv) > 1 else 20000
+    iterations = int(argv[2]) if len(argv) > 2 else 200
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='stats-'), 'stats.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+    print(f"📦 Seeding {USERS} users x {expenses:,} expenses...")
+    user_id = seed_ledger(USERS, expenses)[0][0]
+
+    conn = database.get_shard_connection(database.get_shard(user_id))
+    assert old_statistics(conn, user_id) == get_expense_stats(conn, user_id).to_dict()
+
+    cases = (
+        ('Expense.get_statistics', old_statistics,
+         lambda conn, user_id: get_expense_stats(conn, user_id).to_dict()),
+        ('database.get_expense_stats', old_expense_stats,
+         lambda conn, user_id: get_expense_stats(conn, user_id, trend_months=0)),
+        ('dashboard month total', old_dashboard,
+         lambda conn, user_id: get_expense_stats(conn, user_id, trend_months=0, all_time=False)),
+    )
+    rows = rows_read(conn, user_id)
+    print(f"📊 One user, {rollup_rows(conn, user_id)} rollup rows, median of {iterations} calls")
+    print(f"   {'':27} {'':7} {'statements':>10} {'rows read':>10} {'VM steps':>9} {'ms':>7}")
+    for name, old, new in cases:
+        for label, fn, read in (('before', old, rows[name][0]), ('after', new, rows[name][1])):
+            count, steps, ms = profile(conn, lambda conn: fn(conn, user_id), iterations)
+            print(f"   {name:27} {label:7} {count:10} {read:10} {steps:9,} {ms:7.3f}")
+    conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,576 @@
+"""
+ExpenseTracker Benchmark Suite
+Seeds a synthetic ledger, then times every route and model method and writes the results to JSON
+
+Each case records latency percentiles in milliseconds and, where it returns
+rows, rows per second. Peak RSS is sampled after every phase. Compare two
+runs with: python -m benchmarks.compare old.json new.json
+
+Usage: python -m benchmarks.suite [--users N] [--expenses M] [--iterations K]
+                                  [--seed S] [--output results.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import analytics
+import assets
+import budgets
+import database
+import recurring
+from money import minor_to_str
+from cache import touch_user_version
+from benchmarks.ledger import generate_expenses, seed_ledger
+
+PERCENTILES = (50, 90, 95, 99)
+
+BENCH_PASSWORD = 'bench-password'
+
+def peak_rss_mib():
+    """Peak resident set size of this process so far, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+def summarize(latencies, rows=None):
+    """Percentiles (nearest rank) and throughput for one case"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    result = {
+        'count': len(ordered),
+        'mean_ms': round(total / len(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+    for p in PERCENTILES:
+        index = max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))
+        result[f'p{p}_ms'] = round(ordered[index] * 1000, 3)
+    if rows is not None:
+        result['rows'] = rows
+        result['rows_per_s'] = round(rows / total, 1) if total else None
+    return result
+
+class Bench:
+    """Collects timings per named case"""
+
+    def __init__(self, iterations):
+        self.iterations = iterations
+        self.cases = {}
+
+    def run(self, name, fn, iterations=None, setup=None):
+        """Call fn(i) repeatedly; an int return value counts as rows produced
+
+        ``setup(i)``, if given, runs before each call and is not timed.
+        """
+        latencies = []
+        rows = None
+        for i in range(iterations or self.iterations):
+            if setup is not None:
+                setup(i)
+            start = time.perf_counter()
+            produced = fn(i)
+            latencies.append(time.perf_counter() - start)
+            if type(produced) is int:
+                rows = (rows or 0) + produced
+        self.cases[name] = summarize(latencies, rows)
+        print(f"   {name:40} p50 {self.cases[name]['p50_ms']:9.2f} ms"
+              f"   p95 {self.cases[name]['p95_ms']:9.2f} ms")
+
+def git_revision():
+    """Short commit hash of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def csv_upload(rng, rows):
+    """A CSV import file of synthetic expenses"""
+    lines = ['expense_date,expense_time,amount,subject,description,category,payment_method']
+    for record in generate_expenses(rng, rows):
+        lines.append(','.join([
+            record['expense_date'], record['expense_time'], minor_to_str(record['amount']),
+            record['subject'], record['description'] or '', record['category'],
+            record['payment_method']
+        ]))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+def url_for_asset(app, filename):
+    with app.test_request_context():
+        return assets.asset_url(filename)
+
+def bench_routes(bench, app, users, rng, options):
+    """Drive every route through the Flask test client"""
+    from models import Expense
+
+    client = app.test_client()
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+
+    def call(method, path, expected=(200,), **kwargs):
+        endpoint, _ = adapter.match(path.split('?', 1)[0], method=method)
+        covered.add(endpoint)
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code not in expected:
+            raise RuntimeError(f'{method} {path} returned {response.status_code}')
+        return response
+
+    def as_user(i):
+        user_id, username = users[i % len(users)]
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = username
+        return user_id
+
+    def get(path, expected=(200,), **kwargs):
+        def fn(i):
+            as_user(i)
+            call('GET', path, expected, **kwargs)
+        return fn
+
+    bench.run('GET /', get('/'))
+    bench.run('GET /login', get('/login'))
+    bench.run('GET /dashboard', get('/dashboard'))
+    bench.run('GET /add_expense', get('/add_expense'))
+    bench.run('GET /import_expenses', get('/import_expenses'))
+    bench.run('GET /view_expenses', get('/view_expenses'))
+    bench.run('GET /view_expenses?filter=month', get('/view_expenses?filter=month'))
+    bench.run('GET /view_expenses?sort=amount_desc', get('/view_expenses?sort=amount_desc'))
+    bench.run('GET /view_expenses?category=Groceries',
+              get('/view_expenses?category=Groceries&sort=category'))
+    bench.run('GET /view_expenses?search=', get('/view_expenses?search=lunch'))
+    bench.run('GET /view_expenses?tags= (any)', get('/view_expenses?tags=family,friends'))
+    bench.run('GET /view_expenses?tags= (all)',
+              get('/view_expenses?tags=family,friends&tag_mode=all'))
+
+    state = {}
+
+    def first_page(i):
+        as_user(i)
+        state['cursor'] = call('GET', '/api/expenses?limit=50').get_json()['next_cursor']
+
+    def second_page(i):
+        call('GET', f"/view_expenses?cursor={state['cursor']}")
+    bench.run('GET /view_expenses (page 2)', second_page, setup=first_page)
+
+    def api_page(i):
+        as_user(i)
+        return len(call('GET', '/api/expenses?limit=100').get_json()['expenses'])
+    bench.run('GET /api/expenses', api_page)
+
+    bench.run('GET /api/expenses/search', get('/api/expenses/search?q=bill'))
+    bench.run('GET /api/tags', get('/api/tags'))
+
+    def export(export_format):
+        def fn(i):
+            as_user(i)
+            body = call('GET', f'/api/expenses/export?format={export_format}').get_data()
+            return body.count(b'\n') - (1 if export_format == 'csv' else 0)
+        return fn
+    bench.run('GET /api/expenses/export?format=csv', export('csv'))
+    bench.run('GET /api/expenses/export?format=jsonl', export('jsonl'))
+
+    def invalidate(i):
+        touch_user_version(as_user(i))
+
+    bench.run('GET /api/expenses/summary (miss)',
+              lambda i: call('GET', '/api/expenses/summary'), setup=invalidate)
+
+    bench.run('GET /api/expenses/summary (hit)', get('/api/expenses/summary'))
+
+    def fetch_etag(i):
+        as_user(i)
+        state['etag'] = call('GET', '/api/expenses/summary').headers['ETag']
+
+    bench.run('GET /api/expenses/summary (304)',
+              lambda i: call('GET', '/api/expenses/summary', (304,),
+                             headers={'If-None-Match': state['etag']}),
+              setup=fetch_etag)
+
+    analytics_path = '/api/expenses/analytics?window=30&from=' + \
+        (date.today() - timedelta(days=364)).isoformat()
+
+    # 501 without numpy
+    analytics_status = (200,) if analytics.AVAILABLE else (501,)
+
+    bench.run('GET /api/expenses/analytics (load)',
+              lambda i: call('GET', analytics_path, analytics_status), setup=invalidate)
+
+    def write_one(i):
+        expense, message = Expense.create_expense(
+            as_user(i), date.today().isoformat(), '09:15', 12000, 'Bench analytics',
+            category='Food & Dining'
+        )
+        if expense is None:
+            raise RuntimeError(message)
+    bench.run('GET /api/expenses/analytics (refresh)',
+              lambda i: call('GET', analytics_path, analytics_status), setup=write_one)
+
+    bench.run('GET /api/expenses/analytics (hit)', get(analytics_path, analytics_status))
+
+    stylesheet = url_for_asset(app, 'css/style.css')
+    bench.run('GET /assets/ (css, br/gzip)',
+              lambda i: call('GET', stylesheet, headers={'Accept-Encoding': 'gzip, br'}))
+
+    bench.run('GET /api/cache/stats', get('/api/cache/stats'))
+    bench.run('GET /api/db/pool', get('/api/db/pool'))
+    bench.run('GET /api/auth/pool', get('/api/auth/pool'))
+    bench.run('GET /metrics', get('/metrics'))
+
+    # Every user gets an overall monthly budget, so add_expense below also checks alerts
+    budget_ids = {}
+
+    def create_budget(i, category='All', amount='80000'):
+        user_id = as_user(i)
+        budget_ids[user_id] = call('POST', '/api/budgets', (201,), json={
+            'category': category, 'amount': amount, 'period': 'monthly'
+        }).get_json()['id']
+    for i in range(len(users)):
+        create_budget(i)
+
+    def budget_item(method, **kwargs):
+        def fn(i):
+            user_id = as_user(i)
+            call(method, f'/api/budgets/{budget_ids[user_id]}', **kwargs)
+        return fn
+
+    bench.run('POST /api/budgets', lambda i: create_budget(i, 'Groceries', '12000'),
+              options.write_iterations)
+    bench.run('GET /api/budgets', get('/api/budgets'))
+    bench.run('GET /api/budgets/<id>', budget_item('GET'))
+    bench.run('PUT /api/budgets/<id>', budget_item('PUT', json={'alert_percent': 90}),
+              options.write_iterations)
+    bench.run('DELETE /api/budgets/<id>', budget_item('DELETE'), options.write_iterations,
+              setup=lambda i: create_budget(i, 'Travel', '30000'))
+
+    rule_ids = {}
+
+    def create_rule(i):
+        user_id = as_user(i)
+        rule_ids[user_id] = call('POST', '/api/recurring', (201,), json={
+            'frequency': 'monthly', 'start_date': date.today().isoformat(), 'amount': '1500',
+            'subject': 'Bench subscription', 'category': 'Bills & Utilities'
+        }).get_json()['id']
+    bench.run('POST /api/recurring', create_rule, options.write_iterations)
+    bench.run('GET /api/recurring', get('/api/recurring'))
+    bench.run('GET /api/recurring/scheduler', get('/api/recurring/scheduler'))
+    bench.run('DELETE /api/recurring/<id>',
+              lambda i: call('DELETE', f'/api/recurring/{rule_ids[as_user(i)]}'),
+              options.write_iterations, setup=create_rule)
+
+    def add_expense(i):
+        as_user(i)
+        call('POST', '/add_expense', (302,), data={
+            'expense_date': date.today().isoformat(), 'expense_time': '12:30',
+            'amount': '249.50', 'subject': 'Bench lunch', 'description': '',
+            'category': 'Food & Dining'
+        })
+    bench.run('POST /add_expense', add_expense)
+
+    upload = csv_upload(rng, options.import_rows)
+
+    def import_expenses(i):
+        as_user(i)
+        call('POST', '/import_expenses', data={'file': (io.BytesIO(upload), 'bench.csv')},
+             content_type='multipart/form-data')
+        return options.import_rows
+    bench.run('POST /import_expenses', import_expenses, options.write_iterations)
+
+    # Versioned JSON API: each request carries --batch-items items in one transaction
+    def api_items(count):
+        return [dict(record, amount=minor_to_str(record['amount']))
+                for record in generate_expenses(rng, count)]
+    batch_ids = {}
+
+    def batch_create(i):
+        user_id = as_user(i)
+        results = call('POST', '/api/v1/expenses',
+                       json=api_items(options.batch_items)).get_json()['results']
+        batch_ids[user_id] = [result['id'] for result in results]
+        return len(results)
+    bench.run('POST /api/v1/expenses', batch_create, options.write_iterations)
+
+    def api_v1_page(i):
+        as_user(i)
+        return len(call('GET', '/api/v1/expenses?limit=100').get_json()['expenses'])
+    bench.run('GET /api/v1/expenses', api_v1_page)
+
+    def batch_patch(i):
+        user_id = as_user(i)
+        call('PATCH', '/api/v1/expenses',
+             json=[{'id': expense_id, 'amount': '99.50'} for expense_id in batch_ids[user_id]])
+        return len(batch_ids[user_id])
+    bench.run('PATCH /api/v1/expenses', batch_patch, options.write_iterations)
+
+    def batch_delete(i):
+        user_id = as_user(i)
+        call('DELETE', '/api/v1/expenses', json=batch_ids[user_id])
+        return len(batch_ids[user_id])
+    bench.run('DELETE /api/v1/expenses', batch_delete, options.write_iterations, setup=batch_create)
+
+    def batch_mixed(i):
+        user_id = as_user(i)
+        third = options.batch_items // 3
+        ids = batch_ids[user_id]
+        call('POST', '/api/v1/expenses/batch', json={
+            'create': api_items(third),
+            'update': [{'id': expense_id, 'category': 'Other'} for expense_id in ids[:third]],
+            'delete': ids[third:2 * third],
+        })
+        return 3 * third
+    bench.run('POST /api/v1/expenses/batch', batch_mixed, options.write_iterations,
+              setup=batch_create)
+
+    # The KDF dominates these; they measure the hashing pool, not the database
+    def login(i):
+        _, username = users[i % len(users)]
+        call('POST', '/login', (302,), data={'username': username, 'password': BENCH_PASSWORD})
+    bench.run('POST /login', login, options.auth_iterations)
+
+    def register(i):
+        name = f'bench_register_{i}_{rng.randrange(10 ** 9)}'
+        call('POST', '/register', (302,), data={
+            'username': name, 'email': f'{name}@example.com', 'password': BENCH_PASSWORD
+        })
+    bench.run('POST /register', register, options.auth_iterations)
+
+    def logout(i):
+        as_user(i)
+        call('GET', '/logout', (302,))
+    bench.run('GET /logout', logout)
+
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint != 'static' and rule.endpoint not in covered)
+    if missing:
+        print(f"⚠️  Routes without a benchmark: {', '.join(missing)}")
+    return missing
+
+def bench_models(bench, users, rng, options):
+    """Call every models.py method (and the database helpers) directly"""
+    from models import (Budget, Expense, User, format_currency, get_expense_categories,
+                        validate_budget_data, validate_expense_batch, validate_expense_data)
+
+    def user_id(i):
+        return users[i % len(users)][0]
+
+    bench.run('Expense.get_by_user', lambda i: len(Expense.get_by_user(user_id(i))[0]))
+    bench.run('Expense.get_by_user (limit 50)',
+              lambda i: len(Expense.get_by_user(user_id(i), limit=50)[0]))
+    bench.run('Expense.get_by_user (filtered)', lambda i: len(Expense.get_by_user(
+        user_id(i), filters={'period': 'year', 'category': 'Groceries', 'sort_by': 'amount_desc'}
+    )[0]))
+    bench.run('Expense.get_by_user (tags, all)', lambda i: len(Expense.get_by_user(
+        user_id(i), filters={'tags': ['office', 'planned'], 'tag_mode': 'all'}
+    )[0]))
+    bench.run('Expense.get_rows', lambda i: len(Expense.get_rows(user_id(i))[0]))
+    bench.run('Expense.get_page', lambda i: len(Expense.get_page(user_id(i))[0]))
+    bench.run('Expense.get_page_rows', lambda i: len(Expense.get_page_rows(user_id(i))[0]))
+    bench.run('Expense.build_filter_query',
+              lambda i: Expense.build_filter_query(user_id(i), {'period': 'month', 'search': 'tea'})
+             )
+    bench.run('Expense.get_statistics', lambda i: Expense.get_statistics(user_id(i)))
+    bench.run('database.get_expense_stats',
+              lambda i: database.get_expense_stats(user_id(i)))
+    bench.run('Budget.get_by_user', lambda i: len(Budget.get_by_user(user_id(i))))
+    bench.run('Budget.evaluate_all', lambda i: len(Budget.evaluate_all(user_id(i))[0]))
+
+    def check_alerts(i):
+        conn = database.get_db_connection(user_id(i))
+        try:
+            return budgets.check_alerts(conn, user_id(i), 'Groceries', date.today().isoformat(), 12000)
+        finally:
+            conn.close()
+    bench.run('budgets.check_alerts', check_alerts)
+    # One pass over every user's due rules, each a month behind on a daily schedule
+    def due_rules(i):
+        start = (date.today() - timedelta(days=29)).isoformat()
+        for n in range(options.recurring_rules):
+            conn = database.get_db_connection(user_id(n))
+            try:
+                recurring.create_rule(conn, user_id(n), 'daily', start, '07:00', 4000,
+                                      'Bench milk', category='Groceries')
+                conn.commit()
+            finally:
+                conn.close()
+
+    def materialize(i):
+        return recurring.scheduler.tick()[1]
+    bench.run('recurring.materialize_due', materialize, options.write_iterations, setup=due_rules)
+    bench.run('validate_budget_data', lambda i: validate_budget_data(
+        {'category': 'Groceries', 'amount': 500000, 'period': 'weekly', 'start_date': '2024-01-01'},
+        user_id(i)
+    ))
+
+    created = []
+
+    def create_expense(i):
+        expense, message = Expense.create_expense(
+            user_id(i), date.today().isoformat(), '09:15', 12000, 'Bench coffee',
+            category='Food & Dining'
+        )
+        if expense is None:
+            raise RuntimeError(message)
+        created.append(expense.id)
+    bench.run('Expense.create_expense', create_expense)
+
+    bench.run('Expense.get_by_id', lambda i: Expense.get_by_id(created[i % len(created)]))
+
+    def update(i):
+        expense = Expense.get_by_id(created[i % len(created)])
+        ok, message = expense.update(amount=13500, description='updated')
+        if not ok:
+            raise RuntimeError(message)
+    bench.run('Expense.update', update)
+
+    def delete(i):
+        expense = Expense.get_by_id(created[i])
+        ok, message = expense.delete()
+        if not ok:
+            raise RuntimeError(message)
+    bench.run('Expense.delete', delete, len(created))
+
+    def bulk_create(i):
+        inserted, errors, message = Expense.bulk_create(
+            user_id(i), generate_expenses(rng, options.import_rows)
+        )
+        if inserted != options.import_rows:
+            raise RuntimeError(message)
+        return inserted
+    bench.run('Expense.bulk_create', bulk_create, options.write_iterations)
+
+    def apply_batch(i):
+        records = list(generate_expenses(rng, options.batch_items))
+        results, applied, message = Expense.apply_batch(user_id(i), creates=records)
+        if applied != len(records):
+            raise RuntimeError(message)
+        return applied
+    bench.run('Expense.apply_batch', apply_batch, options.write_iterations)
+
+    batch = list(generate_expenses(rng, 1000))
+    bench.run('validate_expense_batch (1000)', lambda i: validate_expense_batch(batch))
+    bench.run('validate_expense_data', lambda i: validate_expense_data(batch[i % len(batch)]))
+    bench.run('format_currency', lambda i: format_currency(i * 1.5))
+    bench.run('get_expense_categories', lambda i: get_expense_categories())
+    bench.run('get_expense_categories (user)', lambda i: get_expense_categories(user_id(i)))
+
+    bench.run('User.get_by_id', lambda i: User.get_by_id(user_id(i)))
+    bench.run('User.to_dict', lambda i: User.get_by_id(user_id(i)).to_dict())
+
+    def authenticate(i):
+        user, message = User.authenticate(users[i % len(users)][1], BENCH_PASSWORD)
+        if user is None:
+            raise RuntimeError(message)
+    bench.run('User.authenticate', authenticate, options.auth_iterations)
+
+    def create_user(i):
+        name = f'bench_model_{i}_{rng.randrange(10 ** 9)}'
+        user, message = User.create_user(name, f'{name}@example.com', BENCH_PASSWORD)
+        if user is None:
+            raise RuntimeError(message)
+    bench.run('User.create_user', create_user, options.auth_iterations)
+
+    def update_password(i):
+        user = User.get_by_id(user_id(i))
+        ok, message = user.update_password(BENCH_PASSWORD)
+        if not ok:
+            raise RuntimeError(message)
+    bench.run('User.update_password', update_password, options.auth_iterations)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='ExpenseTracker benchmark suite')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--expenses', type=int, default=5000, help='expenses per user')
+    parser.add_argument('--days', type=int, default=730, help='history length in days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=30, help='runs per read case')
+    parser.add_argument('--write-iterations', type=int, default=5, help='runs per bulk write case')
+    parser.add_argument('--auth-iterations', type=int, default=3, help='runs per password-hashing case')
+    parser.add_argument('--import-rows', type=int, default=1000, help='rows per import/bulk_create run')
+    parser.add_argument('--batch-items', type=int, default=200,
+                        help='items per /api/v1/expenses batch request')
+    parser.add_argument('--recurring-rules', type=int, default=200,
+                        help='due rules (30 instances each) per materialize_due run')
+    parser.add_argument('--database', help='database file (default: a temporary file)')
+    parser.add_argument('--output', default='bench_results.json')
+    return parser.parse_args(argv)
+
+def main(argv):
+    options = parse_args(argv)
+    rng = random.Random(options.seed)
+
+    database.DATABASE = options.database or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    if os.path.exists(database.DATABASE):
+        print(f"❌ {database.DATABASE} already exists; the suite needs a fresh database")
+        return 2
+
+    # Building the app migrates the benchmark database
+    from app import create_app
+    app = create_app()
+    from auth import hash_password
+
+    results = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': vars(options),
+        },
+        'peak_rss_mib': {'startup': peak_rss_mib()},
+    }
+
+    total = options.users * options.expenses
+    print(f"📦 Seeding {options.users} users x {options.expenses} expenses (seed {options.seed})...")
+    password_hash = hash_password(BENCH_PASSWORD)
+    start = time.perf_counter()
+    users = seed_ledger(options.users, options.expenses, options.seed, options.days, password_hash)
+    elapsed = time.perf_counter() - start
+    for shard in database.all_shards():
+        conn = database.get_shard_connection(shard)
+        conn.execute('ANALYZE')
+        conn.close()
+    results['seed'] = {'rows': total, 'seconds': round(elapsed, 3),
+                       'rows_per_s': round(total / elapsed, 1)}
+    results['peak_rss_mib']['seed'] = peak_rss_mib()
+    print(f"   {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+    print("🌐 Routes")
+    routes = Bench(options.iterations)
+    results['routes_not_benchmarked'] = bench_routes(routes, app, users, rng, options)
+    results['routes'] = routes.cases
+    results['peak_rss_mib']['routes'] = peak_rss_mib()
+
+    print("🧩 Models")
+    models = Bench(options.iterations)
+    bench_models(models, users, rng, options)
+    results['models'] = models.cases
+    results['peak_rss_mib']['models'] = peak_rss_mib()
+
+    with open(options.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {options.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
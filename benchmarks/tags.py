@@ -0,0 +1,127 @@
+"""
+ExpenseTracker Tags Benchmark
+Tag filters and per-tag totals from the normalized tag index versus scanning the tags text
+
+Seeds users with tagged expenses, then filters one user's expenses by two
+tags (any / all) and computes their per-tag totals: once by reading every
+one of the user's tagged rows and splitting the text (what matching on
+expenses.tags takes), once through tagging's index. Both ways are checked
+to agree. Also reports what the triggers add to a bulk insert.
+
+Usage: python -m benchmarks.tags [expenses_per_user] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import database
+from benchmarks.ledger import generate_expenses, seed_ledger
+
+USERS = 4
+FILTER_TAGS = ['family', 'friends']
+
+def scan_filter(conn, user_id, tags, mode):
+    """Expense ids tagged with any/all of ``tags``, from the tags text"""
+    from tagging import parse_tags
+    wanted = set(tags)
+    ids = set()
+    for expense_id, text in conn.execute(
+            "SELECT id, tags FROM expenses WHERE user_id = ? AND tags != ''", (user_id,)):
+        found = wanted.intersection(parse_tags(text))
+        if found and (mode == 'any' or found == wanted):
+            ids.add(expense_id)
+    return ids
+
+def index_filter(conn, user_id, tags, mode):
+    from models import Expense
+    query, params = Expense.build_filter_query(user_id, {'tags': tags, 'tag_mode': mode}, 'id')
+    return {row[0] for row in conn.execute(query, params)}
+
+def scan_totals(conn, user_id):
+    from tagging import parse_tags
+    totals = {}
+    for text, amount in conn.execute(
+            "SELECT tags, amount FROM expenses WHERE user_id = ? AND tags != ''", (user_id,)):
+        for tag in parse_tags(text):
+            count, total = totals.get(tag, (0, 0))
+            totals[tag] = (count + 1, total + amount)
+    return totals
+
+def index_totals(conn, user_id):
+    from tagging import get_tag_totals
+    return {row['tag']: (row['count'], row['total']) for row in get_tag_totals(conn, user_id)}
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+def insert_cost(conn, user_id, rows):
+    """Seconds to insert ``rows`` in one transaction (rolled back)"""
+    from categories import intern_categories
+    category_ids = intern_categories(conn, user_id, [row['category'] for row in rows])
+    values = [dict(row, user_id=user_id, category_id=category_ids[row['category']]) for row in rows]
+    start = time.perf_counter()
+    conn.executemany(
+        """INSERT INTO expenses (user_id, expense_date, expense_time, amount, subject,
+                                 description, category_id, payment_method, tags)
+           VALUES (:user_id, :expense_date, :expense_time, :amount, :subject,
+                   :description, :category_id, :payment_method, :tags)""",
+        values
+    )
+    elapsed = time.perf_counter() - start
+    conn.rollback()
+    return elapsed
+
+def main(argv):
+    expenses = int(argv[1]) if len(argv) > 1 else 20000
+    iterations = int(argv[2]) if len(argv) > 2 else 20
+
+    database.DATABASE = os.path.join(tempfile.mkdtemp(prefix='tags-'), 'tags.db')
+    database.SQL_INSTRUMENTATION = False
+    from migrations import migrate
+    migrate()
+    print(f"📦 Seeding {USERS} users x {expenses:,} expenses...")
+    user_id = seed_ledger(USERS, expenses)[0][0]
+
+    conn = database.get_shard_connection(database.get_shard(user_id))
+    tagged = conn.execute(
+        "SELECT COUNT(*) FROM expenses WHERE user_id = ? AND tags != ''", (user_id,)
+    ).fetchone()[0]
+    print(f"🏷️  One user, {tagged:,} tagged expenses, median of {iterations} calls")
+
+    cases = [(f"filter {'+'.join(FILTER_TAGS)} ({mode})",
+              lambda mode=mode: scan_filter(conn, user_id, FILTER_TAGS, mode),
+              lambda mode=mode: index_filter(conn, user_id, FILTER_TAGS, mode))
+             for mode in ('any', 'all')]
+    cases.append(('per-tag totals', lambda: scan_totals(conn, user_id),
+                  lambda: index_totals(conn, user_id)))
+    for name, scan, index in cases:
+        scan_ms, expected = timed(scan, iterations)
+        index_ms, result = timed(index, iterations)
+        assert result == expected, name
+        print(f"   {name:26s} scan {scan_ms:8.2f} ms   index {index_ms:8.2f} ms   "
+              f"({scan_ms / index_ms:5.1f}x, {len(result):,} results)")
+
+    import random
+    rows = list(generate_expenses(random.Random(7), 5000))
+    with_triggers = insert_cost(conn, user_id, rows)
+    conn.executescript("""
+        DROP TRIGGER trg_expenses_tags_insert;
+        DROP TRIGGER trg_expenses_tags_delete;
+        DROP TRIGGER trg_expenses_tags_update;
+    """)
+    without = insert_cost(conn, user_id, rows)
+    print(f"   bulk insert of {len(rows):,} rows: {without * 1000:.0f} ms without the tag "
+          f"triggers, {with_triggers * 1000:.0f} ms with them")
+    conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,136 @@
+"""
+ExpenseTracker Budgets
+Budget-vs-actual for weekly, monthly and yearly budgets, read from the rollup counters
+
+Spend is never re-summed from expenses: a weekly budget reads one
+expense_week_rollups row, a monthly budget one expense_rollups row and a
+yearly budget at most twelve (one category per month). Budgets with
+category 'All' add up every category of the period instead.
+"""
+
+from datetime import date, timedelta
+
+import rollups
+from date_filters import month_range, year_range
+
+BUDGET_PERIODS = ('weekly', 'monthly', 'yearly')
+
+# Budgets on this category count every expense
+ALL_CATEGORIES = 'All'
+
+# Alert once spend crosses this share of the budget, unless the budget sets its own
+DEFAULT_ALERT_PERCENT = 80
+
+def _as_date(value):
+    """A date from a YYYY-MM-DD string, date or datetime (None stays None)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value.date() if hasattr(value, 'date') else value
+
+def period_window(period, day):
+    """Half-open (start, end) dates of the budget period containing ``day``
+
+    Weeks run Monday to Sunday, months and years are calendar ones.
+    """
+    day = _as_date(day)
+    if period == 'weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'monthly':
+        start, end = month_range(day)
+    elif period == 'yearly':
+        start, end = year_range(day.year)
+    else:
+        raise ValueError(f'Unknown budget period: {period!r}')
+    return date.fromisoformat(start), date.fromisoformat(end)
+
+def period_spend(conn, user_id, period, category, day):
+    """Paise spent in the period containing ``day`` (category None or 'All' for everything)"""
+    start, end = period_window(period, day)
+    if category == ALL_CATEGORIES:
+        category = None
+    if period == 'weekly':
+        return rollups.get_week_totals(conn, user_id, start.isoformat(), category)['total']
+    return rollups.get_totals(conn, user_id, start.isoformat(), end.isoformat(), category)['total']
+
+def budget_status(amount, spent, alert_percent):
+    """'exceeded', 'warning' or 'ok' for ``spent`` paise against an ``amount`` budget"""
+    if spent > amount:
+        return 'exceeded'
+    if spent * 100 >= amount * alert_percent:
+        return 'warning'
+    return 'ok'
+
+def evaluate_budget(conn, budget, day=None):
+    """Budget-vs-actual for the period containing ``day`` (default today)
+
+    ``budget`` is a budgets row. Amounts in the result are paise.
+    """
+    day = _as_date(day) or date.today()
+    start, end = period_window(budget['period'], day)
+    spent = period_spend(conn, budget['user_id'], budget['period'], budget['category'], day)
+    alert_percent = budget['alert_percent'] or DEFAULT_ALERT_PERCENT
+    return {
+        'budget_id': budget['id'],
+        'category': budget['category'],
+        'period': budget['period'],
+        'period_start': start.isoformat(),
+        'period_end': (end - timedelta(days=1)).isoformat(),
+        'amount': budget['amount'],
+        'spent': spent,
+        'remaining': budget['amount'] - spent,
+        'percent_used': round(spent * 100 / budget['amount'], 1) if budget['amount'] else None,
+        'alert_percent': alert_percent,
+        'status': budget_status(budget['amount'], spent, alert_percent),
+    }
+
+def active_budgets(conn, user_id, day, category=None):
+    """Budgets in force on ``day``; with ``category``, only those it counts towards"""
+    day = _as_date(day).isoformat()
+    query = """SELECT * FROM budgets
+               WHERE user_id = ? AND start_date <= ? AND (end_date IS NULL OR end_date >= ?)"""
+    params = [user_id, day, day]
+    if category is not None:
+        query += ' AND category IN (?, ?)'
+        params.extend([category, ALL_CATEGORIES])
+    return conn.execute(query + ' ORDER BY category, period', params).fetchall()
+
+def evaluate_budgets(conn, user_id, day=None):
+    """Budget-vs-actual for every budget in force on ``day`` (default today)"""
+    day = _as_date(day) or date.today()
+    return [evaluate_budget(conn, budget, day) for budget in active_budgets(conn, user_id, day)]
+
+def check_alerts(conn, user_id, category, expense_date, amount):
+    """Alerts raised by an expense that has just been written
+
+    Only budgets the expense counts towards are read, each with one counter
+    lookup. A budget alerts when this expense moved it across its alert
+    threshold or past its amount, so the same budget doesn't alert again
+    on every later expense of the period.
+    """
+    alerts = []
+    for budget in active_budgets(conn, user_id, expense_date, category or 'Other'):
+        evaluation = evaluate_budget(conn, budget, expense_date)
+        before = budget_status(budget['amount'], evaluation['spent'] - amount,
+                               evaluation['alert_percent'])
+        if evaluation['status'] != 'ok' and evaluation['status'] != before:
+            alerts.append(evaluation)
+    return alerts
+
+STATUS_ORDER = ('ok', 'warning', 'exceeded')
+
+def summarize(evaluations):
+    """(paise left this month, worst status) for the dashboard, or (None, None) without budgets
+
+    An 'All' monthly budget caps everything, so it wins over the sum of
+    the monthly category budgets.
+    """
+    if not evaluations:
+        return None, None
+    monthly = [e for e in evaluations if e['period'] == 'monthly']
+    overall = [e for e in monthly if e['category'] == ALL_CATEGORIES]
+    remaining = sum(e['remaining'] for e in (overall or monthly)) if monthly else None
+    worst = max((e['status'] for e in evaluations), key=STATUS_ORDER.index)
+    return remaining, worst
@@ -0,0 +1,270 @@
+"""
+ExpenseTracker Cache
+Per-user versioned response cache: an in-process LRU with TTL and an optional shared on-disk tier
+
+Every cached entry is keyed by (user_id, name, data version). The version is
+a per-user counter in the user's shard (user_data_versions), bumped by
+triggers in the same transaction as every expense write, so each worker
+process sees every other worker's writes and stale entries are never
+served; they simply age out.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from database import get_db_connection, get_read_connection, get_shard
+
+# Set to a directory path to share cached bodies between worker processes
+SHARED_CACHE_DIR = None
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300.0
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key):
+        """Get a live entry (refreshing its recency) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        """Store an entry, evicting the least recently used beyond max_entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class DiskCache:
+    """Shared file-backed cache tier; values are bytes, expiry uses file mtime"""
+
+    def __init__(self, directory, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def read(self, key, ttl=None):
+        """Read raw bytes for a key, ignoring entries older than the TTL"""
+        path = self._path(key)
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            if ttl and time.time() - os.path.getmtime(path) > ttl:
+                self.stats['misses'] += 1
+                return None
+            with open(path, 'rb') as f:
+                value = f.read()
+            self.stats['hits'] += 1
+            return value
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except OSError:
+            self.stats['errors'] += 1
+            return None
+
+    def write(self, key, value):
+        """Atomically write raw bytes for a key"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self.stats['errors'] += 1
+
+# A user's first version is the creation time in microseconds, so a recreated
+# database can't hand out versions (and ETags) that an old one already used
+_BUMP_VERSION_SQL = """
+    INSERT INTO user_data_versions (user_id, version)
+    SELECT {user_id}, CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER) {where}
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+"""
+
+def _bump_version_sql(user_id, where='WHERE true'):
+    return _BUMP_VERSION_SQL.format(user_id=user_id, where=where)
+
+# Rows stay behind when a user moves shard: the versions the old shard handed
+# out must not repeat if the user ever moves back
+DATA_VERSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS user_data_versions (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_version_insert
+    AFTER INSERT ON expenses
+    BEGIN
+        {_bump_version_sql('NEW.user_id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_version_delete
+    AFTER DELETE ON expenses
+    BEGIN
+        {_bump_version_sql('OLD.user_id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_version_update
+    AFTER UPDATE ON expenses
+    BEGIN
+        {_bump_version_sql('NEW.user_id')};
+        {_bump_version_sql('OLD.user_id', 'WHERE OLD.user_id IS NOT NEW.user_id')};
+    END
+    """,
+]
+
+# Everyone with data on the shard moves to a new version (a fresh row starts from the clock)
+_BUMP_ALL_VERSIONS_SQL = _bump_version_sql(
+    'user_id', 'FROM (SELECT user_id FROM expenses UNION SELECT user_id FROM categories) WHERE true'
+)
+
+def create_data_version_schema(conn):
+    """Create the per-user version table and the expense triggers that bump it
+
+    Also bumps every user already on the shard: earlier migrations rewrote
+    expenses without moving any version, so nothing cached before this
+    step may be served after it.
+    """
+    for statement in DATA_VERSION_SCHEMA:
+        conn.execute(statement)
+    conn.execute(_BUMP_ALL_VERSIONS_SQL)
+
+def read_data_version(conn, user_id):
+    """A user's version counter on ``conn``'s shard (0 before their first write)"""
+    row = conn.execute(
+        'SELECT version FROM user_data_versions WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    return row[0] if row else 0
+
+def read_user_version(user_id):
+    """(shard, version counter) for a user: one primary-key read on their shard
+
+    The shard is part of the version since each shard counts on its own.
+    Every expense row a write inserts, updates or deletes adds one to the
+    counter.
+    """
+    conn = get_read_connection(user_id)
+    try:
+        return get_shard(user_id), read_data_version(conn, user_id)
+    finally:
+        conn.close()
+
+class VersionedCache:
+    """Per-user cache whose keys include the user's current data version"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, shared_dir=SHARED_CACHE_DIR):
+        self.memory = LRUCache(max_entries, ttl)
+        self.disk = DiskCache(shared_dir, ttl) if shared_dir else None
+
+    def version(self, user_id):
+        """Current data version token for a user (see read_user_version)"""
+        return '%d.%d' % read_user_version(user_id)
+
+    def etag(self, user_id, name, version):
+        """Strong ETag value for a named response at a data version"""
+        raw = f'{name}:{user_id}:{version}'.encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def get(self, user_id, name, version):
+        """Cached bytes for a named response at a data version, or None
+
+        Callers read ``version`` once, before querying, and pass the same
+        value to set(); a write that lands mid-request then can't get old
+        data filed under its new version.
+        """
+        key = f'{name}:{user_id}:{version}'
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.read(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, user_id, name, version, value):
+        """Cache bytes for a named response at a data version"""
+        key = f'{name}:{user_id}:{version}'
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.write(key, value)
+
+    def get_stats(self):
+        """Hit/miss counters for both tiers"""
+        stats = {
+            'memory': dict(self.memory.stats, entries=len(self.memory),
+                           max_entries=self.memory.max_entries),
+        }
+        if self.disk is not None:
+            stats['disk'] = dict(self.disk.stats, directory=self.disk.directory)
+        return stats
+
+# Shared instance used by the routes; expense writes move it to new versions
+summary_cache = VersionedCache()
+
+_bump_listeners = []
+
+def on_version_bump(listener):
+    """Call ``listener(user_id, expense_ids)`` after every bump_user_version"""
+    _bump_listeners.append(listener)
+
+def bump_user_version(user_id, expense_ids=None):
+    """Tell this process's listeners that a user's expense data changed
+
+    Call after the write commits. The version itself already moved, in the
+    write's own transaction (see DATA_VERSION_SCHEMA). ``expense_ids`` names
+    the rows written (inserted, updated or deleted), one per row the write
+    changed, when the caller knows them; None means anything may have
+    changed.
+    """
+    for listener in _bump_listeners:
+        listener(user_id, expense_ids)
+
+def touch_user_version(user_id):
+    """Move a user to a new data version without writing any expenses"""
+    conn = get_db_connection(user_id)
+    try:
+        conn.execute(_bump_version_sql('?'), (user_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    bump_user_version(user_id)
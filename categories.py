@@ -0,0 +1,242 @@
+"""
+ExpenseTracker Categories
+Per-user category lists in the categories table, referenced from expenses by integer id
+
+An expense stores category_id; its name lives once per user in
+``categories`` (unique on user_id, name). Writes turn names into ids with
+intern_categories, which creates missing categories on the fly and gives
+a user the DEFAULT_CATEGORIES first, in that order, so "sort by category"
+(an index walk over category_id) follows the category list. Reads get the
+name back with category_name_sql, a primary-key lookup per row.
+
+Usage: python categories.py [status|run]
+"""
+
+import json
+import sys
+
+from cache import summary_cache
+from database import all_shards, get_read_connection, get_shard_connection
+
+DEFAULT_CATEGORIES = (
+    'Food & Dining',
+    'Transportation',
+    'Shopping',
+    'Bills & Utilities',
+    'Entertainment',
+    'Healthcare',
+    'Education',
+    'Travel',
+    'Groceries',
+    'Gas',
+    'Other',
+)
+
+# What an expense without a category counts as (rollups have always used it)
+DEFAULT_CATEGORY = 'Other'
+
+# Expenses per transaction when converting the category column
+CATEGORY_BATCH_SIZE = 5000
+
+CATEGORY_NAME_SQL = '(SELECT name FROM categories WHERE categories.id = {column})'
+
+CATEGORY_SCHEMA = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_categories_user_name ON categories(user_id, name)",
+    # A user's list in id order (index entries end on the rowid)
+    "CREATE INDEX IF NOT EXISTS idx_categories_user ON categories(user_id)",
+    # Listing filters and the category sort order seek this
+    "CREATE INDEX IF NOT EXISTS idx_expenses_user_category_id "
+    "ON expenses(user_id, category_id, expense_date DESC, id DESC)",
+]
+
+# The user's defaults, in list order, unless they already have categories
+_SEED_DEFAULTS_SQL = """
+    INSERT OR IGNORE INTO categories (user_id, name)
+    SELECT ?1, value FROM json_each(?2)
+    WHERE NOT EXISTS (SELECT 1 FROM categories WHERE user_id = ?1)
+    ORDER BY key
+"""
+
+def category_name_sql(column='expenses.category_id'):
+    """SQL expression for the category name of ``column``"""
+    return CATEGORY_NAME_SQL.format(column=column)
+
+def has_category_ids(conn):
+    """True once migration 13 has replaced expenses.category with category_id"""
+    return any(row[1] == 'category_id' for row in conn.execute('PRAGMA table_info(expenses)'))
+
+def _lookup(conn, user_id, names):
+    placeholders = ', '.join('?' * len(names))
+    return dict(conn.execute(
+        f'SELECT name, id FROM categories WHERE user_id = ? AND name IN ({placeholders})',
+        [user_id] + names
+    ).fetchall())
+
+def intern_categories(conn, user_id, names):
+    """{name: category id} for ``names``, creating the ones the user doesn't have
+
+    None stands for DEFAULT_CATEGORY. Runs on the caller's write
+    connection and transaction; the usual case is one index lookup.
+    """
+    names = list(dict.fromkeys(DEFAULT_CATEGORY if name is None else name for name in names))
+    if not names:
+        return {}
+    ids = _lookup(conn, user_id, names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        conn.execute(_SEED_DEFAULTS_SQL, (user_id, json.dumps(DEFAULT_CATEGORIES)))
+        conn.executemany(
+            'INSERT OR IGNORE INTO categories (user_id, name) VALUES (?, ?)',
+            [(user_id, name) for name in missing]
+        )
+        ids.update(_lookup(conn, user_id, missing))
+    ids[None] = ids.get(DEFAULT_CATEGORY)
+    return ids
+
+def intern_category(conn, user_id, name):
+    """intern_categories for one name"""
+    return intern_categories(conn, user_id, [name])[name]
+
+def get_category_names(conn, user_id):
+    """A user's category names in list order (DEFAULT_CATEGORIES until they have any)"""
+    names = [row[0] for row in conn.execute(
+        'SELECT name FROM categories WHERE user_id = ? ORDER BY id', (user_id,)
+    )]
+    return names or list(DEFAULT_CATEGORIES)
+
+def get_categories(user_id):
+    """get_category_names, cached per user data version (categories only change on writes)"""
+    version = summary_cache.version(user_id)
+    cached = summary_cache.get(user_id, 'categories', version)
+    if cached is not None:
+        return json.loads(cached)
+    conn = get_read_connection(user_id)
+    try:
+        names = get_category_names(conn, user_id)
+    finally:
+        conn.close()
+    summary_cache.set(user_id, 'categories', version, json.dumps(names).encode('utf-8'))
+    return names
+
+def create_category_schema(conn):
+    """Unique names per user (merging duplicates) and the category_id listing index"""
+    conn.execute(
+        'DELETE FROM categories WHERE id NOT IN '
+        '(SELECT MIN(id) FROM categories GROUP BY user_id, name)'
+    )
+    for statement in CATEGORY_SCHEMA:
+        conn.execute(statement)
+
+def _legacy_dependents(conn):
+    """Indexes and triggers that read expenses.category (they block DROP COLUMN)
+
+    Plus the rollup triggers even when they already read category_id (a
+    replay from step 4 creates them that way): filling category_id must
+    not count every expense into the rollups a second time.
+    """
+    return conn.execute(
+        "SELECT type, name FROM sqlite_master "
+        "WHERE tbl_name = 'expenses' AND type IN ('index', 'trigger') AND sql LIKE '%category%' "
+        "AND (sql NOT LIKE '%category_id%' OR name LIKE 'trg_expenses_%rollup_%')"
+    ).fetchall()
+
+def migrate_expense_categories(conn, batch_size=CATEGORY_BATCH_SIZE, progress=None):
+    """Replace expenses.category with category_id; returns expenses converted
+
+    Interns every user's category strings (defaults first), fills
+    category_id in committed batches of ``batch_size`` ids, then drops the
+    text column and recreates the rollup triggers on category_id. Each
+    phase can be rerun, so an interrupted conversion resumes.
+    """
+    from rollups import create_rollup_schema, create_weekly_rollup_schema
+
+    if conn.in_transaction:
+        conn.commit()
+    if not any(row[1] == 'category' for row in conn.execute('PRAGMA table_info(expenses)')):
+        with conn:
+            create_category_schema(conn)
+        return 0
+
+    # The rollup triggers read the text column; they come back on category_id at the end
+    with conn:
+        for kind, name in _legacy_dependents(conn):
+            conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+        if not has_category_ids(conn):
+            conn.execute('ALTER TABLE expenses ADD COLUMN category_id INTEGER REFERENCES categories (id)')
+        conn.execute(
+            'DELETE FROM categories WHERE id NOT IN '
+            '(SELECT MIN(id) FROM categories GROUP BY user_id, name)'
+        )
+        conn.execute(CATEGORY_SCHEMA[0])
+        conn.execute(
+            """INSERT OR IGNORE INTO categories (user_id, name)
+               SELECT users.user_id, defaults.value
+               FROM (SELECT DISTINCT user_id FROM expenses) users, json_each(?) defaults
+               WHERE NOT EXISTS (SELECT 1 FROM categories WHERE user_id = users.user_id)
+               ORDER BY users.user_id, defaults.key""",
+            (json.dumps(DEFAULT_CATEGORIES),)
+        )
+        # Then the rest, in order of first use
+        conn.execute(
+            """INSERT OR IGNORE INTO categories (user_id, name)
+               SELECT user_id, COALESCE(category, ?) FROM expenses
+               GROUP BY 1, 2 ORDER BY 1, MIN(id)""",
+            (DEFAULT_CATEGORY,)
+        )
+
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM expenses').fetchone()[0]
+    converted = 0
+    for start in range(0, last_id, batch_size):
+        with conn:
+            cursor = conn.execute(
+                """UPDATE expenses SET category_id = (
+                       SELECT id FROM categories
+                       WHERE categories.user_id = expenses.user_id
+                         AND categories.name = COALESCE(expenses.category, ?))
+                   WHERE id > ? AND id <= ? AND category_id IS NULL""",
+                (DEFAULT_CATEGORY, start, start + batch_size)
+            )
+        converted += max(cursor.rowcount, 0)
+        if progress:
+            progress(min(start + batch_size, last_id), converted)
+
+    # Rewrites the table once, without the strings
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('ALTER TABLE expenses DROP COLUMN category')
+        create_category_schema(conn)
+        create_rollup_schema(conn)
+        create_weekly_rollup_schema(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return converted
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command == 'run':
+        from migrations import migrate
+        migrate()
+        print("✅ Expenses reference categories by id")
+        return 0
+    if command == 'status':
+        pending = []
+        for shard in all_shards():
+            conn = get_shard_connection(shard)
+            try:
+                if not has_category_ids(conn):
+                    pending.append(str(shard))
+            finally:
+                conn.close()
+        if pending:
+            print(f"⏳ Shards still storing category names: {', '.join(pending)} "
+                  "(run 'python categories.py run')")
+            return 1
+        print("✅ Expenses reference categories by id")
+        return 0
+    print("Usage: python categories.py [status|run]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
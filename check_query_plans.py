@@ -0,0 +1,256 @@
+"""
+ExpenseTracker Query Plan Check
+Runs every route and model method against a scratch database, records each SQL
+statement the app issues and fails if EXPLAIN QUERY PLAN shows a full table scan
+or a date/amount/category filter that can't use an index.
+
+Usage: python check_query_plans.py
+"""
+
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import database
+import recurring
+from categories import intern_categories
+
+# Statements checked for scans; everything else (DDL, PRAGMA, plain INSERT) is skipped
+CHECKED_PREFIXES = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+# Plan details that are not full scans of a stored table (or only scan the schema)
+HARMLESS_SCANS = ('SCAN CONSTANT ROW', 'SCAN sqlite_master', 'SCAN sqlite_schema')
+
+# An indexed column wrapped in a function inside WHERE can't be range-searched,
+# so the query reads every row matching the remaining prefix (e.g. all of a user's rows)
+NON_SARGABLE = re.compile(
+    r"\b(?:strftime|date|datetime|substr|lower|upper)\s*\([^()]*\b(?:expense_date|amount|category|category_id)\b",
+    re.IGNORECASE
+)
+
+def find_full_scans(conn, sql):
+    """Return the EXPLAIN QUERY PLAN lines of ``sql`` that scan a whole table"""
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    ctes = {row[3].split()[-1] for row in plan if row[3].startswith(('MATERIALIZE', 'CO-ROUTINE'))}
+    scans = []
+    for row in plan:
+        detail = row[3]
+        if not detail.startswith('SCAN ') or detail.startswith(HARMLESS_SCANS):
+            continue
+        # Virtual tables report their constraint after "INDEX n:"; empty means unconstrained
+        if ' VIRTUAL TABLE INDEX ' in detail and not detail.endswith(':'):
+            continue
+        # "SCAN t USING COVERING INDEX ..." still reads every row of t
+        table = detail.split()[1]
+        if table in ctes:
+            continue
+        scans.append(detail)
+    return scans
+
+def find_non_sargable(sql):
+    """Return function-wrapped column predicates in the WHERE clause of ``sql``"""
+    match = re.search(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', sql,
+                      re.IGNORECASE | re.DOTALL)
+    if not match:
+        return []
+    return [m.group(0) + '...)' for m in NON_SARGABLE.finditer(match.group(1))]
+
+def _is_checked(sql):
+    """Whether a traced statement should have its plan checked
+
+    FTS5's own statements on its shadow tables (traced when a fresh
+    connection first touches the index) are not ours to check.
+    """
+    if "'expenses_fts_" in sql:
+        return False
+    return ' '.join(sql.split()).upper().startswith(CHECKED_PREFIXES)
+
+def seed(conn, user_ids, rows_per_user=300, extra_users=200):
+    """Insert enough synthetic rows that the planner prefers indexes"""
+    rng = random.Random(42)
+    conn.executemany(
+        'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+        [(f'seed{i}', f'seed{i}@example.com', '!') for i in range(extra_users)]
+    )
+    categories = ['Food & Dining', 'Transportation', 'Shopping', 'Groceries', 'Other']
+    tags = [None, 'work', 'family, trip', 'work, trip, shared']
+    today = date.today()
+    rows = []
+    for user_id in user_ids:
+        category_ids = intern_categories(conn, user_id, categories)
+        for _ in range(rows_per_user):
+            day = today - timedelta(days=rng.randint(0, 700))
+            rows.append((user_id, day.isoformat(), f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}',
+                         rng.randint(1000, 500000), 'Seed expense', 'Synthetic row',
+                         category_ids[rng.choice(categories)], rng.choice(tags)))
+    conn.executemany(
+        """INSERT INTO expenses
+           (user_id, expense_date, expense_time, amount, subject, description, category_id, tags)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows
+    )
+    conn.execute('ANALYZE')
+    conn.commit()
+
+def exercise_models():
+    """Call every data-access method in models.py and database.py"""
+    from models import Budget, User, Expense, get_expense_categories
+
+    user, _ = User.create_user('plancheck', 'plancheck@example.com', 'secret123')
+    User.authenticate('plancheck', 'secret123')
+    User.get_by_id(user.id)
+    user.update_password('secret456')
+
+    expense, _ = Expense.create_expense(user.id, date.today().isoformat(), '12:00', 9900,
+                                        'Plan check', 'Created by check_query_plans', 'Other',
+                                        tags='plan, check')
+    filters = {
+        'period': 'month', 'category': 'Other', 'date_from': '2024-01-01',
+        'date_to': date.today().isoformat(), 'min_amount': 100, 'max_amount': 1000000,
+        'search': 'seed', 'sort_by': 'amount_desc',
+    }
+    Expense.get_by_user(1, limit=20, offset=0, filters=filters)
+    Expense.get_by_user(1)
+    Expense.get_by_user(1, filters={'search': '"synthetic row"'})
+    Expense.get_by_user(1, filters={'tags': ['work', 'trip']})
+    Expense.get_by_user(1, filters={'tags': ['work', 'trip'], 'tag_mode': 'all',
+                                    'period': 'year', 'sort_by': 'date_asc'})
+    _, next_cursor, _ = Expense.get_page(1, filters={'sort_by': 'category'}, page_size=10)
+    Expense.get_page(1, filters={'sort_by': 'category'}, cursor=next_cursor, page_size=10)
+    Expense.get_rows(1, limit=20, filters=filters)
+    _, next_cursor, _ = Expense.get_page_rows(1, filters={'sort_by': 'amount_asc'}, page_size=10)
+    Expense.get_page_rows(1, filters={'sort_by': 'amount_asc'}, cursor=next_cursor, page_size=10)
+    Expense.get_by_id(expense.id, user.id)
+    Expense.get_statistics(1)
+    expense.update(amount=12000, subject='Plan check (edited)', tags='plan, edited')
+    expense.update(category='Plan checks')
+    get_expense_categories(1)
+    expense.delete()
+
+    for period in ('weekly', 'monthly', 'yearly'):
+        Budget.create_budget(1, 'Groceries', 500000, period, '2024-01-01')
+    budget, _ = Budget.create_budget(1, 'All', 2000000, 'monthly', '2024-01-01', alert_percent=50)
+    Budget.get_by_user(1)
+    Budget.get_by_id(budget.id, 1)
+    Budget.evaluate_all(1)
+    budget.update(amount=2500000)
+    budget.delete()
+
+    database.get_expense_stats(1)
+    database.create_sample_data()
+
+def exercise_routes():
+    """Hit every route through the Flask test client"""
+    from app import create_app
+    from pagination import SORT_KEYS
+
+    client = create_app().test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    client.get('/dashboard')
+    client.get('/api/expenses/analytics')
+    client.post('/add_expense', data={
+        'expense_date': date.today().isoformat(), 'expense_time': '09:30',
+        'amount': '42.50', 'subject': 'Route check', 'category': 'Groceries',
+    })
+    created = client.post('/api/v1/expenses', json=[{
+        'expense_date': date.today().isoformat(), 'expense_time': '09:45',
+        'amount': '12.00', 'subject': 'Batch check', 'category': 'Groceries',
+    }] * 3).get_json()['results']
+    batch_ids = [result['id'] for result in created]
+    client.patch('/api/v1/expenses', json=[{'id': batch_ids[0], 'amount': '15.00'}])
+    client.post('/api/v1/expenses/batch', json={
+        'update': [{'id': batch_ids[1], 'category': 'Other'}], 'delete': [batch_ids[2]]
+    })
+    client.delete('/api/v1/expenses', json=[batch_ids[0]])
+    client.get('/api/expenses/analytics?window=30')
+    client.get('/api/v1/expenses?limit=5')
+    client.post('/add_expense', data={
+        'expense_date': '2024-01-31', 'expense_time': '08:00', 'amount': '15000',
+        'subject': 'Rent', 'category': 'Bills & Utilities', 'repeat': 'monthly',
+    })
+    rule = client.post('/api/recurring', json={
+        'frequency': 'weekly', 'start_date': '2024-06-03', 'amount': '300',
+        'subject': 'Cleaner', 'expense_time': '10:00',
+    }).get_json()
+    recurring.scheduler.tick()
+    client.get('/api/recurring')
+    client.get('/api/recurring/scheduler')
+    client.delete(f"/api/recurring/{rule['id']}")
+    budget = client.post('/api/budgets', json={
+        'category': 'Groceries', 'amount': '100', 'period': 'weekly'
+    }).get_json()
+    client.get('/api/budgets')
+    client.put(f"/api/budgets/{budget['id']}", json={'alert_percent': 75})
+    client.get(f"/api/budgets/{budget['id']}")
+    client.delete(f"/api/budgets/{budget['id']}")
+    for period in ('all', 'today', 'week', 'month', 'year'):
+        for sort_by in SORT_KEYS:
+            client.get('/view_expenses', query_string={'filter': period, 'sort': sort_by})
+            page = client.get('/api/expenses', query_string={
+                'filter': period, 'sort': sort_by, 'limit': 5
+            }).get_json()
+            if page and page.get('next_cursor'):
+                client.get('/api/expenses', query_string={
+                    'filter': period, 'sort': sort_by, 'limit': 5, 'cursor': page['next_cursor']
+                })
+    client.get('/view_expenses', query_string={'category': 'Groceries'})
+    client.get('/view_expenses', query_string={'search': 'seed exp'})
+    client.get('/api/expenses/search', query_string={'q': 'synth'})
+    client.get('/view_expenses', query_string={'tags': 'work,trip', 'tag_mode': 'all'})
+    client.get('/api/expenses/export', query_string={'tags': 'family'})
+    client.get('/api/tags')
+    client.get('/api/tags', query_string={'filter': 'month', 'limit': 5})
+    client.get('/api/expenses/summary')
+    client.get('/api/db/pool')
+    client.post('/register', data={
+        'username': 'planroute', 'email': 'planroute@example.com', 'password': 'secret123'
+    })
+    client.get('/logout')
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='plancheck-')
+    database.DATABASE = os.path.join(workdir, 'plancheck.db')
+
+    statements = []
+    for pool in (database.get_pool(), database.get_read_pool()):
+        pool.add_connect_hook(lambda conn: conn.set_trace_callback(statements.append))
+
+    database.init_db()
+    conn = database.get_db_connection()
+    seed(conn, user_ids=[1, 2, 3])
+    conn.close()
+    statements.clear()
+
+    exercise_models()
+    exercise_routes()
+
+    checker = sqlite3.connect(database.DATABASE)
+    checked = 0
+    failures = {}
+    for sql in dict.fromkeys(statements):
+        if not _is_checked(sql):
+            continue
+        checked += 1
+        scans = find_full_scans(checker, sql)
+        scans += [f'non-sargable predicate {p}' for p in find_non_sargable(sql)]
+        if scans:
+            failures[sql] = scans
+    checker.close()
+
+    print(f"Checked {checked} distinct statements")
+    if failures:
+        for sql, scans in failures.items():
+            print(f"\n❌ Full scan in:\n{' '.join(sql.split())}")
+            for detail in scans:
+                print(f"   {detail}")
+        return 1
+
+    print("✅ No statement falls back to a full or per-user scan")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
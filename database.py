@@ -1,180 +1,290 @@
 import sqlite3
-from datetime import datetime
 import os
+import threading
+from contextlib import contextmanager
+from flask import g, has_app_context, has_request_context, session
+from db_pool import ConnectionPool
+from metrics import InstrumentedCursor
 
 DATABASE = 'expense_manager.db'
 
-def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+# Users are spread over this many database files (see sharding.py). DATABASE
+# is shard 0 and also holds the directory: the users table and user_shards.
+# Raise it, restart, then run `python sharding.py rebalance` to move users;
+# to shrink, run `python sharding.py rebalance N` before lowering it.
+SHARD_COUNT = 1
+
+# Connection pool tuning
+POOL_SIZE = 10
+
+# Read-only routes and model methods use their own mode=ro pool per shard,
+# reading WAL snapshots without ever queueing behind writers for a connection
+SEPARATE_READ_POOL = True
+READ_POOL_SIZE = 10
+POOL_TIMEOUT = 5.0
+POOL_HEALTH_CHECK_INTERVAL = 30.0
+
+# Time every statement for /metrics (see metrics.py)
+SQL_INSTRUMENTATION = True
+
+# Amounts are INTEGER paise (see money.py); {table} lets migrate_amounts build shadow copies.
+# Migration 13 replaces category with category_id (see categories.py)
+EXPENSES_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        expense_date DATE NOT NULL,
+        expense_time TIME NOT NULL,
+        amount INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        description TEXT,
+        category TEXT DEFAULT 'Other',
+        payment_method TEXT DEFAULT 'Cash',
+        tags TEXT,
+        is_recurring BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+"""
+
+BUDGETS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        period TEXT DEFAULT 'monthly',  -- monthly, weekly, yearly
+        start_date DATE NOT NULL,
+        end_date DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+"""
+
+_pools = {}
+_pools_database = None
+_pool_lock = threading.Lock()
+
+def shard_path(shard):
+    """Database file of a shard: DATABASE for shard 0, name.shardN.db for the others"""
+    if shard == 0:
+        return DATABASE
+    root, ext = os.path.splitext(DATABASE)
+    return f'{root}.shard{shard}{ext or ".db"}'
+
+def get_pool(shard=0, read_only=False):
+    """Get (lazily creating) the shared connection pool for a shard's file
+
+    ``read_only`` gives the shard's mode=ro pool (the writer pool when
+    SEPARATE_READ_POOL is off).
+    """
+    global _pools_database
+    key = (shard, read_only and SEPARATE_READ_POOL)
+    pool = _pools.get(key) if _pools_database == DATABASE else None
+    if pool is None:
+        with _pool_lock:
+            if _pools_database != DATABASE:
+                for stale in _pools.values():
+                    stale.close_all()
+                _pools.clear()
+                _pools_database = DATABASE
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    shard_path(shard),
+                    max_size=READ_POOL_SIZE if key[1] else POOL_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+                    cursor_factory=InstrumentedCursor if SQL_INSTRUMENTATION else sqlite3.Cursor,
+                    read_only=key[1]
+                )
+                _pools[key] = pool
+    return pool
+
+def get_read_pool(shard=0):
+    """The read-only pool of a shard"""
+    return get_pool(shard, read_only=True)
+
+def lookup_shard(conn, user_id):
+    """The shard a user's data lives on, read from the directory through ``conn``
+
+    Users missing from the directory (created before sharding) are on shard 0.
+    """
+    row = conn.execute('SELECT shard FROM user_shards WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def _request_connection(shard, read_only=False):
+    conns = g.setdefault('db_conns', {})
+    key = (shard, read_only and SEPARATE_READ_POOL)
+    conn = conns.get(key)
+    if conn is None:
+        conn = get_pool(*key).acquire()
+        conn.request_scoped = True
+        conns[key] = conn
     return conn
 
+def get_shard(user_id):
+    """The shard holding ``user_id``'s expenses, budgets and rules
+
+    With a single shard this is always 0 and costs nothing; otherwise it is
+    one primary-key lookup in the directory, remembered for the request.
+    """
+    if SHARD_COUNT == 1 or user_id is None:
+        return 0
+    if has_app_context():
+        shards = g.setdefault('user_shards', {})
+        if user_id not in shards:
+            shards[user_id] = lookup_shard(_request_connection(0, read_only=True), user_id)
+        return shards[user_id]
+
+    conn = get_read_pool(0).acquire()
+    try:
+        return lookup_shard(conn, user_id)
+    finally:
+        conn.close()
+
+def get_db_connection(user_id=None):
+    """Get database connection with row factory
+
+    The connection is to the shard holding ``user_id``; inside a request it
+    defaults to the logged-in user, elsewhere (and when nobody is logged in)
+    to shard 0. Inside a Flask request the same pooled connection per shard
+    is returned for the whole request and released on teardown; elsewhere
+    the caller owns the connection until it calls close(), which returns it
+    to the pool.
+    """
+    if has_app_context():
+        if user_id is None and has_request_context():
+            user_id = session.get('user_id')
+        return _request_connection(get_shard(user_id))
+
+    return get_pool(get_shard(user_id)).acquire()
+
+def get_read_connection(user_id=None):
+    """Like get_db_connection, but a read-only connection from the shard's read pool
+
+    For methods and routes that only read. Each statement (or each
+    snapshot() block) reads the latest committed WAL snapshot, so it sees
+    everything committed before it started, including this request's own
+    committed writes.
+    """
+    if has_app_context():
+        if user_id is None and has_request_context():
+            user_id = session.get('user_id')
+        return _request_connection(get_shard(user_id), read_only=True)
+
+    return get_read_pool(get_shard(user_id)).acquire()
+
+@contextmanager
+def snapshot(conn):
+    """Run several reads on ``conn`` against one consistent WAL snapshot"""
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+def get_directory_connection(read_only=False):
+    """Connection to the directory (shard 0): the users and user_shards tables"""
+    if has_app_context():
+        return _request_connection(0, read_only)
+    return get_pool(0, read_only).acquire()
+
+def all_shards():
+    """Shard numbers in use, for jobs that visit every database file"""
+    return range(SHARD_COUNT)
+
+def get_shard_connection(shard):
+    """A connection to one shard, owned by the caller (maintenance jobs looping over shards)"""
+    return get_pool(shard).acquire()
+
+def close_db_connection(exception=None):
+    """Release the request-scoped connections back to their pools"""
+    g.pop('user_shards', None)
+    for conn in g.pop('db_conns', {}).values():
+        conn.request_scoped = False
+        conn.close()
+
+def get_pool_stats():
+    """Get connection pool statistics (shard 0's writer pool, its read pool, and other shards')"""
+    stats = get_pool().stats()
+    if SEPARATE_READ_POOL:
+        stats['read'] = get_read_pool().stats()
+    if SHARD_COUNT > 1:
+        stats['shards'] = {
+            shard: {'write': get_pool(shard).stats(), 'read': get_read_pool(shard).stats()}
+            for shard in range(SHARD_COUNT)
+        }
+    return stats
+
+def init_app(app):
+    """Register the per-request connection teardown on a Flask app"""
+    app.teardown_appcontext(close_db_connection)
+
 def init_db():
-    """Initialize the database with required tables"""
-    conn = get_db_connection()
-    
-    # Create users table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create expenses table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            expense_date DATE NOT NULL,
-            expense_time TIME NOT NULL,
-            amount DECIMAL(10, 2) NOT NULL,
-            subject TEXT NOT NULL,
-            description TEXT,
-            category TEXT DEFAULT 'Other',
-            payment_method TEXT DEFAULT 'Cash',
-            tags TEXT,
-            is_recurring BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Create categories table for future use
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            color TEXT DEFAULT '#6366f1',
-            icon TEXT DEFAULT 'shopping',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Create budgets table for future use
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS budgets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            category TEXT NOT NULL,
-            amount DECIMAL(10, 2) NOT NULL,
-            period TEXT DEFAULT 'monthly',  -- monthly, weekly, yearly
-            start_date DATE NOT NULL,
-            end_date DATE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Create indexes for better performance
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, expense_date)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_amount ON expenses(amount)")
-    
-    # Insert default categories if they don't exist
-    default_categories = [
-        'Food & Dining', 'Transportation', 'Shopping', 'Entertainment',
-        'Bills & Utilities', 'Healthcare', 'Education', 'Travel',
-        'Groceries', 'Gas', 'Other'
-    ]
-    
-    # Create a default admin user for testing (remove in production)
-    from werkzeug.security import generate_password_hash
-    
-    existing_admin = conn.execute(
-        'SELECT * FROM users WHERE username = ?', ('admin',)
-    ).fetchone()
-    
-    if not existing_admin:
-        admin_password = generate_password_hash('admin123')  # Change this in production
-        conn.execute(
-            'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
-            ('admin', 'admin@expensemanager.com', admin_password)
-        )
-        print("Default admin user created: admin / admin123")
-    
-    conn.commit()
-    conn.close()
+    """Bring the database schema up to date (see migrations.py)"""
+    from migrations import migrate
+    migrate()
     print("Database initialized successfully!")
 
 def create_sample_data():
     """Create sample expense data for testing"""
-    conn = get_db_connection()
+    directory = get_directory_connection()
     
     # Get admin user ID
-    admin_user = conn.execute(
+    admin_user = directory.execute(
         'SELECT id FROM users WHERE username = ?', ('admin',)
     ).fetchone()
+    directory.close()
     
     if admin_user:
         user_id = admin_user['id']
+        conn = get_db_connection(user_id)
         
         # Sample expenses
         sample_expenses = [
-            ('2024-09-20', '09:30', 25.50, 'Breakfast', 'Coffee and sandwich at cafe', 'Food & Dining'),
-            ('2024-09-20', '14:15', 450.00, 'Grocery Shopping', 'Weekly grocery shopping', 'Groceries'),
-            ('2024-09-21', '18:45', 35.00, 'Gas', 'Fuel for car', 'Transportation'),
-            ('2024-09-22', '12:00', 180.00, 'Lunch with friends', 'Restaurant bill', 'Food & Dining'),
-            ('2024-09-23', '16:20', 1200.00, 'Phone Bill', 'Monthly phone bill payment', 'Bills & Utilities'),
+            ('2024-09-20', '09:30', 2550, 'Breakfast', 'Coffee and sandwich at cafe', 'Food & Dining'),
+            ('2024-09-20', '14:15', 45000, 'Grocery Shopping', 'Weekly grocery shopping', 'Groceries'),
+            ('2024-09-21', '18:45', 3500, 'Gas', 'Fuel for car', 'Transportation'),
+            ('2024-09-22', '12:00', 18000, 'Lunch with friends', 'Restaurant bill', 'Food & Dining'),
+            ('2024-09-23', '16:20', 120000, 'Phone Bill', 'Monthly phone bill payment', 'Bills & Utilities'),
         ]
         
-        for expense in sample_expenses:
-            # Check if expense already exists to avoid duplicates
-            existing = conn.execute(
-                'SELECT * FROM expenses WHERE user_id = ? AND expense_date = ? AND expense_time = ? AND amount = ?',
-                (user_id, expense[0], expense[1], expense[2])
-            ).fetchone()
-            
-            if not existing:
-                conn.execute(
-                    """INSERT INTO expenses 
-                       (user_id, expense_date, expense_time, amount, subject, description, category)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (user_id,) + expense
-                )
+        from categories import intern_categories
+        category_ids = intern_categories(conn, user_id, [expense[-1] for expense in sample_expenses])
+
+        # One batched statement; the NOT EXISTS guard skips rows already present
+        conn.executemany(
+            """INSERT INTO expenses 
+               (user_id, expense_date, expense_time, amount, subject, description, category_id)
+               SELECT ?, ?, ?, ?, ?, ?, ?
+               WHERE NOT EXISTS (
+                   SELECT 1 FROM expenses
+                   WHERE user_id = ?1 AND expense_date = ?2 AND expense_time = ?3 AND amount = ?4
+               )""",
+            [(user_id,) + expense[:-1] + (category_ids[expense[-1]],) for expense in sample_expenses]
+        )
         
         conn.commit()
+        conn.close()
         print("Sample data created successfully!")
-    
-    conn.close()
 
 def get_expense_stats(user_id):
-    """Get expense statistics for a user"""
-    conn = get_db_connection()
-    
-    # Total expenses
-    total = conn.execute(
-        'SELECT COALESCE(SUM(amount), 0) as total FROM expenses WHERE user_id = ?',
-        (user_id,)
-    ).fetchone()['total']
-    
-    # This month's expenses
-    current_month = datetime.now().strftime('%Y-%m')
-    monthly = conn.execute(
-        'SELECT COALESCE(SUM(amount), 0) as monthly FROM expenses WHERE user_id = ? AND strftime("%Y-%m", expense_date) = ?',
-        (user_id, current_month)
-    ).fetchone()['monthly']
+    """Get expense statistics for a user (totals in paise)"""
+    conn = get_read_connection(user_id)
     
-    # Category breakdown
-    categories = conn.execute(
-        'SELECT category, SUM(amount) as total FROM expenses WHERE user_id = ? GROUP BY category ORDER BY total DESC',
-        (user_id,)
-    ).fetchall()
+    from stats import get_expense_stats as read_stats
     
-    conn.close()
+    try:
+        stats = read_stats(conn, user_id, trend_months=0)
+    finally:
+        conn.close()
     
     return {
-        'total': total,
-        'monthly': monthly,
-        'categories': [dict(cat) for cat in categories]
+        'total': stats.total_amount,
+        'monthly': stats.month_amount,
+        'categories': [{'category': cat['category'], 'total': cat['total']} for cat in stats.categories]
     }
 
 if __name__ == '__main__':
@@ -0,0 +1,75 @@
+"""
+ExpenseTracker Date Filters
+Turns period filters into half-open date ranges that can use the (user_id, expense_date) indexes
+"""
+
+from datetime import date, datetime, timedelta
+
+PERIODS = ('today', 'week', 'month', 'year', 'custom')
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string (or pass through a date); ValueError if malformed"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _first_of_next_month(day):
+    """First day of the month after ``day``"""
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+def month_range(month):
+    """Half-open range for a 'YYYY-MM' month string or a date inside the month"""
+    if isinstance(month, str):
+        start = datetime.strptime(month, '%Y-%m').date()
+    else:
+        start = parse_date(month).replace(day=1)
+    return start.isoformat(), _first_of_next_month(start).isoformat()
+
+def year_range(year):
+    """Half-open range for a calendar year"""
+    year = int(year)
+    return date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+
+def period_range(period, today=None, date_from=None, date_to=None):
+    """Get (start, end) for a period filter as ISO dates
+
+    ``start`` is inclusive and ``end`` exclusive; either may be None when
+    the period is unbounded on that side. Unknown periods (e.g. 'all')
+    return (None, None). For 'custom', ``date_to`` is inclusive like the
+    date pickers in the UI and is converted to an exclusive bound.
+    """
+    today = parse_date(today) or date.today()
+
+    if period == 'today':
+        return today.isoformat(), (today + timedelta(days=1)).isoformat()
+    if period == 'week':
+        return (today - timedelta(days=7)).isoformat(), None
+    if period == 'month':
+        return month_range(today)
+    if period == 'year':
+        return year_range(today.year)
+    if period == 'custom':
+        start = parse_date(date_from)
+        end = parse_date(date_to)
+        # Nothing is after 9999-12-31, so that end is no bound at all
+        return (start.isoformat() if start else None,
+                (end + timedelta(days=1)).isoformat() if end and end < date.max else None)
+    return None, None
+
+def date_range_clause(start, end, column='expense_date'):
+    """Build the sargable ``AND column >= ? AND column < ?`` fragment"""
+    sql = ''
+    params = []
+    if start:
+        sql += f' AND {column} >= ?'
+        params.append(start)
+    if end:
+        sql += f' AND {column} < ?'
+        params.append(end)
+    return sql, params
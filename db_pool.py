@@ -0,0 +1,262 @@
+"""
+ExpenseTracker Connection Pool
+Thread-safe, bounded pool of SQLite connections shared by the app, models and database helpers
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.parse import quote
+
+# Pragmas applied once when a connection is opened, never on reuse
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -20000),       # ~20 MB page cache per connection
+    ('mmap_size', 268435456),     # 256 MB memory-mapped I/O
+)
+
+# Read-only connections can't change the journal mode; they read the WAL the writers keep
+READ_ONLY_PRAGMAS = (
+    ('cache_size', -20000),
+    ('mmap_size', 268435456),
+)
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.request_scoped = False
+        self.checked_out = False
+        self.last_used = time.monotonic()
+        self.cursor_factory = sqlite3.Cursor
+
+    def cursor(self, factory=None):
+        """Open a cursor, defaulting to the connection's cursor_factory"""
+        return super().cursor(factory or self.cursor_factory)
+
+    # sqlite3's shortcut methods bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        """Return the connection to the pool (no-op while bound to a request)"""
+        if self.request_scoped:
+            return
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def force_close(self):
+        """Really close the underlying SQLite handle"""
+        self.pool = None
+        sqlite3.Connection.close(self)
+
+class ConnectionPool:
+    """Bounded pool handing out configured SQLite connections"""
+
+    def __init__(self, database, max_size=10, timeout=5.0,
+                 health_check_interval=30.0, pragmas=None,
+                 cursor_factory=sqlite3.Cursor, read_only=False):
+        """``read_only`` opens connections with mode=ro: they never take the write lock"""
+        self.database = database
+        self.read_only = read_only
+        if pragmas is None:
+            pragmas = READ_ONLY_PRAGMAS if read_only else DEFAULT_PRAGMAS
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.pragmas = pragmas
+        self.cursor_factory = cursor_factory
+        self.connect_hooks = []
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'created': 0,
+            'acquired': 0,
+            'reused': 0,
+            'released': 0,
+            'discarded': 0,
+            'health_checks': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+        }
+
+    def _connect(self):
+        """Open a new connection and apply the pragmas once"""
+        if self.read_only:
+            conn = sqlite3.connect(f'file:{quote(self.database)}?mode=ro', uri=True,
+                                   factory=PooledConnection, check_same_thread=False,
+                                   timeout=self.timeout)
+        else:
+            conn = sqlite3.connect(self.database, factory=PooledConnection,
+                                   check_same_thread=False, timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+        conn.cursor_factory = self.cursor_factory
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        for hook in self.connect_hooks:
+            hook(conn)
+        conn.pool = self
+        return conn
+
+    def add_connect_hook(self, hook):
+        """Call ``hook(conn)`` on every connection opened from now on"""
+        self.connect_hooks.append(hook)
+
+    def _needs_health_check(self, conn):
+        """Whether a connection has been idle longer than the check interval"""
+        return time.monotonic() - conn.last_used >= self.health_check_interval
+
+    def _ping(self, conn):
+        """SELECT 1 on a connection taken out of the pool (never called holding the lock)"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if below max_size"""
+        wait_started = None
+        while True:
+            stale = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise sqlite3.ProgrammingError('Connection pool is closed')
+
+                    if self._idle:
+                        conn = self._idle.pop()
+                        if not self._needs_health_check(conn):
+                            conn.checked_out = True
+                            self._record_checkout(wait_started, reused=True)
+                            return conn
+                        # Keeps its slot while it is pinged below
+                        stale = conn
+                        self._stats['health_checks'] += 1
+                        break
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    now = time.monotonic()
+                    if wait_started is None:
+                        wait_started = now
+                        self._stats['waits'] += 1
+                    remaining = wait_started + self.timeout - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        self._stats['wait_time_total'] += now - wait_started
+                        raise PoolTimeout(
+                            f'No database connection available after {self.timeout}s'
+                        )
+                    self._cond.wait(remaining)
+
+            if stale is None:
+                break
+            # Pinged outside the lock, so a slow or locked connection only holds up this caller
+            if self._ping(stale):
+                stale.checked_out = True
+                with self._cond:
+                    self._record_checkout(wait_started, reused=True)
+                return stale
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+                self._discard(stale)
+                self._cond.notify()
+
+        # Open outside the lock so slow connects don't block other threads
+        try:
+            conn = self._connect()
+        except sqlite3.Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        conn.checked_out = True
+        with self._cond:
+            self._stats['created'] += 1
+            self._record_checkout(wait_started, reused=False)
+        return conn
+
+    def _record_checkout(self, wait_started, reused):
+        """Update checkout counters (caller holds the lock)"""
+        self._stats['acquired'] += 1
+        if reused:
+            self._stats['reused'] += 1
+        if wait_started is not None:
+            self._stats['wait_time_total'] += time.monotonic() - wait_started
+
+    def release(self, conn):
+        """Give a connection back, rolling back anything left uncommitted"""
+        if not conn.checked_out:
+            return
+        conn.checked_out = False
+        conn.request_scoped = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._stats['released'] += 1
+            if self._closed:
+                self._discard(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        """Close a connection and free its slot (caller holds the lock)"""
+        self._size -= 1
+        self._stats['discarded'] += 1
+        try:
+            conn.force_close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self):
+        """Snapshot of pool counters for tuning"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['max_size'] = self.max_size
+            stats['read_only'] = self.read_only
+            stats['open'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['database'] = self.database
+        return stats
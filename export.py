@@ -0,0 +1,74 @@
+"""
+ExpenseTracker Export
+Streaming CSV/JSONL serializers that read a cursor in fixed-size chunks
+
+Amounts are stored in paise; export_select_list renders them as rupees in
+SQL, exactly, so rows stream out without a per-row Python conversion.
+"""
+
+import csv
+import io
+import json
+
+from categories import category_name_sql
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    'id', 'expense_date', 'expense_time', 'amount', 'category', 'subject',
+    'description', 'payment_method', 'tags', 'is_recurring', 'created_at', 'updated_at'
+)
+
+# Rupee renderings of the integer paise column, per format
+EXPORT_AMOUNT_SQL = {
+    # Digits of abs(amount) with the sign in front: printf would sign both halves of -150
+    'csv': "CASE WHEN amount < 0 THEN '-' ELSE '' END "
+           "|| printf('%d.%02d', abs(amount) / 100, abs(amount) % 100)",
+    'jsonl': 'amount / 100.0',
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+def export_select_list(export_format):
+    """SELECT list for EXPORT_COLUMNS: amount converted to rupees, category by name"""
+    amount_sql = EXPORT_AMOUNT_SQL.get(export_format, EXPORT_AMOUNT_SQL['csv'])
+    expressions = {'amount': amount_sql, 'category': category_name_sql()}
+    return ', '.join(f'{expressions[column]} as {column}' if column in expressions else column
+                     for column in EXPORT_COLUMNS)
+
+def iter_chunks(cursor, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of rows from a cursor without materializing the result"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def iter_csv(cursor, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV text: a header line, then one string per chunk of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in iter_chunks(cursor, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def iter_jsonl(cursor, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield JSON Lines text, one string per chunk of rows"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for rows in iter_chunks(cursor, chunk_size):
+        yield ''.join(dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+
+def stream_export(cursor, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Pick the serializer for an export format"""
+    if export_format == 'jsonl':
+        return iter_jsonl(cursor, chunk_size)
+    return iter_csv(cursor, chunk_size)
@@ -0,0 +1,97 @@
+"""
+ExpenseTracker Importer
+Streaming CSV parser feeding Expense.bulk_create
+
+Accepts the columns written by the export endpoint (extra columns such as
+id/created_at are ignored). expense_date, amount and subject are required;
+expense_time defaults to 00:00 when the file has no time column.
+
+Usage: python importer.py <user_id> <file.csv>
+"""
+
+import codecs
+import csv
+import sys
+
+from models import Expense
+from money import InvalidAmount, to_minor
+
+REQUIRED_COLUMNS = ('expense_date', 'amount', 'subject')
+OPTIONAL_COLUMNS = ('expense_time', 'description', 'category', 'payment_method', 'tags', 'is_recurring')
+
+# Only the first errors are kept for display; the total is always reported
+MAX_REPORTED_ERRORS = 100
+
+class ImportFormatError(ValueError):
+    """Raised when the CSV header is missing required columns"""
+
+def _parse_amount(value):
+    """Parse an amount cell into paise, leaving unparseable text for validation to reject"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return to_minor(value)
+    except InvalidAmount:
+        return value
+
+def _parse_bool(value):
+    """Parse an is_recurring cell"""
+    return (value or '').strip().lower() in ('1', 'true', 'yes', 'y')
+
+def iter_csv_records(lines):
+    """Yield expense dicts from an iterable of CSV text lines"""
+    reader = csv.reader(lines)
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+    except StopIteration:
+        return
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFormatError(f"Missing required column(s): {', '.join(missing)}")
+
+    positions = {column: header.index(column)
+                 for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if column in header}
+    width = len(header)
+    has_time = 'expense_time' in positions
+
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        record = {column: row[index].strip() for column, index in positions.items()}
+        record['amount'] = _parse_amount(record['amount'])
+        record['is_recurring'] = _parse_bool(record.get('is_recurring'))
+        if not has_time:
+            record['expense_time'] = '00:00'
+        yield record
+
+def import_csv(user_id, stream, encoding='utf-8-sig'):
+    """Import a binary CSV stream for a user
+
+    Returns (inserted_count, errors, error_count, message); ``errors`` holds
+    at most MAX_REPORTED_ERRORS (row_number, [messages]) entries.
+    """
+    lines = codecs.iterdecode(stream, encoding)
+    try:
+        inserted, errors, message = Expense.bulk_create(user_id, iter_csv_records(lines))
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        return 0, [], 0, f"Could not read CSV: {str(e)}"
+
+    return inserted, errors[:MAX_REPORTED_ERRORS], len(errors), message
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python importer.py <user_id> <file.csv>")
+        sys.exit(2)
+
+    with open(sys.argv[2], 'rb') as f:
+        inserted, errors, error_count, message = import_csv(int(sys.argv[1]), f)
+
+    print(message)
+    for row_number, row_errors in errors:
+        print(f"❌ Row {row_number}: {'; '.join(row_errors)}")
+    if error_count > len(errors):
+        print(f"... and {error_count - len(errors)} more invalid rows")
@@ -0,0 +1,214 @@
+"""
+ExpenseTracker Metrics
+SQL and request instrumentation exposed in Prometheus text format
+
+Statements are timed by InstrumentedCursor, which the connection pool
+installs on every connection, and grouped by normalized SQL shape (literals
+and parameter lists collapsed). Timings cover execute(), which is where
+SQLite does the work for sorted and aggregate queries; rows fetched later
+are not included.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their parameters redacted
+SLOW_QUERY_THRESHOLD = 0.1
+
+# New SQL shapes beyond this are counted under "other" to bound label cardinality
+MAX_SQL_SHAPES = 500
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PARAM_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+class Histogram:
+    """Cumulative-bucket histogram with per-label-set series"""
+
+    def __init__(self, name, help_text, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Record one value for a tuple of label values"""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def __contains__(self, labels):
+        return labels in self._series
+
+    def __len__(self):
+        return len(self._series)
+
+    def render(self):
+        """Prometheus text exposition lines"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in series]
+        for labels, counts, total, count in series:
+            label_text = _format_labels(self.label_names, labels)
+            prefix = label_text[:-1] + ',' if label_text else '{'
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{label_text} {total}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+class Counter:
+    """Monotonic counter with per-label-set series"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {value}')
+        return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+sql_duration = Histogram(
+    'expensetracker_sql_query_duration_seconds',
+    'Time spent executing SQL statements, by normalized statement',
+    ('statement',)
+)
+sql_slow = Counter(
+    'expensetracker_sql_slow_queries_total',
+    f'Statements slower than {SLOW_QUERY_THRESHOLD}s, by normalized statement',
+    ('statement',)
+)
+request_duration = Histogram(
+    'expensetracker_http_request_duration_seconds',
+    'Request latency by Flask endpoint, method and status',
+    ('endpoint', 'method', 'status')
+)
+request_queries = Histogram(
+    'expensetracker_http_request_sql_queries',
+    'SQL statements executed per request, by Flask endpoint',
+    ('endpoint',),
+    buckets=QUERY_COUNT_BUCKETS
+)
+
+METRICS = (sql_duration, sql_slow, request_duration, request_queries)
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Collapse a statement to its shape: literals and ? lists folded, whitespace squeezed"""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PARAM_LIST_RE.sub('(?)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+def redact(parameters):
+    """Parameter types without their values, safe to log"""
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+def observe_query(sql, parameters, duration):
+    """Record one executed statement"""
+    shape = normalize_sql(sql)
+    if (shape,) not in sql_duration and len(sql_duration) >= MAX_SQL_SHAPES:
+        shape = 'other'
+    sql_duration.observe((shape,), duration)
+
+    if duration >= SLOW_QUERY_THRESHOLD:
+        sql_slow.inc((shape,))
+        logger.warning('Slow query (%.1f ms): %s params=%s', duration * 1000, shape, redact(parameters))
+
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every statement it runs"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_query(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_query(sql, None, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            observe_query(sql_script, None, time.perf_counter() - start)
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_query_count = 0
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_duration.observe(
+            (endpoint, request.method, str(response.status_code)), time.perf_counter() - started
+        )
+        request_queries.observe((endpoint,), g.get('sql_query_count', 0))
+    return response
+
+def render_metrics():
+    """All metrics in Prometheus text format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def init_app(app):
+    """Record per-endpoint latency and query counts on a Flask app"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,221 @@
+"""
+ExpenseTracker Amount Migration
+Online conversion of REAL rupee amounts to INTEGER paise, one batch at a time
+
+A legacy table is copied into a shadow table with the new schema. Triggers
+mirror writes that land meanwhile, each batch commits on its own so no write
+lock is held for long, and one short transaction swaps the tables by
+renaming them. The table's indexes move to the shadow table before the copy,
+so the swap never builds an index while holding the lock.
+
+Usage: python migrate_amounts.py [status|run]
+"""
+
+import re
+import sqlite3
+import sys
+
+from database import BUDGETS_TABLE, EXPENSES_TABLE, get_db_connection
+
+MIGRATION_BATCH_SIZE = 5000
+
+# Tables holding an amount column, with the CREATE TABLE template of their new schema
+AMOUNT_TABLES = (
+    ('expenses', EXPENSES_TABLE),
+    ('budgets', BUDGETS_TABLE),
+)
+
+SHADOW_SUFFIX = '__paise'
+LEGACY_SUFFIX = '__legacy_real'
+
+AMOUNT_TO_MINOR = 'CAST(ROUND({source}amount * 100) AS INTEGER)'
+
+def _columns(conn, table):
+    """(name, declared type) for each column of a table, in order"""
+    return [(row[1], row[2]) for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def needs_migration(conn, table):
+    """True if the table exists and still declares amount as a non-integer type"""
+    for name, declared in _columns(conn, table):
+        if name == 'amount':
+            return declared.upper() != 'INTEGER'
+    return False
+
+def _select_list(columns, source=''):
+    """Column expressions copying a legacy row, converting amount to paise"""
+    return ', '.join(
+        AMOUNT_TO_MINOR.format(source=source) if name == 'amount' else f'{source}{name}'
+        for name in columns
+    )
+
+def _mirror_triggers(table, shadow, columns):
+    """Triggers copying writes on the legacy table into the shadow table"""
+    column_list = ', '.join(columns)
+    new_values = _select_list(columns, 'NEW.')
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_paise_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_paise_update AFTER UPDATE ON {table}
+        BEGIN
+            DELETE FROM {shadow} WHERE id = OLD.id;
+            INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_paise_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM {shadow} WHERE id = OLD.id;
+        END
+        """,
+    ]
+
+def prepare(conn, table, create_template):
+    """Create the shadow table and mirror triggers, and move the indexes over"""
+    shadow = table + SHADOW_SUFFIX
+    columns = [name for name, _ in _columns(conn, table)]
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(create_template.format(table=shadow))
+        shadow_columns = {name for name, _ in _columns(conn, shadow)}
+        copied = [name for name in columns if name in shadow_columns]
+        for statement in _mirror_triggers(table, shadow, copied):
+            conn.execute(statement)
+
+        # Indexes keep their names, so CREATE INDEX IF NOT EXISTS in migrations.py still matches
+        indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,)
+        ).fetchall()
+        on_table = re.compile(rf'\bON\s+"?{table}"?\s*\(', re.IGNORECASE)
+        for name, sql in indexes:
+            conn.execute(f'DROP INDEX {name}')
+            conn.execute(on_table.sub(f'ON {shadow}(', sql, count=1))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return copied
+
+def copy_batches(conn, table, columns, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Copy legacy rows into the shadow table in id order, one transaction per batch
+
+    Rows the mirror triggers already wrote are newer and are kept (INSERT OR
+    IGNORE), so an interrupted run can simply start over.
+    """
+    shadow = table + SHADOW_SUFFIX
+    column_list = ', '.join(columns)
+    select_list = _select_list(columns)
+    last_id = 0
+    copied = 0
+
+    while True:
+        with conn:
+            upper = conn.execute(
+                f'SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)',
+                (last_id, batch_size)
+            ).fetchone()[0]
+            if upper is None:
+                break
+            cursor = conn.execute(
+                f'INSERT OR IGNORE INTO {shadow} ({column_list}) '
+                f'SELECT {select_list} FROM {table} WHERE id > ? AND id <= ?',
+                (last_id, upper)
+            )
+        copied += max(cursor.rowcount, 0)
+        last_id = upper
+        if progress:
+            progress(table, last_id, copied)
+    return copied
+
+def swap(conn, table):
+    """Replace the legacy table with the shadow table in one short transaction
+
+    Triggers on the legacy table (rollups, search, mirrors) are dropped;
+    later migrations recreate the rollup and search triggers on the new table.
+    """
+    shadow = table + SHADOW_SUFFIX
+    legacy = table + LEGACY_SUFFIX
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        legacy_count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        shadow_count = conn.execute(f'SELECT COUNT(*) FROM {shadow}').fetchone()[0]
+        if legacy_count != shadow_count:
+            raise sqlite3.IntegrityError(
+                f'{shadow} has {shadow_count} rows, {table} has {legacy_count}; rerun the migration'
+            )
+
+        triggers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+        ).fetchall()
+        for (name,) in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+
+        # Keep AUTOINCREMENT from reusing ids of rows deleted before the migration
+        sequence = conn.execute(
+            'SELECT MAX(seq) FROM sqlite_sequence WHERE name IN (?, ?)', (table, shadow)
+        ).fetchone()[0]
+
+        conn.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        conn.execute(f'ALTER TABLE {shadow} RENAME TO {table}')
+
+        if sequence is not None:
+            conn.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table,))
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, sequence))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    # Freeing the old pages is the only step proportional to table size left
+    with conn:
+        conn.execute(f'DROP TABLE {legacy}')
+
+def migrate_table(conn, table, create_template, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Run the full online migration for one table; returns rows copied"""
+    columns = prepare(conn, table, create_template)
+    copied = copy_batches(conn, table, columns, batch_size, progress)
+    swap(conn, table)
+    return copied
+
+def migrate_amounts(conn, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Migrate every table that still stores REAL amounts; returns {table: rows copied}"""
+    if conn.in_transaction:
+        conn.commit()
+    migrated = {}
+    for table, create_template in AMOUNT_TABLES:
+        if needs_migration(conn, table):
+            migrated[table] = migrate_table(conn, table, create_template, batch_size, progress)
+            print(f"Converted {table}.amount to integer paise ({migrated[table]} rows)")
+    return migrated
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command == 'run':
+        # Later migrations recreate the indexes and triggers on the new tables
+        from migrations import migrate
+        migrate()
+        print("✅ Amounts are stored as integer paise")
+        return 0
+    if command == 'status':
+        conn = get_db_connection()
+        try:
+            pending = [table for table, _ in AMOUNT_TABLES if needs_migration(conn, table)]
+        finally:
+            conn.close()
+        if pending:
+            print(f"⏳ Still storing REAL amounts: {', '.join(pending)} (run 'python migrate_amounts.py run')")
+            return 1
+        print("✅ Amounts are stored as integer paise")
+        return 0
+    print("Usage: python migrate_amounts.py [status|run]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
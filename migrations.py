@@ -0,0 +1,230 @@
+"""
+ExpenseTracker Schema Migrations
+Ordered schema changes tracked in PRAGMA user_version
+
+Startup reads user_version and returns immediately when it equals
+SCHEMA_VERSION. Otherwise the pending migrations run in order and each one
+records its version as soon as it finishes, so an interrupted upgrade
+resumes where it stopped. Databases created before versioning report 0 and
+replay every step; the early steps only create what is missing, so that is
+safe on a database that already has them.
+
+Every shard file (see sharding.py) carries the same schema and its own
+user_version; steps in DIRECTORY_ONLY only run on shard 0, which holds the
+users and the shard directory.
+
+Usage: python migrations.py [status|run]
+"""
+
+import sys
+
+from database import BUDGETS_TABLE, EXPENSES_TABLE, all_shards, get_shard_connection
+
+def _create_base_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(EXPENSES_TABLE.format(table='expenses'))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            color TEXT DEFAULT '#6366f1',
+            icon TEXT DEFAULT 'shopping',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute(BUDGETS_TABLE.format(table='budgets'))
+
+def _convert_amounts_to_paise(conn):
+    # Batched and committed as it goes (see migrate_amounts.py); a no-op on new databases
+    from migrate_amounts import migrate_amounts
+    migrate_amounts(conn)
+
+def _create_listing_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, expense_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_amount ON expenses(amount)")
+
+    # Per-user indexes matching each listing sort order, so keyset pages are index seeks
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_datetime ON expenses(user_id, expense_date, expense_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_amount ON expenses(user_id, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_category ON expenses(user_id, category, expense_date DESC, id DESC)")
+
+def _create_rollups(conn):
+    from rollups import create_rollup_schema
+    create_rollup_schema(conn)
+
+def _create_search_index(conn):
+    from search import create_search_schema
+    create_search_schema(conn)
+
+def _create_default_admin(conn):
+    # Default admin user for testing (remove in production). Hashed inline:
+    # this runs once, before the hashing pool is worth starting
+    from werkzeug.security import generate_password_hash
+    from auth import HASH_METHOD
+
+    existing_admin = conn.execute(
+        'SELECT id FROM users WHERE username = ?', ('admin',)
+    ).fetchone()
+    if not existing_admin:
+        admin_password = generate_password_hash('admin123', method=HASH_METHOD)  # Change this in production
+        conn.execute(
+            'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+            ('admin', 'admin@expensemanager.com', admin_password)
+        )
+        print("Default admin user created: admin / admin123")
+
+def _create_weekly_rollups(conn):
+    from rollups import create_weekly_rollup_schema
+    create_weekly_rollup_schema(conn)
+
+def _add_budget_alerts(conn):
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(budgets)')]
+    if 'alert_percent' not in columns:
+        conn.execute('ALTER TABLE budgets ADD COLUMN alert_percent INTEGER')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_budgets_user_category ON budgets(user_id, category)")
+
+def _create_recurring_rules(conn):
+    from recurring import create_recurring_schema
+    create_recurring_schema(conn)
+
+def _create_shard_directory(conn):
+    from sharding import create_directory_schema
+    create_directory_schema(conn)
+
+def _create_moved_user_guards(conn):
+    from sharding import create_shard_schema
+    create_shard_schema(conn)
+
+def _create_tag_index(conn):
+    # Existing tags strings are split in committed batches, like step 2
+    from tagging import backfill_tags, create_tag_schema
+    create_tag_schema(conn)
+    if conn.in_transaction:
+        conn.commit()
+    backfill_tags(conn)
+
+def _reference_categories_by_id(conn):
+    # Interns the category strings, then fills category_id in committed batches
+    from categories import migrate_expense_categories
+    migrate_expense_categories(conn)
+
+def _create_data_versions(conn):
+    from cache import create_data_version_schema
+    create_data_version_schema(conn)
+
+def _skip_unreadable_week_dates(conn):
+    from rollups import replace_weekly_rollup_triggers
+    replace_weekly_rollup_triggers(conn)
+
+# (version, description, function); append new steps, never renumber or edit applied ones
+MIGRATIONS = (
+    (1, 'Create users, expenses, categories and budgets tables', _create_base_tables),
+    (2, 'Store amounts as integer paise', _convert_amounts_to_paise),
+    (3, 'Add per-user listing indexes', _create_listing_indexes),
+    (4, 'Add monthly category rollups', _create_rollups),
+    (5, 'Add full-text search index', _create_search_index),
+    (6, 'Create the default admin user', _create_default_admin),
+    (7, 'Add weekly category rollups', _create_weekly_rollups),
+    (8, 'Add budget alert thresholds', _add_budget_alerts),
+    (9, 'Add recurring expense rules', _create_recurring_rules),
+    (10, 'Add the user shard directory', _create_shard_directory),
+    (11, 'Refuse writes for users moved to another shard', _create_moved_user_guards),
+    (12, 'Add the normalized expense tag index', _create_tag_index),
+    (13, 'Reference expense categories by id', _reference_categories_by_id),
+    (14, 'Track per-user data versions for the caches', _create_data_versions),
+    (15, 'Leave unreadable dates out of the weekly rollups', _skip_unreadable_week_dates),
+)
+
+# Steps that only apply to shard 0; other shards skip them but record the version
+DIRECTORY_ONLY = frozenset((6, 10))
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """The version recorded in the database file (0 if never migrated)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def pending_migrations(conn):
+    """Migrations newer than the database's recorded version"""
+    current = get_schema_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > current]
+
+def migrate(conn=None, directory=True, shards=None):
+    """Apply pending migrations in order; returns the versions applied
+
+    With ``conn``, migrates that one database (``directory`` says whether it
+    is shard 0); otherwise every shard in ``shards`` (default all_shards()),
+    creating the files of new shards, and returns shard 0's versions. Costs
+    one PRAGMA read per shard when the schema is current. Steps that need a
+    long-running conversion commit in batches of their own, so with several
+    workers on an outdated database, run `python migrations.py run` before
+    starting them.
+    """
+    if conn is None:
+        applied = []
+        for shard in (all_shards() if shards is None else shards):
+            shard_conn = get_shard_connection(shard)
+            try:
+                versions = migrate(shard_conn, directory=shard == 0)
+            finally:
+                shard_conn.close()
+            if shard == 0:
+                applied = versions
+        return applied
+
+    applied = []
+    where = '' if directory else f" to {getattr(conn.pool, 'database', 'a shard')}"
+    for version, description, step in pending_migrations(conn):
+        skipped = not directory and version in DIRECTORY_ONLY
+        if not skipped:
+            step(conn)
+        if conn.in_transaction:
+            conn.commit()
+        # Recorded in the file header, so readers see it once this commits
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+        applied.append(version)
+        if not skipped:
+            print(f"Applied migration {version}{where}: {description}")
+    return applied
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command == 'run':
+        applied = migrate()
+        print(f"✅ Schema is at version {SCHEMA_VERSION} ({len(applied)} migrations applied)")
+        return 0
+    if command == 'status':
+        outdated = 0
+        for shard in all_shards():
+            conn = get_shard_connection(shard)
+            try:
+                version = get_schema_version(conn)
+                pending = pending_migrations(conn)
+            finally:
+                conn.close()
+            where = '' if len(all_shards()) == 1 else f" on shard {shard}"
+            if pending:
+                outdated += 1
+                print(f"⏳ Schema is at version {version}{where}, {len(pending)} pending:")
+                for pending_version, description, _ in pending:
+                    print(f"   {pending_version}: {description}")
+            else:
+                print(f"✅ Schema is at version {version}{where}")
+        return 1 if outdated else 0
+    print("Usage: python migrations.py [status|run]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -3,10 +3,74 @@ ExpenseTracker Models
 Database models and schema definitions for the expense management application
 """
 
+import re
 import sqlite3
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import get_db_connection
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+from auth import AuthBusy, check_and_upgrade, hash_password
+from database import get_db_connection, get_directory_connection, get_read_connection
+from cache import bump_user_version
+from money import CURRENCY_SYMBOLS, MAX_AMOUNT_MINOR, format_minor
+from date_filters import date_range_clause, period_range
+import budgets
+import write_queue
+from search import search_filter_clause
+from tagging import tag_filter_clause
+from categories import DEFAULT_CATEGORIES, category_name_sql, get_categories, intern_categories, intern_category
+from stats import get_expense_stats
+from sharding import assign_shard
+from pagination import DEFAULT_PAGE_SIZE, DEFAULT_SORT, InvalidCursor, get_sort_keys, order_by_clause, paginate
+
+# Rows per executemany call in bulk_create
+BULK_BATCH_SIZE = 5000
+
+EXPENSE_COLUMNS = (
+    'id', 'user_id', 'expense_date', 'expense_time', 'amount', 'subject', 'description',
+    'category', 'category_id', 'payment_method', 'tags', 'is_recurring', 'created_at', 'updated_at'
+)
+
+# Columns API clients may set when creating or patching an expense
+EXPENSE_WRITABLE_FIELDS = (
+    'expense_date', 'expense_time', 'amount', 'subject', 'description',
+    'category', 'payment_method', 'tags', 'is_recurring'
+)
+
+# Items (creates + patches + deletes) accepted by Expense.apply_batch
+MAX_BATCH_ITEMS = 1000
+
+# expense_date and expense_time as stored; other spellings would sort and bucket wrongly
+EXPENSE_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+EXPENSE_TIME_RE = re.compile(r'(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d)?')
+
+# Columns the expense listing page renders
+LIST_COLUMNS = ('id', 'expense_date', 'expense_time', 'amount', 'subject', 'description', 'category')
+
+# Every expense column plus its category name (expenses only store category_id)
+EXPENSE_SELECT_ALL = f'*, {category_name_sql()} as category'
+
+def expense_select_list(columns):
+    """SELECT list for an expense column projection; 'category' reads the name by category_id"""
+    return ', '.join(f'{category_name_sql()} as category' if column == 'category' else column
+                     for column in columns)
+
+@lru_cache(maxsize=None)
+def expense_row_type(columns):
+    """Read-only row type for a column projection
+
+    A namedtuple: attribute access like Expense, but no per-row __dict__,
+    no connection slot and no field-by-field copy out of the cursor.
+    """
+    row_type = namedtuple('ExpenseRow', columns)
+    row_type.to_dict = row_type._asdict
+    return row_type
+
+@lru_cache(maxsize=None)
+def expense_row_factory(columns):
+    """sqlite3 row_factory producing expense_row_type(columns) rows"""
+    row_type = expense_row_type(tuple(columns))
+    new = tuple.__new__
+    return lambda cursor, row: new(row_type, row)
 
 class BaseModel:
     """Base model class with common functionality"""
@@ -14,10 +78,11 @@ class BaseModel:
     def __init__(self):
         self.conn = None
 
-    def get_connection(self):
-        """Get database connection"""
+    def get_connection(self, user_id=None, read_only=False):
+        """Get database connection (to the shard of ``user_id``, default the model's user)"""
         if not self.conn:
-            self.conn = get_db_connection()
+            connect = get_read_connection if read_only else get_db_connection
+            self.conn = connect(user_id or getattr(self, 'user_id', None))
         return self.conn
 
     def close_connection(self):
@@ -38,6 +103,12 @@ class User(BaseModel):
         self.created_at = None
         self.updated_at = None
 
+    def get_connection(self, user_id=None, read_only=False):
+        """Users live in the directory (shard 0)"""
+        if not self.conn:
+            self.conn = get_directory_connection(read_only)
+        return self.conn
+
     @classmethod
     def create_user(cls, username, email, password):
         """Create a new user"""
@@ -55,13 +126,14 @@ class User(BaseModel):
                 return None, "Username or email already exists"
 
             # Create new user
-            password_hash = generate_password_hash(password)
+            password_hash = hash_password(password)
             insert_query = """INSERT INTO users (username, email, password, created_at, updated_at) 
                              VALUES (?, ?, ?, ?, ?)"""
             cursor = conn.execute(
                 insert_query,
                 (username, email, password_hash, datetime.now(), datetime.now())
             )
+            assign_shard(conn, cursor.lastrowid)
             conn.commit()
 
             # Load the created user
@@ -74,6 +146,8 @@ class User(BaseModel):
 
             return user, "User created successfully"
 
+        except AuthBusy as e:
+            return None, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return None, f"Database error: {str(e)}"
         finally:
@@ -91,7 +165,8 @@ class User(BaseModel):
                 (username,)
             ).fetchone()
 
-            if row and check_password_hash(row['password'], password):
+            if row and check_and_upgrade(conn, row['id'], row['password'], password):
+                row = conn.execute('SELECT * FROM users WHERE id = ?', (row['id'],)).fetchone()
                 user.id = row['id']
                 user.username = row['username']
                 user.email = row['email']
@@ -102,6 +177,8 @@ class User(BaseModel):
 
             return None, "Invalid username or password"
 
+        except AuthBusy as e:
+            return None, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return None, f"Database error: {str(e)}"
         finally:
@@ -111,7 +188,7 @@ class User(BaseModel):
     def get_by_id(cls, user_id):
         """Get user by ID"""
         user = cls()
-        conn = user.get_connection()
+        conn = user.get_connection(read_only=True)
 
         try:
             row = conn.execute(
@@ -140,7 +217,7 @@ class User(BaseModel):
         conn = self.get_connection()
 
         try:
-            password_hash = generate_password_hash(new_password)
+            password_hash = hash_password(new_password)
             conn.execute(
                 'UPDATE users SET password = ?, updated_at = ? WHERE id = ?',
                 (password_hash, datetime.now(), self.id)
@@ -150,6 +227,8 @@ class User(BaseModel):
             self.updated_at = datetime.now()
             return True, "Password updated successfully"
 
+        except AuthBusy as e:
+            return False, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return False, f"Database error: {str(e)}"
         finally:
@@ -178,6 +257,7 @@ class Expense(BaseModel):
         self.subject = None
         self.description = None
         self.category = None
+        self.category_id = None
         self.payment_method = None
         self.tags = None
         self.is_recurring = False
@@ -188,24 +268,27 @@ class Expense(BaseModel):
     def create_expense(cls, user_id, expense_date, expense_time, amount, subject, 
                       description=None, category='Other', payment_method='Cash', 
                       tags=None, is_recurring=False):
-        """Create a new expense"""
+        """Create a new expense (amount in integer paise)"""
         expense = cls()
-        conn = expense.get_connection()
 
         try:
             insert_query = """INSERT INTO expenses 
                              (user_id, expense_date, expense_time, amount, subject, description, 
-                              category, payment_method, tags, is_recurring, created_at, updated_at) 
+                              category_id, payment_method, tags, is_recurring, created_at, updated_at) 
                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-            cursor = conn.execute(
-                insert_query,
-                (user_id, expense_date, expense_time, amount, subject, description,
-                 category, payment_method, tags, is_recurring, datetime.now(), datetime.now())
-            )
-            conn.commit()
+
+            def insert(conn):
+                category_id = intern_category(conn, user_id, category)
+                params = (user_id, expense_date, expense_time, amount, subject, description,
+                          category_id, payment_method, tags, is_recurring, datetime.now(), datetime.now())
+                return conn.execute(insert_query, params).lastrowid, category_id
+
+            # Committed together with other requests' writes (see write_queue.py)
+            expense_id, category_id = write_queue.run(user_id, insert)
+            bump_user_version(user_id, expense_ids=(expense_id,))
 
             # Load the created expense
-            expense.id = cursor.lastrowid
+            expense.id = expense_id
             expense.user_id = user_id
             expense.expense_date = expense_date
             expense.expense_time = expense_time
@@ -213,6 +296,7 @@ class Expense(BaseModel):
             expense.subject = subject
             expense.description = description
             expense.category = category
+            expense.category_id = category_id
             expense.payment_method = payment_method
             expense.tags = tags
             expense.is_recurring = is_recurring
@@ -221,61 +305,291 @@ class Expense(BaseModel):
 
             return expense, "Expense created successfully"
 
+        except write_queue.WriteBusy as e:
+            return None, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return None, f"Database error: {str(e)}"
+
+    @classmethod
+    def bulk_create(cls, user_id, records, batch_size=BULK_BATCH_SIZE):
+        """Insert many expenses in one transaction
+
+        ``records`` is any iterable of expense dicts (it is consumed lazily,
+        batch by batch). Each batch is validated with validate_expense_batch
+        and the valid rows are written with a single executemany. Returns
+        (inserted_count, errors, message) where errors is a list of
+        (row_number, [messages]) with 1-based row numbers.
+        """
+        conn = get_db_connection(user_id)
+        inserted = 0
+        errors = []
+
+        def flush(batch, first_row):
+            batch_errors = validate_expense_batch(batch)
+            for index in sorted(batch_errors):
+                errors.append((first_row + index, batch_errors[index]))
+            now = datetime.now()
+            category_ids = intern_categories(
+                conn, user_id,
+                [r.get('category') or 'Other' for i, r in enumerate(batch) if i not in batch_errors]
+            )
+            values = [
+                (user_id, r['expense_date'], r['expense_time'], r['amount'], r['subject'].strip(),
+                 r.get('description') or None, category_ids[r.get('category') or 'Other'],
+                 r.get('payment_method') or 'Cash', r.get('tags') or None,
+                 bool(r.get('is_recurring')), now, now)
+                for i, r in enumerate(batch) if i not in batch_errors
+            ]
+            conn.executemany(
+                """INSERT INTO expenses 
+                   (user_id, expense_date, expense_time, amount, subject, description, 
+                    category_id, payment_method, tags, is_recurring, created_at, updated_at) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                values
+            )
+            return len(values)
+
+        try:
+            with conn:
+                batch = []
+                first_row = 1
+                for record in records:
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        inserted += flush(batch, first_row)
+                        first_row += len(batch)
+                        batch = []
+                if batch:
+                    inserted += flush(batch, first_row)
+
+            if inserted:
+                bump_user_version(user_id)
+            return inserted, errors, f"Imported {inserted} expenses"
+
+        except sqlite3.Error as e:
+            return 0, errors, f"Database error: {str(e)}"
         finally:
-            expense.close_connection()
+            conn.close()
 
     @classmethod
-    def get_by_user(cls, user_id, limit=None, offset=0, filters=None):
-        """Get expenses by user with optional filters"""
-        conn = get_db_connection()
+    def apply_batch(cls, user_id, creates=(), updates=(), deletes=(), atomic=False):
+        """Create, patch and delete many expenses in one transaction
+
+        ``creates`` are expense dicts, ``updates`` dicts holding an ``id``
+        plus the fields to change, ``deletes`` expense ids; amounts are
+        integer paise. Every item is checked with validate_expense_data
+        first (patches merged onto the stored row) and gets a result dict:
+        op, index, status ('created', 'updated', 'deleted', 'invalid',
+        'not_found' or 'skipped') and its id or errors. Valid items are
+        then written together; with ``atomic`` nothing is written unless
+        all are valid, and the valid items are 'skipped'.
+        Returns (results, applied_count, message); results is None on a
+        database error, when nothing was written.
+        """
+        conn = get_db_connection(user_id)
+        results = []
+        inserts, patches, removals = [], [], []
+
+        def reject(result, status, errors=None):
+            result['status'] = status
+            if errors:
+                result['errors'] = errors
+            results.append(result)
 
         try:
-            query = 'SELECT * FROM expenses WHERE user_id = ?'
-            params = [user_id]
+            ids = [item.get('id') for item in updates if isinstance(item, dict)] + list(deletes)
+            stored = cls._rows_by_id(conn, user_id, [i for i in ids if _is_expense_id(i)])
+
+            for index, record in enumerate(creates):
+                result = {'op': 'create', 'index': index}
+                errors = _batch_item_errors(record)
+                if errors:
+                    reject(result, 'invalid', errors)
+                    continue
+                inserts.append((result, record))
+                results.append(result)
+
+            for index, item in enumerate(updates):
+                result = {'op': 'update', 'index': index}
+                expense_id = item.get('id') if isinstance(item, dict) else None
+                if not _is_expense_id(expense_id):
+                    reject(result, 'invalid', ["Expense id is required"])
+                    continue
+                result['id'] = expense_id
+                if expense_id not in stored:
+                    reject(result, 'not_found')
+                    continue
+                changes = {field: value for field, value in item.items() if field != 'id'}
+                errors = _batch_item_errors(changes, stored[expense_id])
+                if errors:
+                    reject(result, 'invalid', errors)
+                    continue
+                if 'is_recurring' in changes:
+                    # Stored as creates store it
+                    changes['is_recurring'] = bool(changes['is_recurring'])
+                stored[expense_id].update(changes)
+                patches.append((result, expense_id, changes))
+                results.append(result)
+
+            deleted = set()
+            for index, expense_id in enumerate(deletes):
+                result = {'op': 'delete', 'index': index}
+                if not _is_expense_id(expense_id):
+                    reject(result, 'invalid', ["Expense id is required"])
+                    continue
+                result['id'] = expense_id
+                if expense_id not in stored or expense_id in deleted:
+                    reject(result, 'not_found')
+                    continue
+                deleted.add(expense_id)
+                removals.append((result, expense_id))
+                results.append(result)
+
+            # Only rejected items have a status yet
+            if atomic and any('status' in result for result in results):
+                for result in results:
+                    result.setdefault('status', 'skipped')
+                return results, 0, "Nothing written: the batch has invalid items"
+
+            now = datetime.now()
+            # Patches and deletes of rows that vanished since they were read
+            missed = 0
+            with conn:
+                category_ids = intern_categories(
+                    conn, user_id,
+                    [r.get('category') or 'Other' for _, r in inserts]
+                    + [changes['category'] for _, _, changes in patches if 'category' in changes]
+                )
+                for result, r in inserts:
+                    result['id'] = conn.execute(
+                        """INSERT INTO expenses 
+                           (user_id, expense_date, expense_time, amount, subject, description, 
+                            category_id, payment_method, tags, is_recurring, created_at, updated_at) 
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (user_id, r['expense_date'], r['expense_time'], r['amount'],
+                         r['subject'].strip(), r.get('description') or None,
+                         category_ids[r.get('category') or 'Other'], r.get('payment_method') or 'Cash',
+                         r.get('tags') or None, bool(r.get('is_recurring')), now, now)
+                    ).lastrowid
+                for result, expense_id, changes in patches:
+                    if 'category' in changes:
+                        changes = dict(changes)
+                        changes['category_id'] = category_ids[changes.pop('category')]
+                    assignments = ', '.join(f"{field} = ?" for field in changes)
+                    missed += 1 - conn.execute(
+                        f"UPDATE expenses SET {assignments}, updated_at = ? WHERE id = ? AND user_id = ?",
+                        list(changes.values()) + [now, expense_id, user_id]
+                    ).rowcount
+                missed += len(removals) - max(conn.executemany(
+                    'DELETE FROM expenses WHERE id = ? AND user_id = ?',
+                    [(expense_id, user_id) for _, expense_id in removals]
+                ).rowcount, 0)
+
+            for result, *_ in inserts:
+                result['status'] = 'created'
+            for result, *_ in patches:
+                result['status'] = 'updated'
+            for result, _ in removals:
+                result['status'] = 'deleted'
+            applied = len(inserts) + len(patches) + len(removals)
+            if applied:
+                # Listeners count the ids against the version, so only name rows surely written
+                bump_user_version(user_id, expense_ids=None if missed else [
+                    result['id'] for result in results
+                    if result['status'] in ('created', 'updated', 'deleted')
+                ])
+            return results, applied, f"Applied {applied} of {len(results)} changes"
 
-            # Apply filters
-            if filters:
-                if filters.get('category') and filters['category'] != 'all':
-                    query += ' AND category = ?'
-                    params.append(filters['category'])
+        except sqlite3.Error as e:
+            return None, 0, f"Database error: {str(e)}"
+        finally:
+            conn.close()
 
-                if filters.get('date_from'):
-                    query += ' AND expense_date >= ?'
-                    params.append(filters['date_from'])
+    @staticmethod
+    def _rows_by_id(conn, user_id, expense_ids, chunk_size=500):
+        """{id: row dict} for those of ``expense_ids`` that belong to the user"""
+        rows = {}
+        unique = list(dict.fromkeys(expense_ids))
+        for start in range(0, len(unique), chunk_size):
+            chunk = unique[start:start + chunk_size]
+            for row in conn.execute(
+                f"SELECT {EXPENSE_SELECT_ALL} FROM expenses "
+                f"WHERE user_id = ? AND id IN ({', '.join('?' * len(chunk))})",
+                [user_id] + chunk
+            ):
+                rows[row['id']] = dict(row)
+        return rows
 
-                if filters.get('date_to'):
-                    query += ' AND expense_date <= ?'
-                    params.append(filters['date_to'])
+    @classmethod
+    def build_filter_query(cls, user_id, filters=None, columns=EXPENSE_SELECT_ALL):
+        """Build the filtered SELECT (without ORDER BY) and its parameters"""
+        query = f'SELECT {columns} FROM expenses WHERE user_id = ?'
+        params = [user_id]
+
+        if not filters:
+            return query, params
+
+        if filters.get('search'):
+            search_sql, search_params = search_filter_clause(user_id, filters['search'])
+            if search_sql:
+                # Drive the query from the FTS matches; the unary + stops SQLite
+                # from walking every row of the user's index instead
+                query = f'SELECT {columns} FROM expenses WHERE +user_id = ?' + search_sql
+                params.extend(search_params)
+
+        if filters.get('tags'):
+            tag_sql, tag_params = tag_filter_clause(user_id, filters['tags'],
+                                                    filters.get('tag_mode', 'any'))
+            if tag_sql:
+                # Likewise driven from the tag index's postings
+                query = query.replace('WHERE user_id = ?', 'WHERE +user_id = ?', 1) + tag_sql
+                params.extend(tag_params)
+
+        # Relative periods used by the view_expenses filter buttons
+        start, end = period_range(filters.get('period'))
+        date_sql, date_params = date_range_clause(start, end)
+        query += date_sql
+        params.extend(date_params)
+
+        # Explicit dates (inclusive) narrow the period further
+        start, end = period_range('custom', date_from=filters.get('date_from'),
+                                  date_to=filters.get('date_to'))
+        date_sql, date_params = date_range_clause(start, end)
+        query += date_sql
+        params.extend(date_params)
+
+        if filters.get('category') and filters['category'] != 'all':
+            query += ' AND category_id = (SELECT id FROM categories WHERE user_id = ? AND name = ?)'
+            params.extend([user_id, filters['category']])
+
+        if filters.get('min_amount'):
+            query += ' AND amount >= ?'
+            params.append(filters['min_amount'])
+
+        if filters.get('max_amount'):
+            query += ' AND amount <= ?'
+            params.append(filters['max_amount'])
+
+        return query, params
 
-                if filters.get('min_amount'):
-                    query += ' AND amount >= ?'
-                    params.append(filters['min_amount'])
+    @classmethod
+    def get_by_user(cls, user_id, limit=None, offset=0, filters=None):
+        """Get expenses by user with optional filters
 
-                if filters.get('max_amount'):
-                    query += ' AND amount <= ?'
-                    params.append(filters['max_amount'])
+        ``filters['tags']`` (a list of tag names) keeps the expenses tagged
+        with any of them, or with all of them when ``filters['tag_mode']``
+        is 'all'.
+        """
+        conn = get_read_connection(user_id)
 
-                if filters.get('search'):
-                    query += ' AND (subject LIKE ? OR description LIKE ?)'
-                    search_term = f"%{filters['search']}%"
-                    params.extend([search_term, search_term])
+        try:
+            query, params = cls.build_filter_query(user_id, filters)
 
             # Apply sorting
-            sort_by = filters.get('sort_by', 'date_desc') if filters else 'date_desc'
-            if sort_by == 'date_desc':
-                query += ' ORDER BY expense_date DESC, expense_time DESC'
-            elif sort_by == 'date_asc':
-                query += ' ORDER BY expense_date ASC, expense_time ASC'
-            elif sort_by == 'amount_desc':
-                query += ' ORDER BY amount DESC'
-            elif sort_by == 'amount_asc':
-                query += ' ORDER BY amount ASC'
-            elif sort_by == 'category':
-                query += ' ORDER BY category, expense_date DESC'
-
-            # Apply pagination
+            sort_by = filters.get('sort_by', DEFAULT_SORT) if filters else DEFAULT_SORT
+            query += order_by_clause(sort_by)
+
+            # Apply pagination (prefer get_page for deep pages)
             if limit:
                 query += ' LIMIT ? OFFSET ?'
                 params.extend([limit, offset])
@@ -295,14 +609,88 @@ class Expense(BaseModel):
         finally:
             conn.close()
 
+    @classmethod
+    def get_rows(cls, user_id, limit=None, offset=0, filters=None, columns=EXPENSE_COLUMNS):
+        """Read-only get_by_user: ExpenseRow tuples holding only ``columns``"""
+        conn = get_read_connection(user_id)
+
+        try:
+            columns = tuple(columns)
+            query, params = cls.build_filter_query(user_id, filters, expense_select_list(columns))
+            sort_by = filters.get('sort_by', DEFAULT_SORT) if filters else DEFAULT_SORT
+            query += order_by_clause(sort_by)
+
+            if limit:
+                query += ' LIMIT ? OFFSET ?'
+                params.extend([limit, offset])
+
+            cursor = conn.cursor()
+            cursor.row_factory = expense_row_factory(columns)
+            return cursor.execute(query, params).fetchall(), "Success"
+
+        except sqlite3.Error as e:
+            return [], f"Database error: {str(e)}"
+        finally:
+            conn.close()
+
+    @classmethod
+    def get_page(cls, user_id, filters=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Get one keyset page of a user's expenses
+
+        Returns (expenses, next_cursor, message). Pass next_cursor back to
+        fetch the following page; it is None on the last page.
+        """
+        conn = get_read_connection(user_id)
+
+        try:
+            query, params = cls.build_filter_query(user_id, filters)
+            sort_by = filters.get('sort_by', DEFAULT_SORT) if filters else DEFAULT_SORT
+            rows, next_cursor = paginate(conn, query, params, sort_by, cursor, page_size)
+
+            expenses = []
+            for row in rows:
+                expense = cls()
+                expense.load_from_row(row)
+                expenses.append(expense)
+
+            return expenses, next_cursor, "Success"
+
+        except InvalidCursor as e:
+            return [], None, f"Invalid cursor: {str(e)}"
+        except sqlite3.Error as e:
+            return [], None, f"Database error: {str(e)}"
+        finally:
+            conn.close()
+
+    @classmethod
+    def get_page_rows(cls, user_id, filters=None, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                      columns=LIST_COLUMNS):
+        """Read-only get_page: ExpenseRow tuples holding ``columns`` plus the sort keys"""
+        conn = get_read_connection(user_id)
+
+        try:
+            sort_by = filters.get('sort_by', DEFAULT_SORT) if filters else DEFAULT_SORT
+            columns = projection_with_sort_keys(columns, sort_by)
+            query, params = cls.build_filter_query(user_id, filters, expense_select_list(columns))
+            rows, next_cursor = paginate(conn, query, params, sort_by, cursor, page_size,
+                                         row_factory=expense_row_factory(columns))
+            return rows, next_cursor, "Success"
+
+        except InvalidCursor as e:
+            return [], None, f"Invalid cursor: {str(e)}"
+        except sqlite3.Error as e:
+            return [], None, f"Database error: {str(e)}"
+        finally:
+            conn.close()
+
     @classmethod
     def get_by_id(cls, expense_id, user_id=None):
         """Get expense by ID"""
         expense = cls()
-        conn = expense.get_connection()
+        conn = expense.get_connection(user_id, read_only=True)
 
         try:
-            query = 'SELECT * FROM expenses WHERE id = ?'
+            query = f'SELECT {EXPENSE_SELECT_ALL} FROM expenses WHERE id = ?'
             params = [expense_id]
 
             if user_id:
@@ -324,46 +712,11 @@ class Expense(BaseModel):
 
     @classmethod
     def get_statistics(cls, user_id, period=None):
-        """Get expense statistics for a user"""
-        conn = get_db_connection()
+        """Get expense statistics for a user (amounts in paise)"""
+        conn = get_read_connection(user_id)
 
         try:
-            stats = {}
-
-            # Total expenses
-            row = conn.execute(
-                'SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total FROM expenses WHERE user_id = ?',
-                (user_id,)
-            ).fetchone()
-            stats['total_expenses'] = row['count']
-            stats['total_amount'] = row['total']
-
-            # Current month
-            current_month = datetime.now().strftime('%Y-%m')
-            monthly_query = """SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-                              FROM expenses WHERE user_id = ? AND strftime('%Y-%m', expense_date) = ?"""
-            row = conn.execute(monthly_query, (user_id, current_month)).fetchone()
-            stats['monthly_expenses'] = row['count']
-            stats['monthly_amount'] = row['total']
-
-            # Category breakdown
-            category_query = """SELECT category, COUNT(*) as count, SUM(amount) as total
-                               FROM expenses WHERE user_id = ? 
-                               GROUP BY category ORDER BY total DESC"""
-            category_rows = conn.execute(category_query, (user_id,)).fetchall()
-            stats['categories'] = [dict(row) for row in category_rows]
-
-            # Monthly trend (last 12 months)
-            trend_query = """SELECT strftime('%Y-%m', expense_date) as month, 
-                                   COUNT(*) as count, SUM(amount) as total
-                            FROM expenses WHERE user_id = ? 
-                            AND expense_date >= date('now', '-12 months')
-                            GROUP BY strftime('%Y-%m', expense_date)
-                            ORDER BY month"""
-            monthly_rows = conn.execute(trend_query, (user_id,)).fetchall()
-            stats['monthly_trend'] = [dict(row) for row in monthly_rows]
-
-            return stats, "Success"
+            return get_expense_stats(conn, user_id).to_dict(), "Success"
 
         except sqlite3.Error as e:
             return {}, f"Database error: {str(e)}"
@@ -372,15 +725,21 @@ class Expense(BaseModel):
 
     def update(self, **kwargs):
         """Update expense fields"""
-        conn = self.get_connection()
-
         try:
             # Build dynamic update query
             fields = []
             values = []
+            previous_user_id = self.user_id
+            category_index = None
 
             for field, value in kwargs.items():
-                if hasattr(self, field) and field != 'id':
+                if field == 'category':
+                    # Stored as the user's category id, looked up in the write below
+                    category_index = len(values)
+                    fields.append("category_id = ?")
+                    values.append(None)
+                    self.category = value
+                elif hasattr(self, field) and field not in ('id', 'category_id'):
                     fields.append(f"{field} = ?")
                     values.append(value)
                     setattr(self, field, value)
@@ -394,30 +753,41 @@ class Expense(BaseModel):
             values.append(self.id)
 
             query = f"UPDATE expenses SET {', '.join(fields)} WHERE id = ?"
-            conn.execute(query, values)
-            conn.commit()
+
+            def write(conn):
+                if category_index is not None:
+                    self.category_id = values[category_index] = intern_category(
+                        conn, self.user_id, self.category
+                    )
+                return conn.execute(query, values).rowcount
+
+            written = (self.id,) if write_queue.run(previous_user_id, write) else ()
+            bump_user_version(self.user_id, expense_ids=written)
+            if previous_user_id != self.user_id:
+                bump_user_version(previous_user_id, expense_ids=written)
 
             self.updated_at = datetime.now()
             return True, "Expense updated successfully"
 
+        except write_queue.WriteBusy as e:
+            return False, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return False, f"Database error: {str(e)}"
-        finally:
-            self.close_connection()
 
     def delete(self):
         """Delete expense"""
-        conn = self.get_connection()
-
         try:
-            conn.execute('DELETE FROM expenses WHERE id = ?', (self.id,))
-            conn.commit()
+            deleted = write_queue.run(
+                self.user_id,
+                lambda conn: conn.execute('DELETE FROM expenses WHERE id = ?', (self.id,)).rowcount
+            )
+            bump_user_version(self.user_id, expense_ids=(self.id,) if deleted else ())
             return True, "Expense deleted successfully"
 
+        except write_queue.WriteBusy as e:
+            return False, f"Server busy: {str(e)}"
         except sqlite3.Error as e:
             return False, f"Database error: {str(e)}"
-        finally:
-            self.close_connection()
 
     def load_from_row(self, row):
         """Load expense data from database row"""
@@ -429,6 +799,7 @@ class Expense(BaseModel):
         self.subject = row['subject']
         self.description = row['description']
         self.category = row['category']
+        self.category_id = row['category_id']
         self.payment_method = row['payment_method']
         self.tags = row['tags']
         self.is_recurring = row['is_recurring']
@@ -446,6 +817,7 @@ class Expense(BaseModel):
             'subject': self.subject,
             'description': self.description,
             'category': self.category,
+            'category_id': self.category_id,
             'payment_method': self.payment_method,
             'tags': self.tags,
             'is_recurring': self.is_recurring,
@@ -453,13 +825,218 @@ class Expense(BaseModel):
             'updated_at': self.updated_at
         }
 
+class Budget(BaseModel):
+    """Budget model: a spending limit per category and period"""
+
+    FIELDS = ('category', 'amount', 'period', 'start_date', 'end_date', 'alert_percent')
+
+    def __init__(self):
+        super().__init__()
+        self.id = None
+        self.user_id = None
+        self.category = None
+        self.amount = None
+        self.period = 'monthly'
+        self.start_date = None
+        self.end_date = None
+        self.alert_percent = None
+        self.created_at = None
+
+    @classmethod
+    def create_budget(cls, user_id, category, amount, period='monthly', start_date=None,
+                      end_date=None, alert_percent=None):
+        """Create a new budget (amount in integer paise)"""
+        budget = cls()
+        conn = budget.get_connection(user_id)
+        start_date = start_date or date.today().isoformat()
+
+        try:
+            cursor = conn.execute(
+                """INSERT INTO budgets
+                   (user_id, category, amount, period, start_date, end_date, alert_percent)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, category, amount, period, start_date, end_date, alert_percent)
+            )
+            conn.commit()
+            row = conn.execute('SELECT * FROM budgets WHERE id = ?', (cursor.lastrowid,)).fetchone()
+            budget.load_from_row(row)
+            return budget, "Budget created successfully"
+
+        except sqlite3.Error as e:
+            return None, f"Database error: {str(e)}"
+        finally:
+            budget.close_connection()
+
+    @classmethod
+    def get_by_id(cls, budget_id, user_id=None):
+        """Get budget by ID"""
+        budget = cls()
+        conn = budget.get_connection(user_id, read_only=True)
+
+        try:
+            query = 'SELECT * FROM budgets WHERE id = ?'
+            params = [budget_id]
+
+            if user_id:
+                query += ' AND user_id = ?'
+                params.append(user_id)
+
+            row = conn.execute(query, params).fetchone()
+            if row:
+                budget.load_from_row(row)
+                return budget
+            return None
+
+        except sqlite3.Error:
+            return None
+        finally:
+            budget.close_connection()
+
+    @classmethod
+    def get_by_user(cls, user_id):
+        """All budgets of a user, by category and period"""
+        conn = get_read_connection(user_id)
+
+        try:
+            rows = conn.execute(
+                'SELECT * FROM budgets WHERE user_id = ? ORDER BY category, period, start_date',
+                (user_id,)
+            ).fetchall()
+            result = []
+            for row in rows:
+                budget = cls()
+                budget.load_from_row(row)
+                result.append(budget)
+            return result
+
+        except sqlite3.Error:
+            return []
+        finally:
+            conn.close()
+
+    @classmethod
+    def evaluate_all(cls, user_id, day=None):
+        """Budget-vs-actual for every budget in force on ``day`` (amounts in paise)"""
+        conn = get_read_connection(user_id)
+
+        try:
+            return budgets.evaluate_budgets(conn, user_id, day), "Success"
+
+        except sqlite3.Error as e:
+            return [], f"Database error: {str(e)}"
+        finally:
+            conn.close()
+
+    def evaluate(self, day=None):
+        """Budget-vs-actual for the period containing ``day`` (default today)"""
+        conn = self.get_connection(read_only=True)
+
+        try:
+            return budgets.evaluate_budget(conn, self.to_dict(), day)
+        finally:
+            self.close_connection()
+
+    def update(self, **kwargs):
+        """Update budget fields"""
+        conn = self.get_connection()
+
+        try:
+            fields = []
+            values = []
+
+            for field, value in kwargs.items():
+                if field in self.FIELDS:
+                    fields.append(f"{field} = ?")
+                    values.append(value)
+                    setattr(self, field, value)
+
+            if not fields:
+                return False, "No valid fields to update"
+
+            values.append(self.id)
+            conn.execute(f"UPDATE budgets SET {', '.join(fields)} WHERE id = ?", values)
+            conn.commit()
+            return True, "Budget updated successfully"
+
+        except sqlite3.Error as e:
+            return False, f"Database error: {str(e)}"
+        finally:
+            self.close_connection()
+
+    def delete(self):
+        """Delete budget"""
+        conn = self.get_connection()
+
+        try:
+            conn.execute('DELETE FROM budgets WHERE id = ?', (self.id,))
+            conn.commit()
+            return True, "Budget deleted successfully"
+
+        except sqlite3.Error as e:
+            return False, f"Database error: {str(e)}"
+        finally:
+            self.close_connection()
+
+    def load_from_row(self, row):
+        """Load budget data from database row"""
+        self.id = row['id']
+        self.user_id = row['user_id']
+        self.category = row['category']
+        self.amount = row['amount']
+        self.period = row['period']
+        self.start_date = row['start_date']
+        self.end_date = row['end_date']
+        self.alert_percent = row['alert_percent']
+        self.created_at = row['created_at']
+
+    def to_dict(self):
+        """Convert budget object to dictionary"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'category': self.category,
+            'amount': self.amount,
+            'period': self.period,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'alert_percent': self.alert_percent,
+            'created_at': self.created_at
+        }
+
 # Utility functions
+def projection_with_sort_keys(columns, sort_by):
+    """Column projection extended with the keys a keyset cursor is built from"""
+    columns = tuple(columns)
+    return columns + tuple(column for column, _ in get_sort_keys(sort_by) if column not in columns)
+
 def format_currency(amount, currency='INR'):
-    """Format amount as currency"""
-    if currency == 'INR':
-        return f"₹{amount:,.2f}"
+    """Format an amount in paise as currency"""
+    if currency in CURRENCY_SYMBOLS:
+        return f"{CURRENCY_SYMBOLS[currency]}{format_minor(amount)}"
     else:
-        return f"{currency} {amount:,.2f}"
+        return f"{currency} {format_minor(amount)}"
+
+def _is_minor_amount(value):
+    """Amounts must already be integer paise (see money.to_minor)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_expense_date(value):
+    """A real calendar day written YYYY-MM-DD (what the rollup triggers can bucket)"""
+    if not isinstance(value, str) or not EXPENSE_DATE_RE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def is_expense_time(value):
+    """HH:MM on a 24-hour clock (seconds allowed)"""
+    return isinstance(value, str) and EXPENSE_TIME_RE.fullmatch(value) is not None
+
+def _is_recurring_flag(value):
+    """True/False (or the 0/1 SQLite stores them as); None when not given"""
+    return value is None or (isinstance(value, int) and value in (0, 1))
 
 def validate_expense_data(data):
     """Validate expense data"""
@@ -467,9 +1044,9 @@ def validate_expense_data(data):
 
     if not data.get('amount'):
         errors.append("Amount is required")
-    elif not isinstance(data['amount'], (int, float)) or data['amount'] <= 0:
+    elif not _is_minor_amount(data['amount']) or data['amount'] <= 0:
         errors.append("Amount must be a positive number")
-    elif data['amount'] > 1000000:
+    elif data['amount'] > MAX_AMOUNT_MINOR:
         errors.append("Amount cannot exceed ₹10,00,000")
 
     if not data.get('subject') or not data['subject'].strip():
@@ -479,30 +1056,126 @@ def validate_expense_data(data):
 
     if not data.get('expense_date'):
         errors.append("Expense date is required")
+    elif not is_expense_date(data['expense_date']):
+        errors.append("Expense date must be YYYY-MM-DD")
 
     if not data.get('expense_time'):
         errors.append("Expense time is required")
+    elif not is_expense_time(data['expense_time']):
+        errors.append("Expense time must be HH:MM")
 
     if data.get('description') and len(data['description']) > 500:
         errors.append("Description cannot exceed 500 characters")
 
+    if not _is_recurring_flag(data.get('is_recurring')):
+        errors.append("Is recurring must be true or false")
+
+    return errors
+
+def _is_expense_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _batch_item_errors(fields, stored=None):
+    """Errors for one create (or a patch merged onto its ``stored`` row) in Expense.apply_batch"""
+    if not isinstance(fields, dict):
+        return ["Each item must be an object"]
+    unknown = [field for field in fields if field not in EXPENSE_WRITABLE_FIELDS]
+    if unknown:
+        return [f"Unknown field: {field}" for field in unknown]
+    not_text = [field for field in ('expense_date', 'expense_time', 'subject', 'description',
+                                    'category', 'payment_method', 'tags')
+                if fields.get(field) is not None and not isinstance(fields[field], str)]
+    if not_text:
+        return [f"{field.replace('_', ' ').capitalize()} must be a string" for field in not_text]
+    return validate_expense_data(dict(stored, **fields) if stored else fields)
+
+def validate_expense_batch(records):
+    """Validate a batch of expense dicts column by column
+
+    Applies the same rules as validate_expense_data, one column at a time
+    over the whole batch. Returns {index: [errors]} for invalid records only.
+    """
+    errors = {}
+
+    def flag(indexes, message):
+        for i in indexes:
+            errors.setdefault(i, []).append(message)
+
+    amounts = [r.get('amount') for r in records]
+    numeric = [_is_minor_amount(a) for a in amounts]
+    flag([i for i, a in enumerate(amounts) if not a], "Amount is required")
+    flag([i for i, a in enumerate(amounts) if a and (not numeric[i] or a <= 0)],
+         "Amount must be a positive number")
+    flag([i for i, a in enumerate(amounts) if a and numeric[i] and a > MAX_AMOUNT_MINOR],
+         "Amount cannot exceed ₹10,00,000")
+
+    subjects = [r.get('subject') for r in records]
+    flag([i for i, s in enumerate(subjects) if not s or not s.strip()], "Subject is required")
+    flag([i for i, s in enumerate(subjects) if s and s.strip() and len(s) > 100],
+         "Subject cannot exceed 100 characters")
+
+    flag([i for i, r in enumerate(records) if not r.get('expense_date')], "Expense date is required")
+    flag([i for i, r in enumerate(records) if r.get('expense_date') and not is_expense_date(r['expense_date'])],
+         "Expense date must be YYYY-MM-DD")
+    flag([i for i, r in enumerate(records) if not r.get('expense_time')], "Expense time is required")
+    flag([i for i, r in enumerate(records) if r.get('expense_time') and not is_expense_time(r['expense_time'])],
+         "Expense time must be HH:MM")
+
+    flag([i for i, r in enumerate(records) if r.get('description') and len(r['description']) > 500],
+         "Description cannot exceed 500 characters")
+    flag([i for i, r in enumerate(records) if not _is_recurring_flag(r.get('is_recurring'))],
+         "Is recurring must be true or false")
+
     return errors
 
-def get_expense_categories():
-    """Get list of available expense categories"""
-    return [
-        'Food & Dining',
-        'Transportation', 
-        'Shopping',
-        'Bills & Utilities',
-        'Entertainment',
-        'Healthcare',
-        'Education',
-        'Travel',
-        'Groceries',
-        'Gas',
-        'Other'
-    ]
+def validate_budget_data(data, user_id=None):
+    """Validate budget data (amount in paise, dates as YYYY-MM-DD)
+
+    The category must be one of ``user_id``'s categories (the defaults
+    without a user) or budgets.ALL_CATEGORIES.
+    """
+    errors = []
+
+    if not data.get('category'):
+        errors.append("Category is required")
+    elif data['category'] not in get_expense_categories(user_id) + [budgets.ALL_CATEGORIES]:
+        errors.append("Unknown category")
+
+    if not data.get('amount'):
+        errors.append("Amount is required")
+    elif not _is_minor_amount(data['amount']) or data['amount'] <= 0:
+        errors.append("Amount must be a positive number")
+
+    if data.get('period', 'monthly') not in budgets.BUDGET_PERIODS:
+        errors.append("Period must be weekly, monthly or yearly")
+
+    dates = {}
+    for field in ('start_date', 'end_date'):
+        if data.get(field):
+            try:
+                dates[field] = date.fromisoformat(data[field])
+            except (TypeError, ValueError):
+                errors.append(f"{field.replace('_', ' ').capitalize()} must be YYYY-MM-DD")
+    if len(dates) == 2 and dates['end_date'] < dates['start_date']:
+        errors.append("End date cannot be before start date")
+
+    alert_percent = data.get('alert_percent')
+    if alert_percent is not None and (isinstance(alert_percent, bool)
+                                      or not isinstance(alert_percent, int)
+                                      or not 1 <= alert_percent <= 100):
+        errors.append("Alert percent must be a whole number from 1 to 100")
+
+    return errors
+
+def get_expense_categories(user_id=None):
+    """Get list of available expense categories
+
+    With ``user_id``, that user's categories from the categories table
+    (cached until their next write); otherwise the defaults every user starts with.
+    """
+    if user_id is None:
+        return list(DEFAULT_CATEGORIES)
+    return get_categories(user_id)
 
 if __name__ == '__main__':
     # Test the models
@@ -515,12 +1188,12 @@ if __name__ == '__main__':
 
         # Test expense creation
         expense, message = Expense.create_expense(
-            user.id, '2024-09-24', '14:30', 250.00, 
+            user.id, '2024-09-24', '14:30', 25000, 
             'Test Lunch', 'Testing expense creation', 'Food & Dining'
         )
 
         if expense:
-            print(f"✅ Expense created: {expense.subject} - ₹{expense.amount}")
+            print(f"✅ Expense created: {expense.subject} - {format_currency(expense.amount)}")
         else:
             print(f"❌ Expense creation failed: {message}")
     else:
@@ -0,0 +1,66 @@
+"""
+ExpenseTracker Money
+Amounts are stored and summed as integer paise; these helpers convert at the edges
+
+Parsing goes through Decimal so "0.1" + "0.2" never picks up binary float
+error, and formatting splits the integer instead of going through a float.
+"""
+
+from decimal import Decimal, DecimalException, InvalidOperation, ROUND_HALF_UP
+
+MINOR_PER_UNIT = 100
+
+# ₹10,00,000 in paise, the largest single expense accepted
+MAX_AMOUNT_MINOR = 1000000 * MINOR_PER_UNIT
+
+# The most a paise value can be and still bind as an SQLite INTEGER
+MAX_STORABLE_MINOR = 2 ** 63 - 1
+
+CURRENCY_SYMBOLS = {'INR': '₹'}
+
+class InvalidAmount(ValueError):
+    """Raised when a value can't be read as a money amount"""
+
+def to_minor(value):
+    """Convert rupees (str, int, float or Decimal) to integer paise, rounding half up"""
+    if isinstance(value, bool) or value is None:
+        raise InvalidAmount(f'Not an amount: {value!r}')
+    if isinstance(value, str):
+        value = value.strip().replace(',', '').lstrip('₹').strip()
+    try:
+        # str() first so floats convert by their shortest repr, not their binary value
+        amount = Decimal(str(value)) if isinstance(value, float) else Decimal(value)
+    except (InvalidOperation, ValueError, TypeError):
+        raise InvalidAmount(f'Not an amount: {value!r}')
+    if not amount.is_finite():
+        raise InvalidAmount(f'Not an amount: {value!r}')
+    try:
+        # Beyond the context's 28 digits (say "1e30") quantize can't be exact and raises
+        minor = (amount * MINOR_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    except DecimalException:
+        raise InvalidAmount(f'Amount too large: {value!r}')
+    if abs(minor) > MAX_STORABLE_MINOR:
+        raise InvalidAmount(f'Amount too large: {value!r}')
+    return int(minor)
+
+def to_major(minor):
+    """Paise to rupees as a float, for JSON and charts only"""
+    return None if minor is None else minor / MINOR_PER_UNIT
+
+def minor_to_str(minor):
+    """Paise to a plain decimal string such as "1234.50" (CSV cells, form values)"""
+    if minor is None:
+        return ''
+    sign = '-' if minor < 0 else ''
+    units, cents = divmod(abs(int(minor)), MINOR_PER_UNIT)
+    return f'{sign}{units}.{cents:02d}'
+
+def format_minor(minor, decimals=2):
+    """Paise to a grouped display string such as "1,234.50" (or "1,235" with decimals=0)"""
+    minor = int(minor or 0)
+    sign = '-' if minor < 0 else ''
+    if decimals == 0:
+        units = (abs(minor) + MINOR_PER_UNIT // 2) // MINOR_PER_UNIT
+        return f'{sign}{units:,}'
+    units, cents = divmod(abs(minor), MINOR_PER_UNIT)
+    return f'{sign}{units:,}.{cents:02d}'
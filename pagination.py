@@ -0,0 +1,142 @@
+"""
+ExpenseTracker Pagination
+Keyset (cursor-based) pagination for expense listings
+"""
+
+import base64
+import json
+import math
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Sort orders and their keyset columns; every order ends on id so keys are unique.
+# 'category' follows the user's category list (category ids), an index walk
+SORT_KEYS = {
+    'date_desc': (('expense_date', 'DESC'), ('expense_time', 'DESC'), ('id', 'DESC')),
+    'date_asc': (('expense_date', 'ASC'), ('expense_time', 'ASC'), ('id', 'ASC')),
+    'amount_desc': (('amount', 'DESC'), ('id', 'DESC')),
+    'amount_asc': (('amount', 'ASC'), ('id', 'ASC')),
+    'category': (('category_id', 'ASC'), ('expense_date', 'DESC'), ('id', 'DESC')),
+}
+
+DEFAULT_SORT = 'date_desc'
+
+# Key columns the schema lets be NULL (a cursor may carry null for them)
+NULLABLE_SORT_COLUMNS = frozenset(('category_id',))
+
+class InvalidCursor(ValueError):
+    """Raised when a continuation token can't be decoded or doesn't match the sort"""
+
+def get_sort_keys(sort_by):
+    """Get keyset columns for a sort order, falling back to the default"""
+    return SORT_KEYS.get(sort_by, SORT_KEYS[DEFAULT_SORT])
+
+def order_by_clause(sort_by):
+    """Build the ORDER BY clause for a sort order"""
+    keys = get_sort_keys(sort_by)
+    return ' ORDER BY ' + ', '.join(f'{column} {direction}' for column, direction in keys)
+
+def encode_cursor(sort_by, row):
+    """Build an opaque continuation token from the last row of a page"""
+    keys = get_sort_keys(sort_by)
+    # sqlite3.Row is indexed by name, ExpenseRow tuples by attribute
+    if hasattr(row, '_fields'):
+        payload = [sort_by] + [getattr(row, column) for column, _ in keys]
+    else:
+        payload = [sort_by] + [row[column] for column, _ in keys]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(sort_by, token):
+    """Decode a continuation token into key values for the given sort order"""
+    keys = get_sort_keys(sort_by)
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Malformed cursor')
+
+    if not isinstance(payload, list) or len(payload) != len(keys) + 1:
+        raise InvalidCursor('Malformed cursor')
+    if payload[0] != sort_by:
+        raise InvalidCursor('Cursor does not match sort order')
+    values = payload[1:]
+    # Only scalars the key columns can hold get bound; lists, objects or NaN were tampered with
+    for (column, _), value in zip(keys, values):
+        if value is None and column in NULLABLE_SORT_COLUMNS:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise InvalidCursor('Malformed cursor')
+        if isinstance(value, float) and not math.isfinite(value):
+            raise InvalidCursor('Malformed cursor')
+    return values
+
+def keyset_clause(sort_by, values):
+    """Build the "rows after this key" predicate and its parameters
+
+    Uniform directions use a row-value comparison, which SQLite can turn
+    into an index range seek; mixed directions are expanded into the
+    equivalent OR-chain.
+    """
+    keys = get_sort_keys(sort_by)
+    directions = {direction for _, direction in keys}
+
+    if len(directions) == 1:
+        op = '<' if directions.pop() == 'DESC' else '>'
+        columns = ', '.join(column for column, _ in keys)
+        placeholders = ', '.join('?' for _ in keys)
+        return f' AND ({columns}) {op} ({placeholders})', list(values)
+
+    # Leading bound on the first column lets SQLite seek before the OR-chain
+    first_column, first_direction = keys[0]
+    bound = '<=' if first_direction == 'DESC' else '>='
+    terms = []
+    params = [values[0]]
+    for i, (column, direction) in enumerate(keys):
+        op = '<' if direction == 'DESC' else '>'
+        parts = [f'{prev} = ?' for prev, _ in keys[:i]] + [f'{column} {op} ?']
+        terms.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:i])
+        params.append(values[i])
+    return f' AND {first_column} {bound} ? AND (' + ' OR '.join(terms) + ')', params
+
+def clamp_page_size(page_size):
+    """Keep a requested page size within sane bounds"""
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def paginate(conn, query, params, sort_by, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+             row_factory=None):
+    """Run a filtered expenses query one keyset page at a time
+
+    ``query`` must be a SELECT with a WHERE clause and no ORDER BY/LIMIT.
+    ``row_factory`` overrides the connection's for this query only.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if sort_by not in SORT_KEYS:
+        sort_by = DEFAULT_SORT
+    page_size = clamp_page_size(page_size)
+    params = list(params)
+
+    if cursor:
+        clause, cursor_params = keyset_clause(sort_by, decode_cursor(sort_by, cursor))
+        query += clause
+        params.extend(cursor_params)
+
+    # Fetch one extra row to know whether another page exists
+    query += order_by_clause(sort_by) + ' LIMIT ?'
+    params.append(page_size + 1)
+
+    db_cursor = conn.cursor()
+    if row_factory is not None:
+        db_cursor.row_factory = row_factory
+    rows = db_cursor.execute(query, params).fetchall()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(sort_by, rows[-1])
+    return rows, next_cursor
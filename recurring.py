@@ -0,0 +1,361 @@
+"""
+ExpenseTracker Recurring Expenses
+Recurrence rules and the scheduler that materializes their instances as expenses
+
+Each rule stores its next due date, and a partial index over
+(next_due) WHERE active = 1 means a tick reads only the rules that are due,
+for all users at once. Instances are inserted with INSERT OR IGNORE against
+a unique (recurring_rule_id, expense_date) index, so a tick that runs twice,
+overlaps another worker's tick or catches up after downtime never creates
+duplicates.
+
+Usage: python recurring.py [run|status]
+"""
+
+import calendar
+import logging
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+
+from cache import bump_user_version
+from categories import intern_category
+from database import all_shards, get_shard_connection
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+# Due rules handled per transaction
+RECURRING_BATCH_SIZE = 500
+
+# Instances one rule may produce in a single pass; a longer backlog continues in the next batch
+MAX_CATCH_UP = 366
+
+# Materialize instances this many days ahead of today (0: only what is already due)
+RECURRING_HORIZON_DAYS = 0
+
+# Seconds between scheduler ticks; create_app starts the scheduler unless this is False
+RECURRING_TICK_SECONDS = 3600
+RECURRING_SCHEDULER = True
+
+RULE_COLUMNS = (
+    'user_id', 'frequency', 'interval', 'day_of_month', 'start_date', 'end_date', 'next_due',
+    'expense_time', 'amount', 'subject', 'description', 'category', 'payment_method', 'tags'
+)
+
+RECURRING_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS recurring_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        frequency TEXT NOT NULL,      -- daily, weekly, monthly
+        interval INTEGER NOT NULL DEFAULT 1,
+        day_of_month INTEGER,         -- monthly only; clamped to short months
+        start_date DATE NOT NULL,
+        end_date DATE,
+        next_due DATE NOT NULL,
+        active BOOLEAN NOT NULL DEFAULT 1,
+        expense_time TIME NOT NULL,
+        amount INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        description TEXT,
+        category TEXT DEFAULT 'Other',
+        payment_method TEXT DEFAULT 'Cash',
+        tags TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_recurring_rules_due ON recurring_rules(next_due) WHERE active = 1",
+    "CREATE INDEX IF NOT EXISTS idx_recurring_rules_user ON recurring_rules(user_id)",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_recurring_instance
+    ON expenses(recurring_rule_id, expense_date) WHERE recurring_rule_id IS NOT NULL
+    """,
+]
+
+def create_recurring_schema(conn):
+    """Add expenses.recurring_rule_id, the rules table and their indexes"""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(expenses)')]
+    if 'recurring_rule_id' not in columns:
+        conn.execute('ALTER TABLE expenses ADD COLUMN recurring_rule_id INTEGER')
+    for statement in RECURRING_SCHEMA:
+        conn.execute(statement)
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def next_occurrence(frequency, day, interval=1, day_of_month=None):
+    """The occurrence after ``day`` for a rule"""
+    if frequency == 'daily':
+        return day + timedelta(days=interval)
+    if frequency == 'weekly':
+        return day + timedelta(weeks=interval)
+    if frequency == 'monthly':
+        month = day.month - 1 + interval
+        year, month = day.year + month // 12, month % 12 + 1
+        last_day = calendar.monthrange(year, month)[1]
+        return date(year, month, min(day_of_month or day.day, last_day))
+    raise ValueError(f'Unknown frequency: {frequency!r}')
+
+def first_occurrence(frequency, start_date, day_of_month=None):
+    """The first occurrence on or after ``start_date``"""
+    start_date = _as_date(start_date)
+    if frequency != 'monthly' or not day_of_month:
+        return start_date
+    last_day = calendar.monthrange(start_date.year, start_date.month)[1]
+    candidate = start_date.replace(day=min(day_of_month, last_day))
+    if candidate >= start_date:
+        return candidate
+    return next_occurrence('monthly', candidate, 1, day_of_month)
+
+# Fields copied into every expense a rule writes, which must be strings when given
+RULE_TEXT_FIELDS = ('expense_time', 'subject', 'description', 'category', 'payment_method', 'tags')
+
+def validate_rule(data):
+    """Validate recurrence fields; returns a list of errors
+
+    Also checks that the expense fields a rule copies are strings; their
+    values are validate_expense_data's business.
+    """
+    errors = [f"{field.replace('_', ' ').capitalize()} must be a string"
+              for field in RULE_TEXT_FIELDS
+              if data.get(field) is not None and not isinstance(data[field], str)]
+    if data.get('frequency') not in FREQUENCIES:
+        errors.append("Frequency must be daily, weekly or monthly")
+    interval = data.get('interval', 1)
+    if isinstance(interval, bool) or not isinstance(interval, int) or not 1 <= interval <= 365:
+        errors.append("Interval must be a whole number from 1 to 365")
+    day_of_month = data.get('day_of_month')
+    if day_of_month is not None:
+        if data.get('frequency') != 'monthly':
+            errors.append("Day of month only applies to monthly rules")
+        elif isinstance(day_of_month, bool) or not isinstance(day_of_month, int) \
+                or not 1 <= day_of_month <= 31:
+            errors.append("Day of month must be from 1 to 31")
+    dates = {}
+    for field in ('start_date', 'end_date'):
+        if data.get(field):
+            try:
+                if not isinstance(data[field], str):
+                    raise TypeError(field)
+                dates[field] = date.fromisoformat(data[field])
+            except (TypeError, ValueError):
+                errors.append(f"{field.replace('_', ' ').capitalize()} must be YYYY-MM-DD")
+    if not data.get('start_date'):
+        errors.append("Start date is required")
+    if len(dates) == 2 and dates['end_date'] < dates['start_date']:
+        errors.append("End date cannot be before start date")
+    return errors
+
+def create_rule(conn, user_id, frequency, start_date, expense_time, amount, subject,
+                description=None, category='Other', payment_method='Cash', tags=None,
+                interval=1, day_of_month=None, end_date=None, first_recorded=False):
+    """Insert a rule and return its id (the caller commits)
+
+    With ``first_recorded`` the first occurrence is an expense the caller
+    writes itself (e.g. the one the user just entered), so the rule starts
+    due on the occurrence after it.
+    """
+    if frequency == 'monthly' and not day_of_month:
+        # Pin the day so a rule starting on the 31st doesn't drift after February
+        day_of_month = _as_date(start_date).day
+    first = first_occurrence(frequency, start_date, day_of_month)
+    next_due = next_occurrence(frequency, first, interval, day_of_month) if first_recorded else first
+    cursor = conn.execute(
+        f"""INSERT INTO recurring_rules ({', '.join(RULE_COLUMNS)})
+            VALUES ({', '.join('?' * len(RULE_COLUMNS))})""",
+        (user_id, frequency, interval, day_of_month, _as_date(start_date).isoformat(),
+         _as_date(end_date).isoformat() if end_date else None,
+         next_due.isoformat(), expense_time, amount, subject, description, category,
+         payment_method, tags)
+    )
+    return cursor.lastrowid
+
+def get_user_rules(conn, user_id):
+    """A user's rules, active first, soonest due first"""
+    return conn.execute(
+        'SELECT * FROM recurring_rules WHERE user_id = ? ORDER BY active DESC, next_due',
+        (user_id,)
+    ).fetchall()
+
+def deactivate_rule(conn, rule_id, user_id):
+    """Stop a rule; instances already written stay. Returns True if the rule was found"""
+    cursor = conn.execute(
+        'UPDATE recurring_rules SET active = 0 WHERE id = ? AND user_id = ?', (rule_id, user_id)
+    )
+    conn.commit()
+    return cursor.rowcount > 0
+
+def _instances(rule, until):
+    """(dates due up to ``until``, next due date, still active) for one rule"""
+    frequency, interval, day_of_month = rule['frequency'], rule['interval'], rule['day_of_month']
+    end = _as_date(rule['end_date']) if rule['end_date'] else None
+    due = _as_date(rule['next_due'])
+    dates = []
+    while due <= until and (end is None or due <= end) and len(dates) < MAX_CATCH_UP:
+        dates.append(due)
+        due = next_occurrence(frequency, due, interval, day_of_month)
+    return dates, due, end is None or due <= end
+
+def materialize_due(conn, today=None, batch_size=RECURRING_BATCH_SIZE,
+                    horizon_days=RECURRING_HORIZON_DAYS):
+    """Write every due instance of every user's rules; returns (rules, instances inserted)
+
+    Rules are read through the next_due index, RECURRING_BATCH_SIZE at a
+    time, and each batch is one transaction: one executemany of instances
+    plus one executemany moving each rule's next_due past ``until``.
+    """
+    until = (_as_date(today) or date.today()) + timedelta(days=horizon_days)
+    rules_done = 0
+    inserted = 0
+    users = set()
+    if conn.in_transaction:
+        conn.commit()
+
+    while True:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rules = conn.execute(
+                """SELECT * FROM recurring_rules
+                   WHERE active = 1 AND next_due <= ?
+                   ORDER BY next_due LIMIT ?""",
+                (until.isoformat(), batch_size)
+            ).fetchall()
+            if not rules:
+                conn.commit()
+                break
+
+            instances = []
+            updates = []
+            category_ids = {}
+            for rule in rules:
+                dates, next_due, active = _instances(rule, until)
+                # Rules keep the category name; expenses reference the user's category id
+                key = (rule['user_id'], rule['category'])
+                if key not in category_ids:
+                    category_ids[key] = intern_category(conn, *key)
+                instances.extend(
+                    (rule['user_id'], day.isoformat(), rule['expense_time'], rule['amount'],
+                     rule['subject'], rule['description'], category_ids[key],
+                     rule['payment_method'], rule['tags'], rule['id'])
+                    for day in dates
+                )
+                updates.append((next_due.isoformat(), active, rule['id']))
+                users.add(rule['user_id'])
+
+            cursor = conn.executemany(
+                """INSERT OR IGNORE INTO expenses
+                   (user_id, expense_date, expense_time, amount, subject, description,
+                    category_id, payment_method, tags, is_recurring, recurring_rule_id)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)""",
+                instances
+            )
+            inserted += max(cursor.rowcount, 0)
+            conn.executemany(
+                'UPDATE recurring_rules SET next_due = ?, active = ? WHERE id = ?', updates
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        rules_done += len(rules)
+
+    for user_id in users:
+        bump_user_version(user_id)
+    return rules_done, inserted
+
+class RecurringScheduler:
+    """Background thread running materialize_due every ``interval`` seconds
+
+    The first tick runs at start, which is what catches up after downtime.
+    Every worker process may run one; the unique instance index keeps
+    overlapping ticks harmless.
+    """
+
+    def __init__(self, interval=RECURRING_TICK_SECONDS):
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'ticks': 0, 'rules': 0, 'inserted': 0, 'errors': 0, 'last_tick': None}
+
+    def start(self):
+        """Start the thread once per process"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='recurring-scheduler', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def tick(self, today=None):
+        """Materialize what is due now on every shard; returns (rules, instances inserted)"""
+        rules = inserted = 0
+        for shard in all_shards():
+            conn = get_shard_connection(shard)
+            try:
+                shard_rules, shard_inserted = materialize_due(conn, today)
+            finally:
+                conn.close()
+            rules += shard_rules
+            inserted += shard_inserted
+        with self._lock:
+            self._stats['ticks'] += 1
+            self._stats['rules'] += rules
+            self._stats['inserted'] += inserted
+            self._stats['last_tick'] = date.today().isoformat()
+        return rules, inserted
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except sqlite3.Error:
+                with self._lock:
+                    self._stats['errors'] += 1
+                logger.exception('Recurring expense tick failed')
+            self._stop.wait(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, running=self._thread is not None and self._thread.is_alive())
+
+scheduler = RecurringScheduler()
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command == 'run':
+        rules, inserted = scheduler.tick()
+        print(f"✅ Materialized {inserted} expenses from {rules} due rules")
+        return 0
+    if command == 'status':
+        due, oldest = 0, None
+        for shard in all_shards():
+            conn = get_shard_connection(shard)
+            try:
+                count, first = conn.execute(
+                    """SELECT COUNT(*), MIN(next_due) FROM recurring_rules
+                       WHERE active = 1 AND next_due <= ?""",
+                    (date.today().isoformat(),)
+                ).fetchone()
+            finally:
+                conn.close()
+            due += count
+            if first is not None and (oldest is None or first < oldest):
+                oldest = first
+        print(f"⏳ {due} rules due (oldest {oldest})" if due else "✅ No rules due")
+        return 0
+    print("Usage: python recurring.py [run|status]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,332 @@
+"""
+ExpenseTracker Rollups
+Per-user (month, category) and (week, category) aggregates kept exact by triggers on the expenses table
+
+Usage: python rollups.py [rebuild|check]
+"""
+
+import sys
+
+from categories import category_name_sql, has_category_ids
+from database import all_shards, get_shard_connection
+
+def _category(row):
+    """Rollup category of ``row`` (NEW, OLD or expenses): its category's name, else 'Other'"""
+    return f"COALESCE({category_name_sql(f'{row}.category_id')}, 'Other')"
+
+# Totals are integer paise, like expenses.amount, so incremental +/- never drifts
+ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS expense_rollups (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,          -- YYYY-MM
+        category TEXT NOT NULL,
+        total_minor INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, category)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+    AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expense_rollups (user_id, month, category, total_minor, count)
+        VALUES (NEW.user_id, substr(NEW.expense_date, 1, 7), {_category('NEW')},
+                NEW.amount, 1)
+        ON CONFLICT (user_id, month, category) DO UPDATE SET
+            total_minor = total_minor + excluded.total_minor,
+            count = count + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+    AFTER DELETE ON expenses
+    BEGIN
+        UPDATE expense_rollups
+        SET total_minor = total_minor - OLD.amount,
+            count = count - 1
+        WHERE user_id = OLD.user_id
+          AND month = substr(OLD.expense_date, 1, 7)
+          AND category = {_category('OLD')};
+        DELETE FROM expense_rollups
+        WHERE user_id = OLD.user_id
+          AND month = substr(OLD.expense_date, 1, 7)
+          AND category = {_category('OLD')}
+          AND count <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+    AFTER UPDATE OF user_id, expense_date, amount, category_id ON expenses
+    BEGIN
+        UPDATE expense_rollups
+        SET total_minor = total_minor - OLD.amount,
+            count = count - 1
+        WHERE user_id = OLD.user_id
+          AND month = substr(OLD.expense_date, 1, 7)
+          AND category = {_category('OLD')};
+        DELETE FROM expense_rollups
+        WHERE user_id = OLD.user_id
+          AND month = substr(OLD.expense_date, 1, 7)
+          AND category = {_category('OLD')}
+          AND count <= 0;
+        INSERT INTO expense_rollups (user_id, month, category, total_minor, count)
+        VALUES (NEW.user_id, substr(NEW.expense_date, 1, 7), {_category('NEW')},
+                NEW.amount, 1)
+        ON CONFLICT (user_id, month, category) DO UPDATE SET
+            total_minor = total_minor + excluded.total_minor,
+            count = count + 1;
+    END
+    """,
+]
+
+# Monday of an expense's week, e.g. 2024-09-16; 'weekday 0' moves forward to Sunday.
+# NULL for a date SQLite can't read: those rows are left out of the weekly rollups
+WEEK_START_SQL = "date({column}, 'weekday 0', '-6 days')"
+
+WEEKLY_TRIGGERS = (
+    'trg_expenses_week_rollup_insert',
+    'trg_expenses_week_rollup_delete',
+    'trg_expenses_week_rollup_update',
+)
+
+def _weekly_trigger_values(row):
+    return (f"{row}.user_id, {WEEK_START_SQL.format(column=row + '.expense_date')}, "
+            f"{_category(row)}")
+
+def _weekly_trigger_match(row):
+    return (f"user_id = {row}.user_id "
+            f"AND week = {WEEK_START_SQL.format(column=row + '.expense_date')} "
+            f"AND category = {_category(row)}")
+
+def _weekly_trigger_insert(row):
+    return f"""INSERT INTO expense_week_rollups (user_id, week, category, total_minor, count)
+        SELECT {_weekly_trigger_values(row)}, {row}.amount, 1
+        WHERE {WEEK_START_SQL.format(column=row + '.expense_date')} IS NOT NULL
+        ON CONFLICT (user_id, week, category) DO UPDATE SET
+            total_minor = total_minor + excluded.total_minor,
+            count = count + 1"""
+
+# Budgets read weekly spend from here (monthly and yearly come from expense_rollups)
+WEEKLY_ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS expense_week_rollups (
+        user_id INTEGER NOT NULL,
+        week TEXT NOT NULL,           -- YYYY-MM-DD of the Monday
+        category TEXT NOT NULL,
+        total_minor INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, week, category)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_week_rollup_insert
+    AFTER INSERT ON expenses
+    BEGIN
+        {_weekly_trigger_insert('NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_week_rollup_delete
+    AFTER DELETE ON expenses
+    BEGIN
+        UPDATE expense_week_rollups
+        SET total_minor = total_minor - OLD.amount,
+            count = count - 1
+        WHERE {_weekly_trigger_match('OLD')};
+        DELETE FROM expense_week_rollups
+        WHERE {_weekly_trigger_match('OLD')} AND count <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_week_rollup_update
+    AFTER UPDATE OF user_id, expense_date, amount, category_id ON expenses
+    BEGIN
+        UPDATE expense_week_rollups
+        SET total_minor = total_minor - OLD.amount,
+            count = count - 1
+        WHERE {_weekly_trigger_match('OLD')};
+        DELETE FROM expense_week_rollups
+        WHERE {_weekly_trigger_match('OLD')} AND count <= 0;
+        {_weekly_trigger_insert('NEW')};
+    END
+    """,
+]
+
+# The same aggregations computed from the base table, used by rebuild and check
+_BASE_AGGREGATE = """
+    SELECT user_id, {bucket} as {bucket_name}, {category} as category,
+           SUM(amount) as total_minor, COUNT(*) as count
+    FROM expenses
+    {where}
+    GROUP BY user_id, {bucket_name}, {category}
+    HAVING {bucket_name} IS NOT NULL
+"""
+
+# Before migration 13 expenses still hold the category name (older steps rebuild rollups)
+_LEGACY_CATEGORY = "COALESCE(category, 'Other')"
+
+# table: (bucket column, expression computing it from expenses)
+ROLLUP_TABLES = {
+    'expense_rollups': ('month', 'substr(expense_date, 1, 7)'),
+    'expense_week_rollups': ('week', WEEK_START_SQL.format(column='expense_date')),
+}
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+def _create_schema(conn, table, statements):
+    exists = _table_exists(conn, table)
+    for statement in statements:
+        conn.execute(statement)
+    if not exists:
+        rebuild_rollups(conn, tables=(table,))
+
+def create_rollup_schema(conn):
+    """Create the monthly rollup table and triggers; backfill if the table is new"""
+    _create_schema(conn, 'expense_rollups', ROLLUP_SCHEMA)
+
+def create_weekly_rollup_schema(conn):
+    """Create the weekly rollup table and triggers; backfill if the table is new"""
+    _create_schema(conn, 'expense_week_rollups', WEEKLY_ROLLUP_SCHEMA)
+
+def replace_weekly_rollup_triggers(conn):
+    """Recreate the weekly rollup triggers from WEEKLY_ROLLUP_SCHEMA (the totals stay)"""
+    for name in WEEKLY_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    create_weekly_rollup_schema(conn)
+
+def _aggregate(conn, table, where):
+    bucket_name, bucket = ROLLUP_TABLES[table]
+    category = _category('expenses') if has_category_ids(conn) else _LEGACY_CATEGORY
+    return _BASE_AGGREGATE.format(bucket=bucket, bucket_name=bucket_name, where=where,
+                                  category=category)
+
+def _existing_tables(conn, tables):
+    return [table for table in (tables or ROLLUP_TABLES) if _table_exists(conn, table)]
+
+def rebuild_rollups(conn, user_id=None, tables=None):
+    """Recompute rollups from the expenses table (all users or one user)"""
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    with conn:
+        for table in _existing_tables(conn, tables):
+            bucket_name, _ = ROLLUP_TABLES[table]
+            conn.execute(f'DELETE FROM {table} {where}', params)
+            conn.execute(
+                f'INSERT INTO {table} (user_id, {bucket_name}, category, total_minor, count) '
+                + _aggregate(conn, table, where),
+                params
+            )
+
+def check_rollups(conn, user_id=None, tables=None):
+    """Compare rollups against the base table
+
+    Returns a list of (user_id, month or week, category, expected, actual)
+    tuples where expected/actual are (total_minor, count) or None when missing.
+    """
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    mismatches = []
+    for table in _existing_tables(conn, tables):
+        bucket_name, _ = ROLLUP_TABLES[table]
+        expected = {
+            (row['user_id'], row[bucket_name], row['category']): (row['total_minor'], row['count'])
+            for row in conn.execute(_aggregate(conn, table, where), params)
+        }
+        actual = {
+            (row['user_id'], row[bucket_name], row['category']): (row['total_minor'], row['count'])
+            for row in conn.execute(
+                f'SELECT user_id, {bucket_name}, category, total_minor, count FROM {table} {where}',
+                params
+            )
+        }
+        for key in sorted(expected.keys() | actual.keys(), key=lambda k: tuple(map(str, k))):
+            if expected.get(key) != actual.get(key):
+                mismatches.append(key + (expected.get(key), actual.get(key)))
+    return mismatches
+
+def _month_bounds(params, month_from, month_to):
+    """Append month bound parameters and return the matching SQL fragment"""
+    sql = ''
+    if month_from:
+        sql += ' AND month >= ?'
+        params.append(month_from[:7])
+    if month_to:
+        sql += ' AND month < ?'
+        params.append(month_to[:7])
+    return sql
+
+def get_monthly_totals(conn, user_id, month_from=None, month_to=None):
+    """Monthly totals (in paise) from rollups
+
+    month_from is inclusive and month_to exclusive; both are YYYY-MM strings
+    or month-aligned ISO dates such as the bounds from date_filters.month_range.
+    """
+    query = """SELECT month, SUM(total_minor) as total, SUM(count) as count
+               FROM expense_rollups WHERE user_id = ?"""
+    params = [user_id]
+    query += _month_bounds(params, month_from, month_to)
+    query += ' GROUP BY month ORDER BY month'
+    return conn.execute(query, params).fetchall()
+
+def get_category_totals(conn, user_id, month_from=None, month_to=None):
+    """Category totals (in paise) from rollups, largest first"""
+    query = """SELECT category, SUM(total_minor) as total, SUM(count) as count
+               FROM expense_rollups WHERE user_id = ?"""
+    params = [user_id]
+    query += _month_bounds(params, month_from, month_to)
+    query += ' GROUP BY category ORDER BY total DESC'
+    return conn.execute(query, params).fetchall()
+
+def get_totals(conn, user_id, month_from=None, month_to=None, category=None):
+    """Overall (total in paise, count) from rollups, optionally for one category"""
+    query = """SELECT COALESCE(SUM(total_minor), 0) as total, COALESCE(SUM(count), 0) as count
+               FROM expense_rollups WHERE user_id = ?"""
+    params = [user_id]
+    query += _month_bounds(params, month_from, month_to)
+    if category is not None:
+        query += ' AND category = ?'
+        params.append(category)
+    return conn.execute(query, params).fetchone()
+
+def get_week_totals(conn, user_id, week, category=None):
+    """(total in paise, count) for the week starting on Monday ``week`` (YYYY-MM-DD)"""
+    query = """SELECT COALESCE(SUM(total_minor), 0) as total, COALESCE(SUM(count), 0) as count
+               FROM expense_week_rollups WHERE user_id = ? AND week = ?"""
+    params = [user_id, week]
+    if category is not None:
+        query += ' AND category = ?'
+        params.append(category)
+    return conn.execute(query, params).fetchone()
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'check'
+    if command not in ('rebuild', 'check'):
+        print("Usage: python rollups.py [rebuild|check]")
+        return 2
+    mismatches = []
+    for shard in all_shards():
+        conn = get_shard_connection(shard)
+        try:
+            if command == 'rebuild':
+                rebuild_rollups(conn)
+            else:
+                mismatches.extend(check_rollups(conn))
+        finally:
+            conn.close()
+    if command == 'rebuild':
+        print("✅ Rollups rebuilt from expenses")
+        return 0
+    if not mismatches:
+        print("✅ Rollups match the expenses table")
+        return 0
+    for user_id, bucket, category, expected, actual in mismatches:
+        print(f"❌ user {user_id} {bucket} {category}: expected {expected}, found {actual}")
+    print(f"{len(mismatches)} mismatched rollup rows; run 'python rollups.py rebuild'")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
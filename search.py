@@ -0,0 +1,191 @@
+"""
+ExpenseTracker Search
+FTS5 full-text index over expense subjects and descriptions, kept in sync by triggers
+
+The index is an external-content table over expenses. user_id is indexed as
+a token column so a user's search intersects that user's posting list
+instead of filtering every user's matches afterwards.
+
+Usage: python search.py [rebuild|check]
+"""
+
+import html
+import re
+import sqlite3
+import sys
+
+from categories import category_name_sql
+from database import all_shards, get_shard_connection
+
+SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+        subject, description, user_id,
+        content='expenses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert
+    AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (rowid, subject, description, user_id)
+        VALUES (NEW.id, NEW.subject, NEW.description, NEW.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete
+    AFTER DELETE ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, subject, description, user_id)
+        VALUES ('delete', OLD.id, OLD.subject, OLD.description, OLD.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update
+    AFTER UPDATE OF subject, description, user_id ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, subject, description, user_id)
+        VALUES ('delete', OLD.id, OLD.subject, OLD.description, OLD.user_id);
+        INSERT INTO expenses_fts (rowid, subject, description, user_id)
+        VALUES (NEW.id, NEW.subject, NEW.description, NEW.user_id);
+    END
+    """,
+]
+
+# bm25 column weights: subject matches outrank description matches
+RANK_WEIGHTS = (10.0, 1.0, 0.0)
+
+# Control characters mark matches so the text can be HTML-escaped before adding <mark>
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def create_search_schema(conn):
+    """Create the FTS index and triggers; backfill if the index is new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts'"
+    ).fetchone()
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    if not exists:
+        rebuild_search_index(conn)
+
+def rebuild_search_index(conn):
+    """Rebuild the FTS index from the expenses table"""
+    with conn:
+        conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+
+def check_search_index(conn):
+    """Run the FTS5 integrity check against the content table; True if consistent"""
+    try:
+        conn.execute("INSERT INTO expenses_fts (expenses_fts, rank) VALUES ('integrity-check', 1)")
+        return True
+    except sqlite3.Error:
+        return False
+
+def build_match_expression(text):
+    """Turn free text into a safe FTS5 expression over subject/description
+
+    "quoted text" becomes a phrase, every other word a prefix term; all
+    parts must match. Returns None when the text has nothing searchable.
+    """
+    parts = []
+    for phrase, word in _TERM_RE.findall(text or ''):
+        if phrase:
+            tokens = _WORD_RE.findall(phrase)
+            if tokens:
+                parts.append('"' + ' '.join(tokens) + '"')
+        else:
+            parts.extend(f'"{token}"*' for token in _WORD_RE.findall(word))
+
+    if not parts:
+        return None
+    return '{subject description} : (' + ' AND '.join(parts) + ')'
+
+def user_match_expression(user_id, text):
+    """FTS5 expression restricted to one user's rows"""
+    expression = build_match_expression(text)
+    if expression is None:
+        return None
+    return f'user_id : "{int(user_id)}" AND {expression}'
+
+def search_filter_clause(user_id, text):
+    """``AND id IN (...)`` fragment for Expense.build_filter_query"""
+    expression = user_match_expression(user_id, text)
+    if expression is None:
+        return '', []
+    return ' AND id IN (SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ?)', [expression]
+
+def _render_marks(text):
+    """HTML-escape FTS output and turn match markers into <mark> tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+def search_expenses(conn, user_id, text, limit=DEFAULT_SEARCH_LIMIT):
+    """Ranked search for one user
+
+    Returns dicts with the expense fields plus HTML-safe ``subject_highlight``
+    and ``description_snippet`` strings and the bm25 ``score`` (lower is better).
+    """
+    expression = user_match_expression(user_id, text)
+    if expression is None:
+        return []
+
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    rows = conn.execute(
+        f"""SELECT e.id, e.expense_date, e.expense_time, e.amount,
+                   {category_name_sql('e.category_id')} as category,
+                   e.subject, e.description,
+                   highlight(expenses_fts, 0, ?, ?) as subject_highlight,
+                   snippet(expenses_fts, 1, ?, ?, '…', 12) as description_snippet,
+                   bm25(expenses_fts, {weights}) as score
+            FROM expenses_fts
+            JOIN expenses e ON e.id = expenses_fts.rowid
+            WHERE expenses_fts MATCH ?
+            ORDER BY score
+            LIMIT ?""",
+        (_MARK_OPEN, _MARK_CLOSE, _MARK_OPEN, _MARK_CLOSE,
+         expression, max(1, min(int(limit), MAX_SEARCH_LIMIT)))
+    ).fetchall()
+
+    results = []
+    for row in rows:
+        result = dict(row)
+        result['subject_highlight'] = _render_marks(result['subject_highlight'])
+        result['description_snippet'] = _render_marks(result['description_snippet'])
+        results.append(result)
+    return results
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'check'
+    if command not in ('rebuild', 'check'):
+        print("Usage: python search.py [rebuild|check]")
+        return 2
+    in_sync = True
+    for shard in all_shards():
+        conn = get_shard_connection(shard)
+        try:
+            if command == 'rebuild':
+                rebuild_search_index(conn)
+            elif not check_search_index(conn):
+                in_sync = False
+        finally:
+            conn.close()
+    if command == 'rebuild':
+        print("✅ Search index rebuilt from expenses")
+        return 0
+    if in_sync:
+        print("✅ Search index matches the expenses table")
+        return 0
+    print("❌ Search index is out of sync; run 'python search.py rebuild'")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,307 @@
+"""
+ExpenseTracker Sharding
+Per-user placement across SHARD_COUNT database files, and the tool that moves users online
+
+Each user's expenses, budgets, categories and recurring rules live in one
+shard file; the users table and the user_shards directory live in shard 0.
+New users are placed on their home shard, found on a consistent-hash ring
+with VIRTUAL_NODES points per shard, so changing the shard count only moves
+the users whose ring segment changed hands. The directory, not the ring,
+is what routing reads (database.get_shard), which is what lets a user be
+moved while the app keeps serving.
+
+A move holds the source shard's write lock while it copies the user's rows
+(reads carry on), commits the copy on the target, flips the directory, and
+then deletes the source rows and leaves a moved_users tombstone so a
+request that resolved the old shard cannot write there afterwards. Row ids
+are per shard, so a moved user's rows get new ids. If a move is
+interrupted the directory still names exactly one copy; `cleanup` removes
+the others.
+
+Usage: python sharding.py [status|move USER_ID SHARD|rebalance [SHARD_COUNT]|cleanup]
+"""
+
+import bisect
+import hashlib
+import sys
+from functools import lru_cache
+
+import database
+from database import get_shard_connection, lookup_shard
+
+# Points per shard on the hash ring; more evens out the split
+VIRTUAL_NODES = 64
+
+# Per-user tables, copied in this order (expenses refer to recurring_rules and categories)
+SHARDED_TABLES = ('recurring_rules', 'budgets', 'categories', 'expenses')
+
+# Tables whose ids expenses hold, and the expenses column holding them
+REFERENCED_TABLES = {'recurring_rules': 'recurring_rule_id', 'categories': 'category_id'}
+
+# Rows per executemany while copying a user
+MOVE_BATCH_SIZE = 1000
+
+DIRECTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_shards (
+        user_id INTEGER PRIMARY KEY,
+        shard INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_user_shards_shard ON user_shards(shard);
+"""
+
+MOVED_USERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS moved_users (
+        user_id INTEGER PRIMARY KEY,
+        shard INTEGER NOT NULL,
+        moved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+MOVED_USER_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_moved_user
+    BEFORE INSERT ON {table}
+    WHEN EXISTS (SELECT 1 FROM moved_users WHERE user_id = NEW.user_id)
+    BEGIN
+        SELECT RAISE(ABORT, 'user has moved to another shard');
+    END
+"""
+
+def create_directory_schema(conn):
+    """user_shards on shard 0, with every existing user on shard 0"""
+    conn.executescript(DIRECTORY_SCHEMA)
+    conn.execute('INSERT OR IGNORE INTO user_shards (user_id, shard) SELECT id, 0 FROM users')
+
+def create_shard_schema(conn):
+    """The moved_users tombstones and the triggers refusing inserts for those users"""
+    conn.execute(MOVED_USERS_TABLE)
+    for table in SHARDED_TABLES:
+        conn.execute(MOVED_USER_TRIGGER.format(table=table))
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+@lru_cache(maxsize=None)
+def _ring(shard_count):
+    points = sorted(
+        (_hash(f'shard-{shard}-{node}'), shard)
+        for shard in range(shard_count) for node in range(VIRTUAL_NODES)
+    )
+    return [point for point, _ in points], [shard for _, shard in points]
+
+def home_shard(user_id, shard_count=None):
+    """The shard a user belongs on with ``shard_count`` shards (default SHARD_COUNT)"""
+    shard_count = shard_count or database.SHARD_COUNT
+    if shard_count == 1:
+        return 0
+    points, shards = _ring(shard_count)
+    index = bisect.bisect(points, _hash(f'user-{user_id}')) % len(points)
+    return shards[index]
+
+def assign_shard(conn, user_id):
+    """Record a new user's home shard in the directory; ``conn`` is shard 0, the caller commits"""
+    shard = home_shard(user_id)
+    conn.execute('INSERT OR REPLACE INTO user_shards (user_id, shard) VALUES (?, ?)', (user_id, shard))
+    return shard
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})') if row[1] != 'id']
+
+def _delete_user_rows(conn, user_id):
+    for table in reversed(SHARDED_TABLES):
+        conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+
+def _copy_user(source, target, user_id, batch_size=MOVE_BATCH_SIZE):
+    """Insert a user's rows from ``source`` into ``target``; returns rows copied"""
+    copied = 0
+    new_ids = {table: {} for table in REFERENCED_TABLES}
+    for table in SHARDED_TABLES:
+        columns = _columns(target, table)
+        insert = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                  f"VALUES ({', '.join('?' * len(columns))})")
+        cursor = source.execute(
+            f"SELECT id, {', '.join(columns)} FROM {table} WHERE user_id = ? ORDER BY id",
+            (user_id,)
+        )
+        if table in REFERENCED_TABLES:
+            # One at a time: the user's expenses point at the new ids. In id
+            # order, so categories keep their list order
+            for row in cursor:
+                new_ids[table][row[0]] = target.execute(insert, tuple(row)[1:]).lastrowid
+                copied += 1
+            continue
+        remap = ([(columns.index(column) + 1, new_ids[referenced])
+                  for referenced, column in REFERENCED_TABLES.items()]
+                 if table == 'expenses' else [])
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            values = []
+            for row in rows:
+                row = list(row)
+                for index, ids in remap:
+                    if row[index] is not None:
+                        row[index] = ids.get(row[index])
+                values.append(row[1:])
+            target.executemany(insert, values)
+            copied += len(values)
+    return copied
+
+def move_user(user_id, target):
+    """Move one user's data to shard ``target`` while the app keeps running
+
+    Returns the number of rows moved (0 if the user is already there).
+    Writers on the source shard wait for the copy; nothing else does.
+    """
+    directory = get_shard_connection(0)
+    source_conn = target_conn = None
+    try:
+        source = lookup_shard(directory, user_id)
+        if source == target:
+            return 0
+        source_conn = directory if source == 0 else get_shard_connection(source)
+        target_conn = directory if target == 0 else get_shard_connection(target)
+
+        for conn in (source_conn, target_conn):
+            if conn.in_transaction:
+                conn.commit()
+        source_conn.execute('BEGIN IMMEDIATE')
+        if source == 0 and lookup_shard(directory, user_id) != source:
+            raise RuntimeError(f'User {user_id} moved while waiting for the lock')
+
+        # Leftovers of an interrupted move, and an old tombstone if the user is coming back
+        target_conn.execute('BEGIN IMMEDIATE')
+        _delete_user_rows(target_conn, user_id)
+        target_conn.execute('DELETE FROM moved_users WHERE user_id = ?', (user_id,))
+        moved = _copy_user(source_conn, target_conn, user_id)
+
+        # The directory flips in the same transaction as whichever side is shard 0
+        flip = 'INSERT OR REPLACE INTO user_shards (user_id, shard) VALUES (?, ?)'
+        if target == 0:
+            target_conn.execute(flip, (user_id, target))
+            target_conn.commit()
+        else:
+            target_conn.commit()
+            directory.execute(flip, (user_id, target))
+            if source != 0:
+                directory.commit()
+
+        source_conn.execute(
+            'INSERT OR REPLACE INTO moved_users (user_id, shard) VALUES (?, ?)', (user_id, target)
+        )
+        _delete_user_rows(source_conn, user_id)
+        source_conn.commit()
+        return moved
+    except Exception:
+        for conn in (source_conn, target_conn, directory):
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+        raise
+    finally:
+        for conn in {id(c): c for c in (source_conn, target_conn, directory) if c is not None}.values():
+            conn.close()
+
+def directory_entries():
+    """{user_id: shard} for every user, including users missing from the directory (shard 0)"""
+    conn = get_shard_connection(0)
+    try:
+        rows = conn.execute(
+            """SELECT users.id, COALESCE(user_shards.shard, 0) FROM users
+               LEFT JOIN user_shards ON user_shards.user_id = users.id"""
+        ).fetchall()
+    finally:
+        conn.close()
+    return {user_id: shard for user_id, shard in rows}
+
+def rebalance(shard_count=None, progress=None):
+    """Move every user whose home shard differs from where they are; returns users moved
+
+    ``shard_count`` defaults to SHARD_COUNT. The target shards are created
+    and migrated first.
+    """
+    from migrations import migrate
+
+    shard_count = shard_count or database.SHARD_COUNT
+    migrate(shards=range(shard_count))
+    moved = 0
+    for user_id, shard in sorted(directory_entries().items()):
+        target = home_shard(user_id, shard_count)
+        if target != shard:
+            rows = move_user(user_id, target)
+            moved += 1
+            if progress:
+                progress(user_id, shard, target, rows)
+    return moved
+
+def cleanup(shard_count=None):
+    """Delete rows left on shards that are not their user's shard; returns users cleaned"""
+    shard_count = shard_count or database.SHARD_COUNT
+    placement = directory_entries()
+    cleaned = 0
+    for shard in range(shard_count):
+        conn = get_shard_connection(shard)
+        try:
+            stray = set()
+            for table in SHARDED_TABLES:
+                stray.update(
+                    user_id for (user_id,) in conn.execute(f'SELECT DISTINCT user_id FROM {table}')
+                    if placement.get(user_id, 0) != shard
+                )
+            for user_id in stray:
+                conn.execute(
+                    'INSERT OR REPLACE INTO moved_users (user_id, shard) VALUES (?, ?)',
+                    (user_id, placement.get(user_id, 0))
+                )
+                _delete_user_rows(conn, user_id)
+            conn.commit()
+            cleaned += len(stray)
+        finally:
+            conn.close()
+    return cleaned
+
+def shard_status(shard_count=None):
+    """[(shard, users in the directory, expense rows in the file)]"""
+    shard_count = shard_count or database.SHARD_COUNT
+    placement = directory_entries()
+    status = []
+    for shard in range(shard_count):
+        conn = get_shard_connection(shard)
+        try:
+            expenses = conn.execute('SELECT COUNT(*) FROM expenses').fetchone()[0]
+        finally:
+            conn.close()
+        users = sum(1 for placed in placement.values() if placed == shard)
+        status.append((shard, users, expenses))
+    return status
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command == 'status':
+        for shard, users, expenses in shard_status():
+            print(f"   shard {shard} ({database.shard_path(shard)}): {users} users, {expenses} expenses")
+        misplaced = sum(1 for user_id, shard in directory_entries().items()
+                        if home_shard(user_id) != shard)
+        if misplaced:
+            print(f"⏳ {misplaced} users are not on their home shard (run 'python sharding.py rebalance')")
+            return 1
+        print(f"✅ Every user is on their home shard ({database.SHARD_COUNT} shards)")
+        return 0
+    if command == 'move' and len(argv) == 4:
+        user_id, target = int(argv[2]), int(argv[3])
+        rows = move_user(user_id, target)
+        print(f"✅ User {user_id} is on shard {target} ({rows} rows moved)")
+        return 0
+    if command == 'rebalance':
+        shard_count = int(argv[2]) if len(argv) > 2 else None
+        moved = rebalance(shard_count, progress=lambda user_id, source, target, rows: print(
+            f"   user {user_id}: shard {source} -> {target} ({rows} rows)"))
+        print(f"✅ Rebalanced over {shard_count or database.SHARD_COUNT} shards ({moved} users moved)")
+        return 0
+    if command == 'cleanup':
+        print(f"✅ Removed stray rows of {cleanup()} users")
+        return 0
+    print("Usage: python sharding.py [status|move USER_ID SHARD|rebalance [SHARD_COUNT]|cleanup]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
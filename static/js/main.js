@@ -546,56 +546,13 @@ class ExpenseManager {
     }
 
     exportToCSV() {
-        const expenses = this.getExpenseData();
-        const csv = this.convertToCSV(expenses);
-        this.downloadCSV(csv);
-    }
-
-    getExpenseData() {
-        const expenses = [];
-        document.querySelectorAll('.expense-card').forEach(card => {
-            const expense = {
-                date: card.querySelector('.expense-date')?.textContent || '',
-                time: card.querySelector('.expense-time')?.textContent || '',
-                title: card.querySelector('.expense-title')?.textContent || '',
-                category: card.querySelector('.expense-category')?.textContent || '',
-                amount: card.querySelector('.amount-value')?.textContent || '',
-                description: card.querySelector('.expense-description')?.textContent || ''
-            };
-            expenses.push(expense);
-        });
-        return expenses;
-    }
-
-    convertToCSV(data) {
-        const headers = ['Date', 'Time', 'Title', 'Category', 'Amount', 'Description'];
-        const csvContent = [
-            headers.join(','),
-            ...data.map(row => 
-                headers.map(header => 
-                    `"${row[header.toLowerCase()] || ''}"`
-                ).join(',')
-            )
-        ].join('\\n');
-        
-        return csvContent;
-    }
+        // The server streams every matching row, not just the rendered page
+        const exportBtn = document.getElementById('exportBtn');
+        const url = exportBtn?.dataset.exportUrl;
+        if (!url) return;
 
-    downloadCSV(csv) {
-        const blob = new Blob([csv], { type: 'text/csv' });
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        
-        a.href = url;
-        a.download = `expenses_${new Date().toISOString().split('T')[0]}.csv`;
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-        
-        window.URL.revokeObjectURL(url);
-        
-        // Show success message
-        this.showToast('Expenses exported successfully!', 'success');
+        window.location.href = url;
+        this.showToast('Export started!', 'success');
     }
 
     showToast(message, type = 'info') {
@@ -0,0 +1,84 @@
+"""
+ExpenseTracker Statistics
+A user's headline figures (all time, this month, by category, monthly trend) from one statement over their rollups
+
+Expense.get_statistics, database.get_expense_stats and the dashboard all
+get their figures here, from one statement: the user's expense_rollups
+rows (a primary-key range, one row per month and category) grouped by
+category, with this month's figures summed alongside, plus the trend
+months grouped by month. Before, each figure was its own query and the
+same rows were read up to four times.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+# Months before the current one in monthly_trend
+TREND_MONTHS = 12
+
+class ExpenseStats(namedtuple('ExpenseStats', (
+        'total_count', 'total_amount', 'month_count', 'month_amount', 'categories',
+        'monthly_trend'))):
+    """Figures for one user, amounts in paise
+
+    ``categories`` is [{'category', 'total', 'count'}] largest first and
+    ``monthly_trend`` is [{'month', 'total', 'count'}] oldest first.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """The dict Expense.get_statistics has always returned"""
+        return {
+            'total_expenses': self.total_count,
+            'total_amount': self.total_amount,
+            'monthly_expenses': self.month_count,
+            'monthly_amount': self.month_amount,
+            'categories': self.categories,
+            'monthly_trend': self.monthly_trend,
+        }
+
+def months_back(month, months):
+    """The YYYY-MM month ``months`` before ``month``"""
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 - months, 12)
+    return f'{year:04d}-{number + 1:02d}'
+
+def get_expense_stats(conn, user_id, today=None, trend_months=TREND_MONTHS, all_time=True):
+    """ExpenseStats for a user from one read of their rollups
+
+    With ``all_time`` False only the trend window (the current month when
+    ``trend_months`` is 0) is read, and the totals and categories cover
+    just that window.
+    """
+    month = (today or date.today()).strftime('%Y-%m')
+    trend_start = months_back(month, trend_months)
+    scope = '' if all_time else ' AND month >= ?'
+
+    # Both halves are primary-key ranges; this month's figures ride along in the first
+    query = f"""SELECT 0, category, SUM(total_minor), SUM(count),
+                       SUM(CASE WHEN month = ? THEN total_minor ELSE 0 END),
+                       SUM(CASE WHEN month = ? THEN count ELSE 0 END)
+                FROM expense_rollups WHERE user_id = ?{scope} GROUP BY category"""
+    params = [month, month, user_id] + ([] if all_time else [trend_start])
+    if trend_months:
+        query += """ UNION ALL
+                SELECT 1, month, SUM(total_minor), SUM(count), 0, 0
+                FROM expense_rollups WHERE user_id = ? AND month >= ? GROUP BY month"""
+        params += [user_id, trend_start]
+
+    total_count = total_amount = month_count = month_amount = 0
+    categories, trend = [], []
+    for kind, key, total, count, in_month_total, in_month_count in conn.execute(query, params):
+        if kind == 1:
+            trend.append({'month': key, 'total': total, 'count': count})
+            continue
+        categories.append({'category': key, 'total': total, 'count': count})
+        total_count += count
+        total_amount += total
+        month_count += in_month_count
+        month_amount += in_month_total
+    categories.sort(key=lambda row: -row['total'])
+    if not trend_months and month_count:
+        trend = [{'month': month, 'total': month_amount, 'count': month_count}]
+
+    return ExpenseStats(total_count, total_amount, month_count, month_amount, categories, trend)
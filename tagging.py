@@ -0,0 +1,251 @@
+"""
+ExpenseTracker Tags
+Normalized tag index over expenses.tags, kept in sync by triggers
+
+expenses.tags stays the free-text field users type ("food, Work trip");
+every comma-separated part, trimmed and lowercased, becomes a row in
+``tags`` (one per user and name) linked to the expense through
+``expense_tags``. The index is derived like the rollups and the
+search index, so every write path (forms, the batch API, imports,
+recurring rules, shard moves) keeps it exact. Tag filters and per-tag
+totals read the (user_id, tag_id, expense_id) index instead of matching
+the tags text of every one of the user's rows.
+
+Usage: python tagging.py [rebuild|check]
+"""
+
+import sys
+
+from database import all_shards, get_shard_connection
+
+# Expenses per transaction when indexing existing rows
+TAG_BACKFILL_BATCH_SIZE = 5000
+
+# Most tags get_tag_totals returns when asked for a limit
+MAX_TAG_TOTALS_LIMIT = 500
+
+# expenses.tags as a JSON array of its comma-separated parts, for json_each
+# (SQLite has no split function and triggers can't use recursive CTEs).
+# json_quote escapes everything but the commas, so the array is always valid.
+TAG_ITEMS_SQL = "json_each('[' || replace(json_quote({column}), ',', '\",\"') || ']')"
+
+# A tag's stored name; normalize_tag must agree with it
+TAG_NAME_SQL = 'lower(trim({value}))'
+
+def _items(column):
+    return TAG_ITEMS_SQL.format(column=column)
+
+def _insert_tags(row, where=''):
+    """INSERT statements indexing the tags of ``row`` (NEW, or an expenses alias)"""
+    name = TAG_NAME_SQL.format(value='j.value')
+    items = _items(f'{row}.tags')
+    return f"""
+        INSERT OR IGNORE INTO tags (user_id, name)
+        SELECT DISTINCT {row}.user_id, {name} FROM {{source}}{items} j
+        WHERE {name} != ''{where};
+        INSERT OR IGNORE INTO expense_tags (expense_id, tag_id, user_id)
+        SELECT {row}.id, t.id, {row}.user_id FROM {{source}}{items} j
+        JOIN tags t ON t.user_id = {row}.user_id AND t.name = {name}
+        WHERE {name} != ''{where};
+    """
+
+def _drop_unused_tags(row):
+    """DELETE of ``row``'s tags that no expense uses any more"""
+    name = TAG_NAME_SQL.format(value='value')
+    return f"""
+        DELETE FROM tags
+        WHERE user_id = {row}.user_id
+          AND name IN (SELECT {name} FROM {_items(f'{row}.tags')})
+          AND NOT EXISTS (SELECT 1 FROM expense_tags et
+                          WHERE et.user_id = tags.user_id AND et.tag_id = tags.id);
+    """
+
+TAG_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        UNIQUE (user_id, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS expense_tags (
+        expense_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (expense_id, tag_id)
+    ) WITHOUT ROWID
+    """,
+    # Tag filters and per-tag totals walk this; expense_id makes it covering
+    "CREATE INDEX IF NOT EXISTS idx_expense_tags_user_tag ON expense_tags(user_id, tag_id, expense_id)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_tags_insert
+    AFTER INSERT ON expenses
+    WHEN NEW.tags IS NOT NULL AND NEW.tags != ''
+    BEGIN
+        {_insert_tags('NEW').format(source='')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_tags_delete
+    AFTER DELETE ON expenses
+    WHEN OLD.tags IS NOT NULL AND OLD.tags != ''
+    BEGIN
+        DELETE FROM expense_tags WHERE expense_id = OLD.id;
+        {_drop_unused_tags('OLD')}
+    END
+    """,
+    # Unlink first and drop orphans last, so tags kept by the new text keep their ids
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_expenses_tags_update
+    AFTER UPDATE OF tags, user_id ON expenses
+    WHEN OLD.tags IS NOT NEW.tags OR OLD.user_id != NEW.user_id
+    BEGIN
+        DELETE FROM expense_tags WHERE expense_id = OLD.id;
+        {_insert_tags('NEW').format(source='')}
+        {_drop_unused_tags('OLD')}
+    END
+    """,
+]
+
+def normalize_tag(name):
+    """A tag as stored: trimmed of spaces, ASCII letters lowercased (as SQLite's lower())"""
+    return ''.join(c.lower() if c.isascii() else c for c in name.strip(' '))
+
+def parse_tags(text):
+    """Distinct normalized tags in free text, in order of appearance"""
+    if not text:
+        return []
+    tags = (normalize_tag(part) for part in text.split(','))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+def create_tag_schema(conn):
+    """Create the tag tables, index and triggers (see backfill_tags for existing rows)"""
+    for statement in TAG_SCHEMA:
+        conn.execute(statement)
+
+def backfill_tags(conn, batch_size=TAG_BACKFILL_BATCH_SIZE):
+    """Index the tags of every expense, committing every ``batch_size`` ids
+
+    Safe to rerun or resume: rows already indexed are ignored, and the
+    triggers cover writes made between batches. Returns expenses read.
+    """
+    statements = [
+        statement for statement in
+        _insert_tags('e', where=' AND e.id > ? AND e.id <= ?').format(source='expenses e, ').split(';')
+        if statement.strip()
+    ]
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM expenses').fetchone()[0]
+    indexed = 0
+    for start in range(0, last_id, batch_size):
+        bounds = (start, start + batch_size)
+        with conn:
+            for statement in statements:
+                conn.execute(statement, bounds)
+        indexed += conn.execute(
+            "SELECT COUNT(*) FROM expenses WHERE id > ? AND id <= ? AND tags != ''", bounds
+        ).fetchone()[0]
+    return indexed
+
+def rebuild_tag_index(conn):
+    """Drop and recompute the tag index from expenses.tags"""
+    with conn:
+        conn.execute('DELETE FROM expense_tags')
+        conn.execute('DELETE FROM tags')
+    return backfill_tags(conn)
+
+def check_tag_index(conn):
+    """True if the index matches what expenses.tags says, expense by expense"""
+    expected = {}
+    for expense_id, user_id, text in conn.execute(
+            "SELECT id, user_id, tags FROM expenses WHERE tags IS NOT NULL AND tags != ''"):
+        for tag in parse_tags(text):
+            expected[(expense_id, tag)] = user_id
+    actual = {
+        (expense_id, name): user_id
+        for expense_id, name, user_id in conn.execute(
+            'SELECT et.expense_id, t.name, et.user_id FROM expense_tags et '
+            'JOIN tags t ON t.id = et.tag_id AND t.user_id = et.user_id'
+        )
+    }
+    unused = conn.execute(
+        'SELECT COUNT(*) FROM tags WHERE NOT EXISTS '
+        '(SELECT 1 FROM expense_tags et WHERE et.user_id = tags.user_id AND et.tag_id = tags.id)'
+    ).fetchone()[0]
+    return expected == actual and not unused
+
+def tag_filter_clause(user_id, tags, mode='any'):
+    """``AND id IN (...)`` fragment for Expense.build_filter_query
+
+    ``mode`` 'any' keeps expenses with at least one of ``tags``, 'all'
+    those with every one. Returns ('', []) when there is no tag to filter on.
+    """
+    names = list(dict.fromkeys(tag for tag in (normalize_tag(tag) for tag in tags or ()) if tag))
+    if not names:
+        return '', []
+    postings = ('SELECT et.expense_id FROM tags t'
+                ' JOIN expense_tags et ON et.user_id = t.user_id AND et.tag_id = t.id'
+                ' WHERE t.user_id = ? AND t.name {}')
+    if mode == 'all':
+        # One index range per tag, intersected
+        sql = ' INTERSECT '.join(postings.format('= ?') for _ in names)
+        params = [param for name in names for param in (user_id, name)]
+    else:
+        sql = postings.format(f"IN ({', '.join('?' * len(names))})")
+        params = [user_id] + names
+    return f' AND id IN ({sql})', params
+
+def get_tag_totals(conn, user_id, start=None, end=None, limit=None):
+    """[{'tag', 'count', 'total'}] for a user's tags, largest total first
+
+    Walks the user's range of the expense_tags index and reads each
+    expense by primary key; ``start``/``end`` bound expense_date like
+    date_range_clause. ``limit`` (None for every tag) is clamped to
+    1..MAX_TAG_TOTALS_LIMIT.
+    """
+    query = """SELECT t.name as tag, COUNT(*) as count, COALESCE(SUM(e.amount), 0) as total
+               FROM expense_tags et
+               JOIN tags t ON t.id = et.tag_id
+               JOIN expenses e ON e.id = et.expense_id
+               WHERE et.user_id = ?"""
+    params = [user_id]
+    if start:
+        query += ' AND e.expense_date >= ?'
+        params.append(start)
+    if end:
+        query += ' AND e.expense_date < ?'
+        params.append(end)
+    query += ' GROUP BY et.tag_id ORDER BY total DESC, t.name'
+    if limit is not None:
+        # Clamped like search: LIMIT 0 would return nothing, a negative LIMIT everything
+        query += ' LIMIT ?'
+        params.append(max(1, min(int(limit), MAX_TAG_TOTALS_LIMIT)))
+    return [dict(row) for row in conn.execute(query, params)]
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'check'
+    if command not in ('rebuild', 'check'):
+        print("Usage: python tagging.py [rebuild|check]")
+        return 2
+    in_sync = True
+    for shard in all_shards():
+        conn = get_shard_connection(shard)
+        try:
+            if command == 'rebuild':
+                rebuild_tag_index(conn)
+            elif not check_tag_index(conn):
+                in_sync = False
+        finally:
+            conn.close()
+    if command == 'rebuild':
+        print("✅ Tag index rebuilt from expenses")
+        return 0
+    if in_sync:
+        print("✅ Tag index matches expenses.tags")
+        return 0
+    print("❌ Tag index is out of sync; run 'python tagging.py rebuild'")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,26 @@
+"""
+Shared fixtures: one app on a throwaway database, and a client logged in as the default admin
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    import database
+    import recurring
+    database.DATABASE = str(tmp_path_factory.mktemp('db') / 'tests.db')
+    database.SQL_INSTRUMENTATION = False
+    recurring.RECURRING_SCHEDULER = False
+    from app import create_app
+    return create_app()
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
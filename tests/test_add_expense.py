@@ -0,0 +1,21 @@
+import pytest
+
+FORM = {'expense_date': '2024-09-20', 'expense_time': '09:30', 'amount': '120',
+        'subject': 'Gym', 'category': 'Healthcare'}
+
+def add_expense(client, **fields):
+    return client.post('/add_expense', data=dict(FORM, **fields))
+
+def test_repeating_expense_is_added(client):
+    assert add_expense(client, repeat='monthly').status_code == 302
+
+@pytest.mark.parametrize('fields, message', [
+    ({'expense_date': '20/09/2024', 'repeat': 'monthly'}, b'Please enter a valid date!'),
+    ({'expense_date': '2024-02-30'}, b'Please enter a valid date!'),
+    ({'expense_time': 'noon', 'repeat': 'weekly'}, b'Please enter a valid time!'),
+    ({'expense_time': '25:00'}, b'Please enter a valid time!'),
+])
+def test_bad_date_or_time_redisplays_the_form(client, fields, message):
+    response = add_expense(client, **fields)
+    assert response.status_code == 200
+    assert message in response.data
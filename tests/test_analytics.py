@@ -0,0 +1,47 @@
+import pytest
+
+import database
+from analytics import AnalyticsCache
+from models import Expense
+
+pytest.importorskip('numpy')
+
+ADMIN_ID = 1
+
+def add_expense(subject):
+    expense, message = Expense.create_expense(
+        ADMIN_ID, '2024-09-20', '09:30', 1250, subject, category='Other'
+    )
+    assert expense is not None, message
+    return expense
+
+def test_own_writes_refresh_only_their_rows(app):
+    # A user's first write starts their counter from the clock, so start past it
+    add_expense('Breakfast')
+    cache = AnalyticsCache()
+    rows = len(cache.get(ADMIN_ID))
+    expense = add_expense('Snack')
+    cache.note_write(ADMIN_ID, (expense.id,))
+    assert len(cache.get(ADMIN_ID)) == rows + 1
+    assert (cache.stats['loads'], cache.stats['refreshes']) == (1, 1)
+
+def test_writes_from_elsewhere_reload_the_frame(app):
+    # ``other`` stands in for another worker process: it never hears of ``cache``'s writes
+    cache, other = AnalyticsCache(), AnalyticsCache()
+    rows = len(cache.get(ADMIN_ID))
+    expense = add_expense('Taxi')
+    other.note_write(ADMIN_ID, (expense.id,))
+    assert len(cache.get(ADMIN_ID)) == rows + 1
+    assert cache.stats['loads'] == 2
+
+    # Its own write plus one it wasn't told about: counting can't cover both
+    own = add_expense('Tea')
+    conn = database.get_shard_connection(0)
+    try:
+        with conn:
+            conn.execute('DELETE FROM expenses WHERE id = ?', (expense.id,))
+    finally:
+        conn.close()
+    cache.note_write(ADMIN_ID, (own.id,))
+    assert len(cache.get(ADMIN_ID)) == rows + 1
+    assert cache.stats['loads'] == 3
@@ -0,0 +1,29 @@
+from models import Expense
+
+ADMIN_ID = 1
+
+def post_budget(client, category):
+    return client.post('/api/budgets', json={'category': category, 'amount': 2500,
+                                             'period': 'monthly'})
+
+def test_budget_for_own_category(client):
+    expense, message = Expense.create_expense(
+        ADMIN_ID, '2024-09-20', '09:30', 40000, 'Vet visit', category='Pets'
+    )
+    assert expense is not None, message
+
+    response = post_budget(client, 'Pets')
+    assert response.status_code == 201
+    assert response.get_json()['category'] == 'Pets'
+
+    budget_id = response.get_json()['id']
+    response = client.put(f'/api/budgets/{budget_id}', json={'amount': 3000})
+    assert response.status_code == 200
+
+def test_budget_for_default_category(client):
+    assert post_budget(client, 'Groceries').status_code == 201
+
+def test_budget_for_unknown_category(client):
+    response = post_budget(client, 'No such category')
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == ['Unknown category']
@@ -0,0 +1,34 @@
+from cache import VersionedCache
+from models import Expense
+
+ADMIN_ID = 1
+
+def add_expense(subject):
+    expense, message = Expense.create_expense(
+        ADMIN_ID, '2024-09-20', '09:30', 1250, subject, category='Other'
+    )
+    assert expense is not None, message
+    return expense
+
+def test_workers_see_each_others_writes(app):
+    # Two caches stand in for two worker processes sharing the database
+    first, second = VersionedCache(), VersionedCache()
+    before = first.version(ADMIN_ID)
+    assert second.version(ADMIN_ID) == before
+
+    expense = add_expense('Coffee')
+    after = second.version(ADMIN_ID)
+    assert after != before
+    assert first.version(ADMIN_ID) == after
+
+    expense.delete()
+    assert first.version(ADMIN_ID) not in (before, after)
+
+def test_summary_etag_follows_writes(client):
+    etag = client.get('/api/expenses/summary').headers['ETag']
+    assert client.get('/api/expenses/summary', headers={'If-None-Match': etag}).status_code == 304
+
+    add_expense('Lunch')
+    response = client.get('/api/expenses/summary', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,25 @@
+import pytest
+
+from date_filters import period_range
+
+def test_custom_range_is_half_open():
+    assert period_range('custom', date_from='2024-09-01', date_to='2024-09-30') == ('2024-09-01', '2024-10-01')
+
+def test_custom_range_ending_on_the_last_date_is_unbounded():
+    assert period_range('custom', date_to='9999-12-31') == (None, None)
+
+def test_malformed_custom_date_raises_value_error():
+    with pytest.raises(ValueError):
+        period_range('custom', date_from='2024-13-45')
+
+@pytest.mark.parametrize('url', ['/api/expenses', '/api/expenses/export'])
+@pytest.mark.parametrize('field', ['date_from', 'date_to'])
+def test_malformed_listing_date_is_a_client_error(client, url, field):
+    response = client.get(url, query_string={field: 'yesterday'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Dates must be YYYY-MM-DD'}
+
+def test_listing_date_filters_apply(client):
+    response = client.get('/api/expenses', query_string={'date_from': '2024-09-21', 'date_to': '2024-09-21'})
+    assert response.status_code == 200
+    assert {row['expense_date'] for row in response.get_json()['expenses']} <= {'2024-09-21'}
@@ -0,0 +1,55 @@
+import pytest
+
+import database
+
+def post_batch(client, **body):
+    return client.post('/api/v1/expenses/batch', json=body)
+
+def item(**fields):
+    return dict({'expense_date': '2024-09-20', 'expense_time': '09:30', 'amount': 12.5,
+                 'subject': 'Batch item', 'category': 'Other'}, **fields)
+
+def stored_is_recurring(expense_id):
+    conn = database.get_shard_connection(0)
+    try:
+        return conn.execute(
+            'SELECT is_recurring, typeof(is_recurring) FROM expenses WHERE id = ?', (expense_id,)
+        ).fetchone()[:]
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('fields, error', [
+    ({'expense_date': '20/09/2024'}, 'Expense date must be YYYY-MM-DD'),
+    ({'expense_date': '2024-02-30'}, 'Expense date must be YYYY-MM-DD'),
+    ({'expense_time': '9.30pm'}, 'Expense time must be HH:MM'),
+    ({'is_recurring': {}}, 'Is recurring must be true or false'),
+    ({'is_recurring': 'yes'}, 'Is recurring must be true or false'),
+    ({'is_recurring': 2}, 'Is recurring must be true or false'),
+    ({'amount': '1e30'}, 'Amount must be a positive number'),
+])
+def test_bad_item_fails_alone(client, fields, error):
+    response = post_batch(client, create=[item(subject='Good'), item(**fields)])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['applied'] == 1
+    assert body['results'][0]['status'] == 'created'
+    assert body['results'][1]['status'] == 'invalid'
+    assert error in body['results'][1]['errors']
+
+def test_bad_patch_is_rejected(client):
+    created = post_batch(client, create=[item()]).get_json()['results'][0]
+    response = post_batch(client, update=[{'id': created['id'], 'expense_date': 'tomorrow'}])
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['errors'] == ['Expense date must be YYYY-MM-DD']
+
+def test_is_recurring_stored_the_same_by_create_and_patch(client):
+    created = post_batch(client, create=[item(is_recurring=1)]).get_json()['results'][0]
+    assert stored_is_recurring(created['id']) == (1, 'integer')
+
+    response = post_batch(client, update=[{'id': created['id'], 'is_recurring': False}])
+    assert response.status_code == 200
+    assert stored_is_recurring(created['id']) == (0, 'integer')
+
+    response = client.patch('/api/v1/expenses', json=[{'id': created['id'], 'is_recurring': 1}])
+    assert response.status_code == 200
+    assert stored_is_recurring(created['id']) == (1, 'integer')
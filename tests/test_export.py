@@ -0,0 +1,34 @@
+import csv
+import io
+import json
+
+import pytest
+
+from models import Expense
+
+ADMIN_ID = 1
+
+@pytest.fixture(scope='module')
+def refunds(app):
+    for amount, subject in ((-150, 'Refund export-a'), (-50, 'Refund export-b'),
+                            (123405, 'Laptop export-c')):
+        expense, message = Expense.create_expense(
+            ADMIN_ID, '2024-09-20', '09:30', amount, subject, category='Shopping'
+        )
+        assert expense is not None, message
+
+def test_csv_amounts_keep_their_sign(client, refunds):
+    response = client.get('/api/expenses/export?format=csv')
+    assert response.status_code == 200
+    amounts = {row['subject']: row['amount']
+               for row in csv.DictReader(io.StringIO(response.get_data(as_text=True)))}
+    assert amounts['Refund export-a'] == '-1.50'
+    assert amounts['Refund export-b'] == '-0.50'
+    assert amounts['Laptop export-c'] == '1234.05'
+
+def test_jsonl_amounts_keep_their_sign(client, refunds):
+    response = client.get('/api/expenses/export?format=jsonl')
+    amounts = {row['subject']: row['amount']
+               for row in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert amounts['Refund export-a'] == -1.5
+    assert amounts['Refund export-b'] == -0.5
@@ -0,0 +1,23 @@
+import io
+
+from importer import import_csv
+
+ADMIN_ID = 1
+
+def test_bad_dates_and_times_are_row_errors(app):
+    csv_text = (
+        'expense_date,expense_time,amount,subject,category\n'
+        '2024-09-20,09:30,25.50,Breakfast,Food & Dining\n'
+        '20/09/2024,09:30,10,Bad date,Other\n'
+        '2024-02-30,09:30,10,No such day,Other\n'
+        '2024-09-20,25:00,10,Bad time,Other\n'
+        '2024-09-21,18:45,35,Fuel,Transportation\n'
+    )
+    inserted, errors, error_count, _ = import_csv(ADMIN_ID, io.BytesIO(csv_text.encode('utf-8')))
+    assert inserted == 2
+    assert error_count == 3
+    assert errors == [
+        (2, ['Expense date must be YYYY-MM-DD']),
+        (3, ['Expense date must be YYYY-MM-DD']),
+        (4, ['Expense time must be HH:MM']),
+    ]
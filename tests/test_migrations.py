@@ -0,0 +1,38 @@
+import os
+import shutil
+import sqlite3
+
+from migrations import SCHEMA_VERSION, get_schema_version, migrate
+from rollups import check_rollups
+
+LEGACY_DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'expense_manager.db')
+
+def test_legacy_database_upgrades_with_exact_rollups(app, tmp_path):
+    path = tmp_path / 'legacy.db'
+    shutil.copyfile(LEGACY_DATABASE, path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        assert get_schema_version(conn) < 13
+        migrate(conn)
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        assert conn.execute('SELECT COUNT(*) FROM expense_rollups').fetchone()[0] > 0
+        assert check_rollups(conn) == []
+    finally:
+        conn.close()
+
+def test_data_version_step_moves_every_user(app, tmp_path):
+    path = tmp_path / 'legacy.db'
+    shutil.copyfile(LEGACY_DATABASE, path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        migrate(conn)
+        users = {row[0] for row in conn.execute('SELECT DISTINCT user_id FROM expenses')}
+        assert users
+        versions = dict(conn.execute('SELECT user_id, version FROM user_data_versions').fetchall())
+        assert users <= versions.keys()
+        assert all(versions[user_id] > 0 for user_id in users)
+    finally:
+        conn.close()
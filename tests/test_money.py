@@ -0,0 +1,35 @@
+import pytest
+
+from money import InvalidAmount, MAX_STORABLE_MINOR, to_minor
+
+@pytest.mark.parametrize('value, expected', [
+    ('12.345', 1235),
+    ('₹1,250.50', 125050),
+    (0.1, 10),
+    ('92233720368547758.07', MAX_STORABLE_MINOR),
+])
+def test_to_minor(value, expected):
+    assert to_minor(value) == expected
+
+@pytest.mark.parametrize('value', [
+    '1e30', '-1e30', '1e20', 10 ** 40, 1e300, '1e999999999',
+    'NaN', 'sNaN', 'Infinity', '-inf', float('nan'), float('inf'),
+    '', 'abc', None, True,
+])
+def test_to_minor_rejects(value):
+    with pytest.raises(InvalidAmount):
+        to_minor(value)
+
+@pytest.mark.parametrize('value', ['1e30', '1e20', 'NaN', 'Infinity'])
+def test_huge_amount_filter_is_ignored(client, value):
+    response = client.get(f'/api/expenses?min_amount={value}&max_amount={value}')
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('value', ['1e30', 'NaN', 'Infinity'])
+def test_add_expense_rejects_huge_amount(client, value):
+    response = client.post('/add_expense', data={
+        'expense_date': '2024-09-20', 'expense_time': '09:30', 'amount': value,
+        'subject': 'Huge', 'category': 'Other',
+    })
+    assert response.status_code == 200
+    assert b'Please enter a valid amount!' in response.data
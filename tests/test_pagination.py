@@ -0,0 +1,35 @@
+import base64
+import json
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def tampered(payload):
+    raw = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def test_cursor_round_trip():
+    row = {'expense_date': '2024-09-20', 'expense_time': '09:30', 'id': 7}
+    assert decode_cursor('date_desc', encode_cursor('date_desc', row)) == ['2024-09-20', '09:30', 7]
+
+@pytest.mark.parametrize('values', [
+    [['2024-09-20'], '09:30', 7],
+    ['2024-09-20', {'a': 1}, 7],
+    ['2024-09-20', '09:30', True],
+    ['2024-09-20', '09:30', None],
+    ['2024-09-20', '09:30', float('nan')],
+])
+def test_tampered_cursor_values_are_rejected(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor('date_desc', tampered(['date_desc'] + values))
+
+def test_null_allowed_only_for_nullable_keys():
+    assert decode_cursor('category', tampered(['category', None, '2024-09-20', 3])) == [None, '2024-09-20', 3]
+
+def test_tampered_cursor_is_a_client_error(client):
+    cursor = tampered(['date_desc', ['x'], '09:30', 1])
+    response = client.get('/api/expenses', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    response = client.get('/view_expenses', query_string={'cursor': cursor})
+    assert response.status_code == 302
@@ -0,0 +1,33 @@
+import pytest
+
+RULE = {'frequency': 'monthly', 'start_date': '2024-09-20', 'expense_time': '09:30',
+        'amount': 499, 'subject': 'Streaming', 'category': 'Entertainment'}
+
+def post_rule(client, **fields):
+    return client.post('/api/recurring', json=dict(RULE, **fields))
+
+def test_rule_created(client):
+    response = post_rule(client, end_date='2025-09-20', tags='subscriptions')
+    assert response.status_code == 201
+    rule = response.get_json()
+    assert (rule['next_due'], rule['end_date']) == ('2024-09-20', '2025-09-20')
+
+@pytest.mark.parametrize('fields, error', [
+    ({'start_date': 5}, 'Start date must be YYYY-MM-DD'),
+    ({'end_date': 5}, 'End date must be YYYY-MM-DD'),
+    ({'start_date': '20/09/2024'}, 'Start date must be YYYY-MM-DD'),
+    ({'expense_time': 'garbage'}, 'Expense time must be HH:MM'),
+    ({'expense_time': 930}, 'Expense time must be a string'),
+    ({'tags': ['a']}, 'Tags must be a string'),
+    ({'category': 5}, 'Category must be a string'),
+    ({'subject': 5}, 'Subject must be a string'),
+    ({'description': {'a': 1}}, 'Description must be a string'),
+    ({'payment_method': 1}, 'Payment method must be a string'),
+])
+def test_bad_rule_is_rejected(client, fields, error):
+    response = post_rule(client, **fields)
+    assert response.status_code == 400
+    assert error in response.get_json()['errors']
+
+def test_rule_body_must_be_an_object(client):
+    assert client.post('/api/recurring', json=[RULE]).status_code == 400
@@ -0,0 +1,46 @@
+import database
+from rollups import check_rollups, get_week_totals, replace_weekly_rollup_triggers
+
+ADMIN_ID = 1
+
+def insert(conn, expense_date, amount):
+    return conn.execute(
+        """INSERT INTO expenses (user_id, expense_date, expense_time, amount, subject)
+           VALUES (?, ?, '09:30', ?, 'Rollup test')""",
+        (ADMIN_ID, expense_date, amount)
+    ).lastrowid
+
+def week_totals(conn):
+    return tuple(get_week_totals(conn, ADMIN_ID, '2031-03-03'))
+
+def test_unreadable_dates_stay_out_of_weekly_rollups(app):
+    conn = database.get_shard_connection(0)
+    try:
+        with conn:
+            good = insert(conn, '2031-03-05', 1000)
+            bad = insert(conn, '05/03/2031', 500)
+        assert week_totals(conn) == (1000, 1)
+        assert check_rollups(conn, ADMIN_ID) == []
+
+        with conn:
+            conn.execute("UPDATE expenses SET expense_date = '2031-03-06' WHERE id = ?", (bad,))
+        assert week_totals(conn) == (1500, 2)
+        with conn:
+            conn.execute("UPDATE expenses SET expense_date = 'soon' WHERE id = ?", (good,))
+        assert week_totals(conn) == (500, 1)
+        assert check_rollups(conn, ADMIN_ID) == []
+
+        with conn:
+            conn.execute('DELETE FROM expenses WHERE id IN (?, ?)', (good, bad))
+        assert check_rollups(conn, ADMIN_ID) == []
+    finally:
+        conn.close()
+
+def test_replacing_weekly_triggers_keeps_totals(app):
+    conn = database.get_shard_connection(0)
+    try:
+        with conn:
+            replace_weekly_rollup_triggers(conn)
+        assert check_rollups(conn) == []
+    finally:
+        conn.close()
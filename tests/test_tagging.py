@@ -0,0 +1,35 @@
+import pytest
+
+import database
+from models import Expense
+from tagging import get_tag_totals
+
+ADMIN_ID = 1
+
+@pytest.fixture(scope='module')
+def tagged(app):
+    for tags in ('tagtest-a', 'tagtest-a,tagtest-b', 'tagtest-c'):
+        expense, message = Expense.create_expense(
+            ADMIN_ID, '2024-09-20', '09:30', 1000, 'Tagged', tags=tags
+        )
+        assert expense is not None, message
+
+@pytest.mark.parametrize('limit, expected', [(2, 2), (0, 1), (-1, 1)])
+def test_tag_totals_limit_is_clamped(tagged, limit, expected):
+    conn = database.get_shard_connection(0)
+    try:
+        assert len(get_tag_totals(conn, ADMIN_ID, limit=limit)) == expected
+        assert len(get_tag_totals(conn, ADMIN_ID)) >= 3
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'abc', ''])
+def test_api_rejects_limits_below_one(client, tagged, limit):
+    response = client.get(f'/api/tags?limit={limit}')
+    assert response.status_code == 400
+
+def test_api_limit(client, tagged):
+    response = client.get('/api/tags?limit=1')
+    assert response.status_code == 200
+    assert len(response.get_json()['tags']) == 1
+    assert len(client.get('/api/tags').get_json()['tags']) >= 3
@@ -0,0 +1,218 @@
+"""
+ExpenseTracker Write Queue
+Group commit: one writer thread per shard turns many request writes into one transaction
+
+Request threads hand a write intent, a function of a connection, to the
+writer of the user's shard and wait on a future. The writer takes what is
+queued (up to GROUP_COMMIT_MAX_ITEMS, waiting at most GROUP_COMMIT_MAX_DELAY
+seconds for more), runs each intent under its own savepoint so one failure
+doesn't sink the others, and commits once. Futures resolve only after that
+commit, so a caller that got its row id knows the row is committed.
+Writers never contend for the SQLite lock with each other, and the commit
+cost (an fsync with WRITE_DURABILITY 'full') is shared by the whole group.
+
+At most GROUP_COMMIT_QUEUE_SIZE intents wait per shard; beyond that, or
+after WRITE_TIMEOUT, WriteBusy is raised. With GROUP_COMMIT off, intents
+run and commit directly on the caller's connection.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import database
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT = True
+GROUP_COMMIT_MAX_ITEMS = 256
+# Seconds to wait for more intents once the queue is empty. 0 commits what is
+# queued right away; groups still form from what arrives during each commit.
+GROUP_COMMIT_MAX_DELAY = 0.0
+GROUP_COMMIT_QUEUE_SIZE = 10000
+WRITE_TIMEOUT = 5.0
+
+# 'off' (no fsync), 'normal' (fsync at checkpoints; a power cut may lose the last
+# commits but never corrupts) or 'full' (fsync every group commit)
+WRITE_DURABILITY = 'normal'
+SYNCHRONOUS = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+class WriteBusy(sqlite3.OperationalError):
+    """Raised when a shard's write queue is full or the write didn't start in time"""
+
+class GroupCommitWriter:
+    """Single writer thread for one shard file"""
+
+    def __init__(self, shard, max_items, max_delay, queue_size, durability):
+        self.shard = shard
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.durability = durability
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {'intents': 0, 'groups': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0,
+                      'largest_group': 0}
+
+    def _ensure_started(self):
+        """Start the thread on first use, so forked workers each get their own"""
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name=f'group-commit-{self.shard}', daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, fn):
+        """Queue ``fn(conn)``; the returned future resolves to its result once committed"""
+        future = Future()
+        try:
+            self._queue.put_nowait((fn, future))
+        except queue.Full:
+            self.stats['rejected'] += 1
+            raise WriteBusy('Write queue is full')
+        self._ensure_started()
+        return future
+
+    def run(self, fn, timeout=WRITE_TIMEOUT):
+        """Submit ``fn`` and wait for its committed result"""
+        future = self.submit(fn)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if future.cancel():
+                self.stats['timeouts'] += 1
+                raise WriteBusy('Write did not start in time')
+            # Already in a group: its commit is moments away
+            return future.result()
+
+    def stop(self, timeout=None):
+        """Finish what is queued, then stop the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put((None, None))
+            self._thread.join(timeout)
+
+    def _next_group(self):
+        group = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(group) < self.max_items and group[-1][0] is not None:
+            try:
+                remaining = deadline - time.monotonic()
+                group.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        conn = database.get_shard_connection(self.shard)
+        conn.execute(f'PRAGMA synchronous = {SYNCHRONOUS[self.durability]}')
+        try:
+            while True:
+                group = self._next_group()
+                stopping = group[-1][0] is None
+                intents = [(fn, future) for fn, future in group
+                           if fn is not None and future.set_running_or_notify_cancel()]
+                if intents:
+                    self._commit(conn, intents)
+                if stopping:
+                    break
+        finally:
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.close()
+
+    def _commit(self, conn, intents):
+        """Run a group of intents in one transaction and resolve their futures after COMMIT"""
+        outcomes = []
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, future in intents:
+                conn.execute('SAVEPOINT intent')
+                try:
+                    outcomes.append((future, fn(conn), None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO intent')
+                    outcomes.append((future, None, e))
+                conn.execute('RELEASE intent')
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.exception('Group commit of %d intents failed', len(intents))
+            self.stats['failed'] += len(intents)
+            for _, future in intents:
+                future.set_exception(e)
+            return
+
+        self.stats['groups'] += 1
+        self.stats['intents'] += len(intents)
+        self.stats['largest_group'] = max(self.stats['largest_group'], len(intents))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                self.stats['failed'] += 1
+                future.set_exception(error)
+
+    def get_stats(self):
+        stats = dict(self.stats, shard=self.shard, queued=self._queue.qsize(),
+                     durability=self.durability)
+        stats['mean_group'] = round(stats['intents'] / stats['groups'], 2) if stats['groups'] else 0
+        return stats
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(shard):
+    """The (lazily created) writer of a shard's current file"""
+    key = database.shard_path(shard)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = GroupCommitWriter(
+                    shard, GROUP_COMMIT_MAX_ITEMS, GROUP_COMMIT_MAX_DELAY,
+                    GROUP_COMMIT_QUEUE_SIZE, WRITE_DURABILITY
+                )
+    return writer
+
+def run(user_id, fn, timeout=WRITE_TIMEOUT):
+    """Run write intent ``fn(conn)`` on the user's shard; returns its result once committed
+
+    ``fn`` must only write through ``conn`` and must not commit.
+    """
+    if GROUP_COMMIT:
+        return get_writer(database.get_shard(user_id)).run(fn, timeout)
+
+    conn = database.get_db_connection(user_id)
+    try:
+        result = fn(conn)
+        conn.commit()
+        return result
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def stop_writers(timeout=None):
+    """Drain and stop every writer thread of this process"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop(timeout)
+
+def get_stats():
+    """Counters of every writer of this process"""
+    return {'enabled': GROUP_COMMIT, 'max_items': GROUP_COMMIT_MAX_ITEMS,
+            'max_delay': GROUP_COMMIT_MAX_DELAY,
+            'writers': [writer.get_stats() for writer in list(_writers.values())]}
@@ -0,0 +1,8 @@
+"""
+ExpenseTracker WSGI Entry Point
+One app per worker process, e.g. gunicorn -w 4 wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()